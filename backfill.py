@@ -0,0 +1,187 @@
+"""
+Season backfill: generate previews for many races into a per-race archive
+
+Runs the full race pipeline for every selected round of a season, several
+races at a time, under one shared cap on in-flight OpenAI requests and an
+optional token budget. Each race is written to its own file and recorded in
+a per-season state file, so an interrupted backfill resumes where it stopped.
+
+Usage:
+  python generate_previews.py --only=backfill --season=2024
+  python generate_previews.py --only=backfill --season=2025 --rounds=1-5,8
+  python generate_previews.py --only=backfill --season=2024 --race-concurrency=3 --token-budget=4000000
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+import f1data
+import generate_previews as gp
+
+STATE_FILE = "backfill_state.json"
+
+
+def parse_rounds(spec):
+    """Parse "1-5,8,10" into [1, 2, 3, 4, 5, 8, 10]"""
+    rounds = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            rounds.update(range(int(start), int(end) + 1))
+        else:
+            rounds.add(int(part))
+    return sorted(rounds)
+
+
+def race_round(race):
+    return int(race['round'])
+
+
+def archive_path(archive_dir, season, race):
+    slug = re.sub(r'[^a-z0-9]+', '-', f1data.circuit_name(race).lower()).strip('-')
+    return os.path.join(archive_dir, str(season), f"round-{race_round(race):02d}-{slug}.json")
+
+
+def load_state(season_dir):
+    state_file = os.path.join(season_dir, STATE_FILE)
+    if not os.path.exists(state_file):
+        return {"rounds": {}}
+    with open(state_file, 'r') as f:
+        return json.load(f)
+
+
+def save_state(season_dir, state):
+    if gp.RUN_BUDGET.dry_run:
+        return
+    os.makedirs(season_dir, exist_ok=True)
+    state_file = os.path.join(season_dir, STATE_FILE)
+    with open(state_file + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_file + '.tmp', state_file)
+
+
+async def lineup_for_round(session, season, round_num):
+    """Drivers who raced this round (or the last round before it with results), else the season roster"""
+    return await gp.lazy_import("roster").lineup_for_round(session, season, round_num) or gp.current_roster().lineup
+
+
+async def run_backfill(client, season, rounds=None, archive_dir="archive",
+                       race_concurrency=2, api_concurrency=10, token_budget=None):
+    """Generate previews for the selected rounds of a season, resuming from previous runs"""
+    season = str(season)
+    season_dir = os.path.join(archive_dir, season)
+    print(f"\n🗄  Backfilling {season} season into {season_dir}/")
+
+    async with gp.http_session_scope() as session:
+        calendar = await f1data.get_season_calendar(session, season)
+        if not calendar:
+            print(f"   ✗ Could not fetch the {season} calendar")
+            return None
+
+        races = [r for r in calendar if rounds is None or race_round(r) in rounds]
+        state = load_state(season_dir)
+
+        pending = []
+        for race in races:
+            entry = state["rounds"].get(str(race_round(race)), {})
+            if entry.get("status") == "done" and os.path.exists(entry.get("file", "")):
+                continue
+            pending.append(race)
+
+        print(f"   ℹ {len(races)} rounds selected, {len(races) - len(pending)} already archived, "
+              f"{len(pending)} to generate")
+
+        await gp.use_season_roster(season, session)
+        gp.set_api_concurrency(api_concurrency)
+        race_semaphore = asyncio.Semaphore(race_concurrency)
+        run_meter = gp.new_usage_meter()
+        finished = []
+        in_flight = [0]
+        started = time.perf_counter()
+
+        def projected_tokens():
+            """Tokens used so far plus the expected cost of races still running"""
+            used = run_meter["input_tokens"] + run_meter["output_tokens"]
+            if not finished:
+                return used
+            per_race = sum(r["input_tokens"] + r["output_tokens"] for r in finished) / len(finished)
+            return used + per_race * (in_flight[0] + 1)
+
+        async def backfill_race(race):
+            round_num = race_round(race)
+            async with race_semaphore:
+                if token_budget and projected_tokens() > token_budget:
+                    print(f"   ⏸ Round {round_num}: token budget reached, leaving for a later run")
+                    state["rounds"][str(round_num)] = {"status": "deferred", "reason": "token budget"}
+                    return
+
+                in_flight[0] += 1
+                output_file = archive_path(archive_dir, season, race)
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                race_meter = gp.new_usage_meter()
+                race_started = time.perf_counter()
+                print(f"\n🏁 Round {round_num}: {f1data.circuit_name(race)} ({f1data.race_day(race)})")
+
+                try:
+                    with gp.track_usage(race_meter):
+                        drivers = await lineup_for_round(session, season, round_num)
+                        await gp.run_race_pipeline(
+                            client, f1data.circuit_name(race), f1data.race_day(race), season, output_file,
+                            drivers=drivers, latest_round=round_num - 1, round_num=round_num,
+                            http_session=session
+                        )
+                    entry = {
+                        "status": "done",
+                        "file": output_file,
+                        "durationSeconds": round(time.perf_counter() - race_started, 1),
+                        "finishedAt": datetime.now(timezone.utc).isoformat(),
+                        **race_meter,
+                    }
+                    finished.append(entry)
+                except Exception as e:
+                    print(f"   ✗ Round {round_num} failed: {e}")
+                    entry = {"status": "failed", "error": str(e), **race_meter}
+                finally:
+                    in_flight[0] -= 1
+
+                state["rounds"][str(round_num)] = entry
+                save_state(season_dir, state)
+
+        with gp.track_usage(run_meter):
+            await asyncio.gather(*[backfill_race(race) for race in pending])
+
+        save_state(season_dir, state)
+
+    elapsed = time.perf_counter() - started
+    # Only this run's rounds; failures and deferrals left by earlier runs aren't counted again
+    outcomes = [state["rounds"].get(str(race_round(race)), {}).get("status") for race in pending]
+    report = {
+        "season": season,
+        "racesGenerated": len(finished),
+        "racesFailed": outcomes.count("failed"),
+        "racesDeferred": outcomes.count("deferred"),
+        "elapsedSeconds": round(elapsed, 1),
+        "racesPerHour": round(len(finished) / elapsed * 3600, 2) if finished and elapsed else 0,
+        "tokensPerRace": round(
+            sum(r["input_tokens"] + r["output_tokens"] for r in finished) / len(finished)
+        ) if finished else 0,
+        **run_meter,
+    }
+    print_report(report)
+    return report
+
+
+def print_report(report):
+    print(f"\n📦 Backfill of {report['season']} finished in {report['elapsedSeconds']}s")
+    print(f"   Races generated: {report['racesGenerated']} "
+          f"(failed: {report['racesFailed']}, deferred: {report['racesDeferred']})")
+    print(f"   Throughput: {report['racesPerHour']} races/hour")
+    print(f"   Tokens: {report['input_tokens']} in / {report['output_tokens']} out "
+          f"over {report['calls']} calls, {report['tokensPerRace']} tokens/race")
@@ -0,0 +1,130 @@
+"""
+Per-upstream circuit breakers for f1api.dev, OpenF1 and OpenAI
+
+Each upstream call runs through its breaker with a timeout. After
+`failure_threshold` consecutive failures the breaker opens and calls fail
+immediately with CircuitOpen instead of waiting on timeouts and retries.
+Once `reset_timeout` seconds have passed one probe call is let through
+(half-open): success closes the breaker, failure opens it again. Callers
+catch CircuitOpen and fall back to the last known good data.
+"""
+
+import asyncio
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Breaker settings per upstream; timeouts are per request, in seconds
+UPSTREAMS = {
+    "f1api": {"failure_threshold": 3, "reset_timeout": 60.0, "call_timeout": 15.0},
+    "openf1": {"failure_threshold": 3, "reset_timeout": 60.0, "call_timeout": 20.0},
+    "openai": {"failure_threshold": 4, "reset_timeout": 120.0, "call_timeout": 420.0},
+}
+DEFAULT_SETTINGS = {"failure_threshold": 3, "reset_timeout": 60.0, "call_timeout": 30.0}
+
+
+class CircuitOpen(Exception):
+    """The upstream's breaker is open, so the call was not made"""
+
+
+def counts_as_failure(error):
+    """Timeouts, connection errors, 5xx and 429 say the upstream is unhealthy; other 4xx are our own fault"""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return not isinstance(status, int) or status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=60.0, call_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self.last_error = None
+
+    def allow(self):
+        """Whether a call may go out now; moves an open breaker to half-open once reset_timeout passed"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def succeeded(self):
+        if self.state != CLOSED:
+            print(f"   ✓ {self.name} recovered, circuit closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def failed(self, error):
+        self.stats["failures"] += 1
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats["opened"] += 1
+                print(f"   ⚠ {self.name} unhealthy ({self.last_error}), circuit open for {self.reset_timeout:.0f}s")
+            self.state = OPEN
+            self.opened_at = time.time()
+        self.probing = False
+
+    async def call(self, func, *args, **kwargs):
+        """Await func(*args, **kwargs) under the breaker and its timeout
+
+        Raises CircuitOpen without calling func while the breaker is open.
+        Errors that don't count as upstream failures (e.g. a 400) pass
+        through without tripping the breaker.
+        """
+        if not self.allow():
+            self.stats["rejected"] += 1
+            raise CircuitOpen(f"{self.name} circuit open after {self.failures} failures ({self.last_error})")
+
+        self.stats["calls"] += 1
+        try:
+            if self.call_timeout:
+                result = await asyncio.wait_for(func(*args, **kwargs), self.call_timeout)
+            else:
+                result = await func(*args, **kwargs)
+        except Exception as e:
+            if counts_as_failure(e):
+                self.failed(e)
+            else:
+                self.probing = False
+            raise
+        except asyncio.CancelledError:
+            self.probing = False
+            raise
+        self.succeeded()
+        return result
+
+
+BREAKERS = {}
+
+
+def breaker(name):
+    """Shared breaker for an upstream, created with its UPSTREAMS settings on first use"""
+    if name not in BREAKERS:
+        BREAKERS[name] = CircuitBreaker(name, **UPSTREAMS.get(name, DEFAULT_SETTINGS))
+    return BREAKERS[name]
+
+
+def print_report():
+    """Per-upstream breaker summary, only when something went wrong"""
+    unhealthy = {name: b for name, b in BREAKERS.items() if b.stats["failures"] or b.stats["rejected"]}
+    if not unhealthy:
+        return
+    print("\n🔌 Upstream health:")
+    for name, b in unhealthy.items():
+        print(f"   {name:<7} {b.state:<9} {b.stats['calls']} calls, {b.stats['failures']} failures, "
+              f"{b.stats['rejected']} rejected while open, opened {b.stats['opened']}x"
+              f"{f' (last error: {b.last_error})' if b.last_error else ''}")
@@ -0,0 +1,254 @@
+"""
+Precomputed circuit history: winners, poles, safety cars, pit stops and strategy per circuit
+
+Built once per season from cached f1api race/qualifying results (winners,
+pole sitters, position gains) and OpenF1 race-control, pit and stint data
+(safety cars, pit stops, tyre strategies). The race_context prompt gets a
+compact digest for the circuit, so web search is spent only on live
+information such as weather and news.
+
+Usage:
+  python generate_previews.py --only=circuit-history     # Rebuild the index for the current season
+"""
+
+import asyncio
+import json
+import os
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import f1data
+
+HISTORY_FILE = os.path.join(f1data.CACHE_DIR, "circuit_history_{season}.json")  # One index per season
+HISTORY_SEASONS = 3  # Completed seasons before the current one
+FETCH_CONCURRENCY = 4
+
+
+def circuit_key(race):
+    circuit = race.get('circuit', {})
+    return circuit.get('circuitId') or re.sub(r'[^a-z0-9]+', '_', circuit.get('circuitName', '').lower()).strip('_')
+
+
+def circuit_aliases(race):
+    circuit = race.get('circuit', {})
+    names = [circuit.get('circuitName'), circuit.get('city'), circuit.get('country'), race.get('raceName'),
+             circuit.get('circuitId')]
+    return sorted({name.lower() for name in names if name})
+
+
+def summarise_results(race, race_data, quali_data):
+    """Winner, pole and position changes for one race"""
+    results = race_data['races']['results']
+    classified = [r for r in results if f1data.to_int(r.get('position')) is not None and r.get('retired') is None]
+    winner = next((r for r in results if f1data.to_int(r.get('position')) == 1), None)
+
+    pole = None
+    if f1data.has_results(quali_data, 'qualyResults'):
+        pole = next((r for r in quali_data['races']['qualyResults'] if f1data.to_int(r.get('gridPosition')) == 1), None)
+    if pole is None:
+        pole = next((r for r in results if f1data.to_int(r.get('grid')) == 1), None)
+
+    changes = [
+        (f1data.to_int(r.get('grid')) - f1data.to_int(r.get('position')), r)
+        for r in classified if f1data.to_int(r.get('grid'))
+    ]
+    biggest_gain = max(changes, key=lambda change: change[0], default=None)
+
+    return {
+        "season": str(race.get('season') or f1data.race_day(race)[:4]),
+        "round": f1data.to_int(race.get('round')),
+        "date": f1data.race_day(race),
+        "winner": f1data.driver_display_name(winner['driver']) if winner else None,
+        "winnerTeam": winner['team']['teamName'] if winner else None,
+        "winnerGrid": f1data.to_int(winner.get('grid')) if winner else None,
+        "pole": f1data.driver_display_name(pole['driver']) if pole else None,
+        "finishers": len(classified),
+        "retirements": len(results) - len(classified),
+        "avgPositionChange": round(sum(abs(c) for c, _ in changes) / len(changes), 2) if changes else None,
+        "biggestGain": {
+            "driver": f1data.driver_display_name(biggest_gain[1]['driver']),
+            "from": f1data.to_int(biggest_gain[1].get('grid')),
+            "to": f1data.to_int(biggest_gain[1].get('position')),
+        } if biggest_gain and biggest_gain[0] > 0 else None,
+    }
+
+
+def match_openf1_session(sessions, race_date):
+    """OpenF1 race session on race_date (±1 day, since OpenF1 dates are UTC)"""
+    if not race_date:
+        return None
+    day = date.fromisoformat(race_date)
+    candidates = {(day + timedelta(days=offset)).isoformat() for offset in (0, -1, 1)}
+    for session in sessions:
+        if session.get('date_start', '')[:10] == race_date:
+            return session
+    return next((s for s in sessions if s.get('date_start', '')[:10] in candidates), None)
+
+
+async def summarise_session(session, session_key):
+    """Safety cars, pit stops and tyre strategies from OpenF1 for one race session"""
+    race_control, pits, stints = await asyncio.gather(
+        f1data.fetch_openf1(session, "race_control", session_key=session_key, category="SafetyCar"),
+        f1data.fetch_openf1(session, "pit", session_key=session_key),
+        f1data.fetch_openf1(session, "stints", session_key=session_key),
+    )
+
+    deployed = [m.get('message', '').upper() for m in race_control if 'DEPLOYED' in m.get('message', '').upper()]
+    compounds = {}
+    for stint in sorted(stints, key=lambda s: (s.get('driver_number'), s.get('stint_number') or 0)):
+        if stint.get('compound'):
+            compounds.setdefault(stint['driver_number'], []).append(stint['compound'][0])
+    strategies = Counter("-".join(sequence) for sequence in compounds.values())
+    stops = [len(sequence) - 1 for sequence in compounds.values()]
+
+    return {
+        "safetyCars": len([m for m in deployed if 'VIRTUAL' not in m]),
+        "virtualSafetyCars": len([m for m in deployed if 'VIRTUAL' in m]),
+        "pitStops": len(pits),
+        "avgStopsPerDriver": round(sum(stops) / len(stops), 2) if stops else None,
+        "commonStrategy": strategies.most_common(1)[0][0] if strategies else None,
+    }
+
+
+def summarise_circuit(races):
+    """Aggregate statistics over a circuit's archived races"""
+    with_openf1 = [r for r in races if r.get('safetyCars') is not None]
+    strategies = Counter(r['commonStrategy'] for r in races if r.get('commonStrategy'))
+    stops = [r['avgStopsPerDriver'] for r in races if r.get('avgStopsPerDriver') is not None]
+    changes = [r['avgPositionChange'] for r in races if r.get('avgPositionChange') is not None]
+
+    return {
+        "races": len(races),
+        "poleToWin": len([r for r in races if r['pole'] and r['pole'] == r['winner']]),
+        "safetyCarsPerRace": round(sum(r['safetyCars'] for r in with_openf1) / len(with_openf1), 2)
+        if with_openf1 else None,
+        "racesWithSafetyCar": len([r for r in with_openf1 if r['safetyCars']]),
+        "racesWithSafetyCarData": len(with_openf1),
+        "avgStopsPerDriver": round(sum(stops) / len(stops), 2) if stops else None,
+        "commonStrategy": strategies.most_common(1)[0][0] if strategies else None,
+        "avgPositionChange": round(sum(changes) / len(changes), 2) if changes else None,
+    }
+
+
+async def build_index(session, season, seasons_back=HISTORY_SEASONS):
+    """Index the last `seasons_back` seasons plus completed rounds of `season`"""
+    seasons = [int(season) - offset for offset in range(seasons_back, -1, -1)]
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    circuits = {}
+
+    async def index_race(race, openf1_sessions):
+        async with semaphore:
+            race_data = await f1data.get_race_results(session, race['season'], race['round'])
+            if not f1data.has_results(race_data):
+                return
+            quali_data = await f1data.get_qualifying_results(session, race['season'], race['round'])
+            entry = summarise_results(race, race_data, quali_data)
+
+            openf1_session = match_openf1_session(openf1_sessions, f1data.race_day(race))
+            if openf1_session:
+                entry.update(await summarise_session(session, openf1_session['session_key']))
+
+        circuit = circuits.setdefault(circuit_key(race), {
+            "circuitName": race.get('circuit', {}).get('circuitName'),
+            "aliases": circuit_aliases(race),
+            "races": [],
+        })
+        circuit["races"].append(entry)
+
+    for year in seasons:
+        calendar = await f1data.get_season_calendar(session, year)
+        openf1_sessions = await f1data.fetch_openf1(session, "sessions", year=year, session_name="Race")
+        await asyncio.gather(*[index_race({**race, "season": str(year)}, openf1_sessions) for race in calendar])
+        print(f"   ✓ Indexed {year}")
+
+    for circuit in circuits.values():
+        circuit["races"].sort(key=lambda r: r['date'] or '')
+        circuit["summary"] = summarise_circuit(circuit["races"])
+
+    return {
+        "season": str(season),
+        "seasons": [str(year) for year in seasons],
+        "builtAt": datetime.now(timezone.utc).isoformat(),
+        "circuits": circuits,
+    }
+
+
+def history_file(season):
+    return HISTORY_FILE.format(season=season)
+
+
+def save_index(index, path=None):
+    path = path or history_file(index['season'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_index(season, path=None):
+    """The precomputed index if it was built for this season, else None"""
+    path = path or history_file(season)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        index = json.load(f)
+    return index if index.get('season') == str(season) else None
+
+
+def find_circuit(index, name):
+    """Circuit entry whose name, city, country or race name matches `name`, or None"""
+    needle = (name or "").lower().strip()
+    if not needle:
+        return None
+    for key, circuit in index.get('circuits', {}).items():
+        if needle == key or needle in circuit['aliases']:
+            return circuit
+    for circuit in index.get('circuits', {}).values():
+        if any(needle in alias or alias in needle for alias in circuit['aliases'] if len(alias) > 3):
+            return circuit
+    return None
+
+
+def before(circuit, race_date):
+    """The circuit entry limited to races strictly before race_date, or None if there are none
+
+    A season's index holds its completed rounds, so without this a backfilled
+    preview would see the result of the race it is previewing.
+    """
+    if not race_date:
+        return circuit
+    races = [race for race in circuit['races'] if race['date'] and race['date'] < race_date]
+    if not races:
+        return None
+    return dict(circuit, races=races, summary=summarise_circuit(races))
+
+
+def format_digest(circuit, races=3):
+    """Compact text digest of a circuit's recent history for the race_context prompt"""
+    summary = circuit['summary']
+    lines = [f"CIRCUIT HISTORY FOR {circuit['circuitName'].upper()} (precomputed from official race data):"]
+
+    for race in circuit['races'][-races:]:
+        parts = [f"winner {race['winner']} ({race['winnerTeam']}) from P{race['winnerGrid']}", f"pole {race['pole']}"]
+        if race.get('safetyCars') is not None:
+            parts.append(f"{race['safetyCars']} SC / {race['virtualSafetyCars']} VSC")
+        if race.get('pitStops'):
+            parts.append(f"{race['pitStops']} pit stops, typical strategy {race['commonStrategy']}")
+        if race.get('biggestGain'):
+            gain = race['biggestGain']
+            parts.append(f"biggest gain {gain['driver']} P{gain['from']}→P{gain['to']}")
+        lines.append(f"- {race['season']}: " + "; ".join(parts))
+
+    if summary.get('safetyCarsPerRace') is not None:
+        lines.append(f"- Safety cars: {summary['safetyCarsPerRace']} per race, "
+                     f"at least one in {summary['racesWithSafetyCar']} of {summary['racesWithSafetyCarData']} races")
+    lines.append(f"- Pole converted to victory in {summary['poleToWin']} of {summary['races']} races; "
+                 f"average position change {summary['avgPositionChange']} places")
+    if summary.get('avgStopsPerDriver') is not None:
+        lines.append(f"- Average {summary['avgStopsPerDriver']} stops per driver; most common strategy "
+                     f"{summary['commonStrategy']} (S=soft, M=medium, H=hard, I=inter, W=wet)")
+
+    lines.append("Use these figures for the circuit's race history, safety-car statistics and typical strategy "
+                 "instead of searching for them; spend web searches only on live information.")
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+"""
+Deadline-aware priority scheduling for race-weekend crunch windows
+
+Between qualifying and the race the preview has a hard publish deadline.
+Jobs (driver previews, sections) run in priority order on a fixed number of
+workers. Before each job starts, the time to finish everything still queued
+is projected from recorded per-stage latencies; if that runs past the
+deadline, low-priority jobs switch to a faster model tier or reuse the
+previous version of the same preview. Every degradation is recorded with
+its reason for the run report.
+
+Usage:
+  python generate_previews.py --deadline=13:30                # Publish by 13:30 local time
+  python generate_previews.py --deadline=+90m --api-concurrency=6
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
+
+# Lower runs first. Jobs at or below PROTECTED_PRIORITY are never degraded.
+PRIORITY_CONTENDER = 0
+PRIORITY_HIGH_STAKES = 1
+PRIORITY_KEY_SECTION = 1  # top5, prediction
+PRIORITY_MEDIUM_STAKES = 2
+PRIORITY_SECTION = 3  # underdogs
+PRIORITY_LOW_STAKES = 4
+PROTECTED_PRIORITY = 1
+
+DEGRADE_TIERS = {"heavy": "fast", "fast": "nano"}
+DEFAULT_LATENCY = {"heavy": 150.0, "fast": 60.0, "nano": 25.0}  # Seconds per call before any are recorded
+SAFETY_MARGIN = 1.15  # Latency estimates are padded by this factor
+
+
+def parse_deadline(value, now=None):
+    """Epoch seconds for "+90m", "+2h", "13:30" (next occurrence, local time) or an ISO datetime"""
+    now = now or datetime.now()
+    relative = re.fullmatch(r'\+(\d+(?:\.\d+)?)([mh]?)', value.strip())
+    if relative:
+        amount, unit = float(relative.group(1)), relative.group(2) or 'm'
+        return (now + timedelta(minutes=amount * (60 if unit == 'h' else 1))).timestamp()
+
+    clock = re.fullmatch(r'(\d{1,2}):(\d{2})', value.strip())
+    if clock:
+        target = now.replace(hour=int(clock.group(1)), minute=int(clock.group(2)), second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target.timestamp()
+
+    return datetime.fromisoformat(value.strip()).timestamp()
+
+
+def stakes_priority(stakes_level):
+    return {"high": PRIORITY_HIGH_STAKES, "low": PRIORITY_LOW_STAKES}.get(stakes_level, PRIORITY_MEDIUM_STAKES)
+
+
+class DeadlineScheduler:
+    """Runs jobs in priority order, degrading low-priority ones when the deadline is at risk
+
+    A job is a dict with name, stage, tier, priority, run (async callable
+    taking the tier to use) and fallback (the previous result, or None).
+    Without a deadline jobs still run in priority order but are never degraded.
+    """
+
+    def __init__(self, deadline=None, estimate=None, workers=None):
+        self.deadline = deadline
+        self.estimate = estimate or (lambda stage, tier: None)
+        self.workers = workers
+        self.degraded = []
+
+    def job_seconds(self, job, tier=None):
+        tier = tier or job["tier"]
+        seconds = self.estimate(job["stage"], tier) or DEFAULT_LATENCY.get(tier, DEFAULT_LATENCY["heavy"])
+        return seconds * SAFETY_MARGIN
+
+    def faster_tier(self, job):
+        return None if job["priority"] <= PROTECTED_PRIORITY else DEGRADE_TIERS.get(job["tier"])
+
+    def projected_finish(self, pending, running, workers, reserve, downgrade=False):
+        """Epoch seconds when pending and running jobs plus reserve seconds of later work would finish"""
+        now = time.time()
+        seconds = sum(self.job_seconds(job, downgrade and self.faster_tier(job)) for job in pending)
+        seconds += sum(max(0.0, self.job_seconds(job, tier) - (now - started)) for job, tier, started in running.values())
+        return now + seconds / workers + reserve
+
+    def record(self, job, action, reason):
+        self.degraded.append({"item": job["name"], "stage": job["stage"], "action": action, "reason": reason})
+        print(f"   ⏱ {job['name']}: {action} ({reason})")
+
+    def plan(self, job, queued, running, workers, reserve):
+        """Tier to run the job on, or None to reuse its fallback"""
+        if self.deadline is None or job["priority"] <= PROTECTED_PRIORITY:
+            return job["tier"]
+
+        pending = [job] + queued
+        finish = self.projected_finish(pending, running, workers, reserve)
+        if finish <= self.deadline:
+            return job["tier"]
+
+        late = f"projected {finish - self.deadline:.0f}s past the deadline"
+        faster = self.faster_tier(job)
+        if faster and self.projected_finish(pending, running, workers, reserve, downgrade=True) <= self.deadline:
+            self.record(job, f"switched {job['tier']} → {faster} tier", late)
+            return faster
+        if job.get("fallback") is not None:
+            self.record(job, "reused the previous version", late)
+            return None
+        if faster:
+            self.record(job, f"switched {job['tier']} → {faster} tier", f"{late}, no previous version to reuse")
+            return faster
+        return job["tier"]
+
+    async def run(self, jobs, reserve=0.0):
+        """Run jobs and return their results in input order
+
+        reserve is the estimated time of work that can only start after these
+        jobs (e.g. sections that need every driver preview).
+        """
+        if not jobs:
+            return []
+
+        queue = sorted(range(len(jobs)), key=lambda i: jobs[i]["priority"])
+        workers = min(self.workers or len(jobs), len(jobs))
+        results = [None] * len(jobs)
+        running = {}
+
+        async def worker():
+            while queue:
+                i = queue.pop(0)
+                job = jobs[i]
+                tier = self.plan(job, [jobs[k] for k in queue], running, workers, reserve)
+                if tier is None:
+                    results[i] = job["fallback"]
+                    continue
+                running[i] = (job, tier, time.time())
+                try:
+                    results[i] = await job["run"](tier)
+                finally:
+                    running.pop(i)
+
+        await asyncio.gather(*[worker() for _ in range(workers)])
+        return results
+
+    def reserve_for(self, jobs):
+        """Estimated wall time of jobs that will run after the current phase"""
+        if not jobs:
+            return 0.0
+        workers = min(self.workers or len(jobs), len(jobs))
+        seconds = [self.job_seconds(job) for job in jobs]
+        return max(max(seconds), sum(seconds) / workers)
+
+    def print_report(self):
+        if self.deadline is None:
+            return
+        slack = self.deadline - time.time()
+        status = f"{slack:.0f}s to spare" if slack >= 0 else f"missed by {-slack:.0f}s"
+        print(f"\n⏱  Deadline {datetime.fromtimestamp(self.deadline):%H:%M:%S}: {status}, "
+              f"{len(self.degraded)} items degraded")
+        for entry in self.degraded:
+            print(f"   {entry['item']}: {entry['action']} ({entry['reason']})")
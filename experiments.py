@@ -0,0 +1,292 @@
+"""
+Prompt variant experiments: compare template variants on tokens, latency and parse success
+
+Runs the current template of a stage and every variant in a directory
+(one <name>.txt template per variant, using the same {placeholders} as the
+prompts dict) over a fixed set of recorded races and drivers, all
+concurrently under the --api-concurrency limit. Contexts come from
+preview_data.json and the --archive-dir files, and web search is off, so
+variants are compared on the same input. With --fake-model a local
+deterministic model answers instead of the API: output follows the format
+the prompt asks for, so token counts, simulated latency and parse success
+reflect the template alone and runs are repeatable.
+
+Reports per variant: input and output tokens, p50/p95 latency, parse
+success through the stage's parser and output size, plus the change
+against the current template.
+
+Usage:
+  python generate_previews.py --only=experiment --variants=prompt_variants/driver_preview --fake-model
+  python generate_previews.py --only=experiment --variants=prompt_variants/top5 --api-concurrency=4
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+import generate_previews as gp
+import run_budget
+import stage_budgets
+
+EXPERIMENT_DRIVERS = ["Max Verstappen", "Lando Norris", "Lewis Hamilton", "Oliver Bearman"]  # Mixed stakes
+EXPERIMENT_RACES = 3  # Recorded races used as cases
+RESULTS_DIR = ".experiments"
+
+# Fake model: simulated latency = base + prefill + decode time
+FAKE_BASE_LATENCY = 0.8
+FAKE_PREFILL_TOKENS_PER_SECOND = 20000
+FAKE_DECODE_TOKENS_PER_SECOND = 90
+FAKE_DEFAULT_SENTENCES = 8
+FAKE_WORDS_PER_SENTENCE = (14, 24)
+
+# Labels a response must contain to parse; the fake model only produces them if the prompt asks for them
+STAGE_LABELS = {
+    "driver_preview": ["FULL:", "STAKES:", "PERFECT_QUALI:", "PERFECT_RACE:", "GOOD_QUALI:", "GOOD_RACE:"],
+    "top5": ["REASON:", "STAKES:"],
+    "underdogs": ["UNDERDOG #", "TITLE:", "STORY:", "SURPRISE_FACTOR:"],
+}
+
+PARSERS = {
+    "driver_preview": gp.is_valid_driver_preview,
+    "top5": gp.is_valid_top5,
+    "underdogs": gp.is_valid_underdogs,
+    "prediction": lambda text: bool(re.search(r'^\s*1\.\s+\S', gp.clean_urls(text), re.MULTILINE)),
+    "race_context": lambda text: bool(gp.clean_urls(text)),
+}
+
+
+class PlaceholderValues(dict):
+    """format_map() values; placeholders a case doesn't provide are left empty"""
+
+    def __missing__(self, key):
+        return ""
+
+
+def load_variants(variants_dir):
+    """(stage, {name: template}) with the stage's current template as "current" """
+    stage = os.path.basename(os.path.normpath(variants_dir))
+    if stage not in gp.prompts:
+        raise ValueError(f"{variants_dir}: directory name must be a stage in prompts ({', '.join(gp.prompts)})")
+    variants = {"current": gp.prompts[stage]}
+    for path in sorted(glob.glob(os.path.join(variants_dir, "*.txt"))):
+        with open(path, 'r') as f:
+            variants[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return stage, variants
+
+
+def load_races(json_file, archive_dir, limit=EXPERIMENT_RACES):
+    """Recorded preview documents with a race context and driver previews, newest file first"""
+    preview_archive = gp.lazy_import("preview_archive")
+    races = []
+    for path in preview_archive.archive_files(archive_dir, extra_files=[json_file]):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if data.get('raceContext') and data.get('drivers') and data.get('metadata', {}).get('language') is None:
+            races.append(data)
+        if len(races) >= limit:
+            break
+    return races
+
+
+def build_cases(stage, races, drivers=EXPERIMENT_DRIVERS):
+    """Placeholder values per case: one per race, or one per race and driver for driver_preview"""
+    roster = gp.current_roster()
+    cases = []
+    for data in races:
+        metadata = data['metadata']
+        base = {
+            "circuit": metadata.get('circuit', ''),
+            "raceDate": metadata.get('date', ''),
+            "season": metadata.get('season', gp.SEASON),
+            "raceContext": data['raceContext'],
+            "simulation": gp.get_simulation_context(data.get('simulation')),
+            "driverPreviews": gp.format_full_previews(data['drivers']) if stage == "prediction"
+            else gp.format_preview_summaries(data['drivers']),
+        }
+        label = f"{base['circuit']} {base['raceDate']}"
+        if stage != "driver_preview":
+            cases.append({"name": label, "values": base})
+            continue
+        for name in drivers:
+            driver = roster.resolve(name)
+            if driver:
+                values = {**base, "driverName": driver["name"], "driverNumber": driver["number"],
+                          "team": driver["team"]}
+                cases.append({"name": f"{label} / {driver['name']}", "values": values})
+    return cases
+
+
+def requested_sentences(prompt):
+    """Sentences the prompt's format asks for, from "2-3 sentences" style instructions (upper bounds)"""
+    counts = [int(high or low) for low, high in re.findall(r'(\d+)(?:\s*-\s*(\d+))?\s+(?:compelling\s+)?sentences?', prompt)]
+    return sum(counts) or FAKE_DEFAULT_SENTENCES
+
+
+def fake_sentences(rng, count):
+    words = ["pace", "tyres", "grip", "strategy", "qualifying", "points", "form", "upgrade", "balance", "stint",
+             "traction", "championship", "teammate", "pressure", "braking", "setup", "weekend", "momentum"]
+    return " ".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(*FAKE_WORDS_PER_SENTENCE))).capitalize() + "."
+        for _ in range(count)
+    )
+
+
+def fake_response(stage, prompt, seed):
+    """Deterministic stand-in for the model: the requested format if the prompt asks for one, else prose"""
+    rng = random.Random(seed)
+    sentences = requested_sentences(prompt)
+    names = [driver["name"] for driver in gp.current_roster().lineup if driver["name"] in prompt] or ["Max Verstappen"]
+    asks_for_format = all(label in prompt for label in STAGE_LABELS.get(stage, []))
+
+    if stage == "driver_preview" and asks_for_format:
+        headings = re.findall(r'^## (.+)$', prompt, re.MULTILINE) or ["Preview"]
+        per_section = max(1, sentences // len(headings))
+        full = "\n\n".join(f"## {heading}\n{fake_sentences(rng, per_section)}" for heading in headings)
+        return (f"FULL: {full}\n\nSTAKES: {rng.choice(['high', 'medium', 'low'])}\n\n"
+                f"PERFECT_QUALI: P{rng.randint(1, 5)}\nPERFECT_RACE: Podium\nGOOD_QUALI: Top 10\nGOOD_RACE: Points")
+    if stage == "top5" and asks_for_format:
+        return "\n\n".join(
+            f"#{rank}: {names[(rank - 1) % len(names)]}\nREASON: {fake_sentences(rng, 2)}\nSTAKES: {fake_sentences(rng, 1)}"
+            for rank in range(1, 6)
+        )
+    if stage == "underdogs" and asks_for_format:
+        return "\n\n".join(
+            f"UNDERDOG #{rank}: {names[-rank % len(names)]}\nTITLE: {fake_sentences(rng, 1)[:40]}\n"
+            f"STORY: {fake_sentences(rng, 3)}\nSURPRISE_FACTOR: {fake_sentences(rng, 1)}"
+            for rank in range(1, 4)
+        )
+    if stage == "prediction" and "numbered list" in prompt:
+        items = re.findall(r'^\d+\.\s+\*\*(.+?)\*\*', prompt, re.MULTILINE) or ["Prediction"]
+        return "\n".join(f"{i}. **{item}** - {fake_sentences(rng, 2)}" for i, item in enumerate(items, start=1))
+    return fake_sentences(rng, sentences)
+
+
+async def call_fake(stage, prompt, seed):
+    await asyncio.sleep(0)
+    text = fake_response(stage, prompt, seed)
+    input_tokens, output_tokens = run_budget.prompt_tokens(prompt), run_budget.prompt_tokens(text)
+    latency = (FAKE_BASE_LATENCY + input_tokens / FAKE_PREFILL_TOKENS_PER_SECOND
+               + output_tokens / FAKE_DECODE_TOKENS_PER_SECOND)
+    return text, input_tokens, output_tokens, latency
+
+
+async def call_api(client, stage, prompt):
+    """One Responses API call on the stage's routed model and settings, without web search"""
+    model = gp.MODEL_TIERS.get(gp.STAGE_ROUTES.get(stage, "heavy"), gp.MODEL)
+    settings = gp.STAGE_BUDGETS.settings(stage, model)
+    request_body = {"model": model, "input": prompt, "max_output_tokens": settings["max_output_tokens"]}
+    if settings["reasoning_effort"] and model.startswith(("gpt-5", "o")):
+        request_body["reasoning"] = {"effort": settings["reasoning_effort"]}
+
+    async with gp.api_slot():
+        started = time.perf_counter()
+        response = await client.responses.create(**request_body)
+        latency = time.perf_counter() - started
+
+    text = next(
+        (part.text for item in response.output if item.type == 'message'
+         for part in item.content if part.type in ('text', 'output_text')),
+        ""
+    )
+    usage = getattr(response, "usage", None)
+    return text, getattr(usage, "input_tokens", 0) or 0, getattr(usage, "output_tokens", 0) or 0, latency
+
+
+async def run_experiment(client, variants_dir, json_file="preview_data.json", archive_dir="archive", fake=False):
+    """Run every variant over every case and return the per-variant report rows"""
+    stage, variants = load_variants(variants_dir)
+    cases = build_cases(stage, load_races(json_file, archive_dir))
+    if not cases:
+        print(f"   ✗ No recorded races with driver previews in {json_file} or {archive_dir}/")
+        return None
+
+    print(f"\n🧪 {stage}: {len(variants)} variants x {len(cases)} cases "
+          f"({'fake model' if fake else 'API, web search off'})")
+    parse = PARSERS.get(stage, bool)
+
+    async def run_case(variant, template, case):
+        prompt = template.format_map(PlaceholderValues(case["values"]))
+        seed = hashlib.sha256(f"{case['name']}\n{prompt}".encode('utf-8')).hexdigest()
+        try:
+            if fake:
+                text, input_tokens, output_tokens, latency = await call_fake(stage, prompt, seed)
+            else:
+                text, input_tokens, output_tokens, latency = await call_api(client, stage, prompt)
+        except Exception as e:
+            print(f"   ✗ {variant} / {case['name']}: {e}")
+            return variant, None
+        return variant, {
+            "inputTokens": input_tokens,
+            "outputTokens": output_tokens,
+            "latency": latency,
+            "parsed": bool(parse(text)),
+            "outputChars": len(text),
+        }
+
+    results = await asyncio.gather(*[
+        run_case(variant, template, case) for variant, template in variants.items() for case in cases
+    ])
+
+    rows = []
+    for variant in variants:
+        runs = [run for name, run in results if name == variant and run]
+        failed = len([run for name, run in results if name == variant and run is None])
+        if not runs:
+            rows.append({"variant": variant, "runs": 0, "failed": failed})
+            continue
+        latencies = [run["latency"] for run in runs]
+        rows.append({
+            "variant": variant,
+            "runs": len(runs),
+            "failed": failed,
+            "inputTokens": round(sum(run["inputTokens"] for run in runs) / len(runs)),
+            "outputTokens": round(sum(run["outputTokens"] for run in runs) / len(runs)),
+            "latencyP50": round(stage_budgets.percentile(latencies, 0.5), 2),
+            "latencyP95": round(stage_budgets.percentile(latencies, 0.95), 2),
+            "parseSuccess": round(len([run for run in runs if run["parsed"]]) / len(runs), 3),
+            "outputChars": round(sum(run["outputChars"] for run in runs) / len(runs)),
+        })
+
+    print_report(stage, rows)
+    save_report(stage, rows, fake, len(cases))
+    return rows
+
+
+def change(value, baseline):
+    if not baseline or value is None:
+        return ""
+    return f" ({(value - baseline) / baseline:+.0%})"
+
+
+def print_report(stage, rows):
+    baseline = next((row for row in rows if row["variant"] == "current" and row["runs"]), {})
+    print(f"\n📐 {stage} variants (averages per call, change vs current):")
+    for row in rows:
+        if not row["runs"]:
+            print(f"   {row['variant']:<16} all {row['failed']} calls failed")
+            continue
+        failed = f", {row['failed']} failed" if row["failed"] else ""
+        print(f"   {row['variant']:<16} in {row['inputTokens']}{change(row['inputTokens'], baseline.get('inputTokens'))}, "
+              f"out {row['outputTokens']}{change(row['outputTokens'], baseline.get('outputTokens'))}, "
+              f"latency p50 {row['latencyP50']}s / p95 {row['latencyP95']}s"
+              f"{change(row['latencyP50'], baseline.get('latencyP50'))}, "
+              f"parsed {row['parseSuccess']:.0%}, {row['outputChars']} chars{failed}")
+
+
+def save_report(stage, rows, fake, cases):
+    if gp.RUN_BUDGET.dry_run:
+        return
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{stage}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump({"stage": stage, "fakeModel": fake, "cases": cases, "variants": rows}, f, indent=2)
+    print(f"   ℹ Report saved to {path}")
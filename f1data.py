@@ -0,0 +1,212 @@
+"""
+Cached access to the f1api.dev and OpenF1 endpoints used for standings, calendars and results
+
+Responses are cached as JSON files under .f1cache/ so repeated runs (cron on
+race weekends, season backfills) don't refetch data that cannot change, such
+as the results of a finished race. Endpoints that change during a season are
+fetched with a max_age so they are refreshed regularly.
+
+Requests go through a circuit breaker per upstream. When an upstream fails
+or its breaker is open, an expired cache entry is used instead and recorded
+as a stale read, so callers can mark what they built from it as stale. Call
+reset_stale_reads() at the start of each job so reads are scoped to it.
+"""
+
+import contextvars
+import json
+import os
+import re
+import time
+from datetime import date
+from urllib.parse import urlencode
+
+import circuit_breaker
+
+F1API_BASE = "https://f1api.dev/api"
+OPENF1_BASE = "https://api.openf1.org/v1"
+CACHE_DIR = ".f1cache"
+CURRENT_MAX_AGE = 10 * 60  # Seconds before the "current season" summary is refetched
+CALENDAR_MAX_AGE = 24 * 60 * 60
+# cache key -> mtime of an expired cache entry used because its upstream was down, per job
+_stale_reads = contextvars.ContextVar("stale_reads", default=None)
+DISPLAY_NAMES = {  # f1api full name -> name used in preview_data.json, where they differ
+    "Andrea Kimi Antonelli": "Kimi Antonelli",
+}
+
+
+def cache_path(path):
+    return os.path.join(CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '_', path.strip('/')) + '.json')
+
+
+def read_cache(path, max_age=None):
+    """Return cached JSON for path, or None if missing or older than max_age seconds"""
+    cache_file = cache_path(path)
+    if not os.path.exists(cache_file):
+        return None
+    if max_age is not None and time.time() - os.path.getmtime(cache_file) > max_age:
+        return None
+
+    with open(cache_file, 'r') as f:
+        return json.load(f)
+
+
+def cache_age(path):
+    """mtime of the cache file for path, or None if not cached"""
+    cache_file = cache_path(path)
+    return os.path.getmtime(cache_file) if os.path.exists(cache_file) else None
+
+
+def reset_stale_reads():
+    """Start recording stale reads afresh for the current job (and the tasks it starts)"""
+    _stale_reads.set({})
+
+
+def oldest_stale_read(upstream=None):
+    """mtime of the oldest stale cache entry used by this job ("f1api" or "openf1" only), or None"""
+    times = [
+        mtime for key, mtime in (_stale_reads.get() or {}).items()
+        if upstream is None or key.startswith("openf1/") == (upstream == "openf1")
+    ]
+    return min(times) if times else None
+
+
+def write_cache(path, data):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_file = cache_path(path) + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_file, cache_path(path))
+
+
+class UpstreamError(Exception):
+    """The upstream answered with a status that means it is unhealthy (5xx or 429)"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def fetch_json(session, path, max_age=None, cacheable=None, base=F1API_BASE):
+    """GET <base>/<path> (f1api.dev by default) through the disk cache
+
+    max_age=None caches forever. cacheable(data) can veto caching a response,
+    e.g. results for a round that hasn't been raced yet. If the upstream is
+    down (error, timeout or open breaker) an expired cache entry is returned
+    and recorded as a stale read of the current job. Returns None if the request fails and
+    nothing usable is cached.
+    """
+    cache_key = path if base == F1API_BASE else f"openf1/{path}"
+    cached = read_cache(cache_key, max_age)
+    if cached is not None:
+        return cached
+
+    async def get():
+        async with session.get(f"{base}/{path.strip('/')}") as response:
+            if response.status >= 500 or response.status == 429:
+                raise UpstreamError(response.status, f"HTTP {response.status} for {path}")
+            if response.status != 200:
+                return None
+            return await response.json()
+
+    upstream = "f1api" if base == F1API_BASE else "openf1"
+    try:
+        data = await circuit_breaker.breaker(upstream).call(get)
+    except Exception:
+        stale = read_cache(cache_key)
+        if stale is None:
+            return None
+        stale_reads = _stale_reads.get()
+        if stale_reads is not None:
+            stale_reads[cache_key] = cache_age(cache_key)
+        return stale
+    if data is None:
+        return None
+
+    if cacheable is None or cacheable(data):
+        write_cache(cache_key, data)
+    return data
+
+
+async def fetch_openf1(session, endpoint, max_age=None, cacheable=bool, **params):
+    """GET an OpenF1 endpoint with query parameters; empty responses are not cached"""
+    path = f"{endpoint}?{urlencode(params)}" if params else endpoint
+    data = await fetch_json(session, path, max_age=max_age, cacheable=cacheable, base=OPENF1_BASE)
+    return data or []
+
+
+def to_int(value):
+    """Position or round as int, or None for NC/DQ/'-' and missing values"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def has_results(data, key='results'):
+    return bool(data and data.get('races', {}).get(key))
+
+
+async def get_current_season(session):
+    return await fetch_json(session, "current", max_age=CURRENT_MAX_AGE)
+
+
+async def get_season_calendar(session, season):
+    """List of races for a season, each with round, raceName, circuit and schedule"""
+    data = await fetch_json(session, str(season), max_age=CALENDAR_MAX_AGE)
+    return data.get('races', []) if data else []
+
+
+async def get_drivers(session, season):
+    """Drivers entered in a season, each with driverId, name, surname, number, shortName and teamId"""
+    return await fetch_json(session, f"{season}/drivers", max_age=CALENDAR_MAX_AGE)
+
+
+async def get_teams(session, season):
+    return await fetch_json(session, f"{season}/teams", max_age=CALENDAR_MAX_AGE)
+
+
+async def get_race_results(session, season, round_num):
+    return await fetch_json(session, f"{season}/{round_num}/race", cacheable=has_results)
+
+
+async def get_qualifying_results(session, season, round_num):
+    return await fetch_json(
+        session, f"{season}/{round_num}/qualy",
+        cacheable=lambda data: has_results(data, 'qualyResults')
+    )
+
+
+def completed_rounds(races):
+    """Number of rounds with a winner in a season's race list"""
+    return len([r for r in races if r.get('winner') is not None])
+
+
+def find_round(races, race_date):
+    """Round number of the race held on race_date, or None"""
+    for race in races:
+        if race.get('schedule', {}).get('race', {}).get('date') == race_date:
+            return int(race['round'])
+    return None
+
+
+def race_day(race):
+    return race.get('schedule', {}).get('race', {}).get('date') or race.get('date')
+
+
+def circuit_name(race):
+    return race.get('circuit', {}).get('circuitName') or race.get('raceName', f"round {race['round']}")
+
+
+def next_race(races, today=None):
+    """First race without a winner that isn't in the past, or None at the end of the season"""
+    today = (today or date.today()).isoformat()
+    for race in sorted(races, key=lambda r: int(r['round'])):
+        if race.get('winner') is None and (race_day(race) or '') >= today:
+            return race
+    return None
+
+
+def driver_display_name(driver):
+    """Name as used for keys in preview_data.json"""
+    name = f"{driver['name']} {driver['surname']}"
+    return DISPLAY_NAMES.get(name, name)
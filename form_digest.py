@@ -0,0 +1,167 @@
+"""
+Per-driver form digest computed from cached race and qualifying results
+
+Stacks every completed round of the season into (rounds x drivers) NumPy
+arrays and derives all drivers' stats in one pass: recent finishes, average
+qualifying and race position, points trend, DNFs, championship position and
+gaps, and the teammate head-to-head in qualifying and the race. Each driver
+prompt gets the digest, so the model starts from accurate numbers instead
+of searching for them.
+"""
+
+import asyncio
+
+import numpy as np
+
+import f1data
+import results_arrays
+
+FORM_ROUNDS = 5  # Recent rounds shown as "last N" results
+DNF_SCORE = 99.0  # Race position used for a DNF in the race head-to-head
+
+
+def column_mean(matrix):
+    """Mean per driver ignoring NaN; NaN where a driver has no values"""
+    present = ~np.isnan(matrix)
+    counts = present.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.nan_to_num(matrix).sum(axis=0) / counts, np.nan)
+
+
+def head_to_head(metric, team):
+    """(drivers x drivers) rounds where the row driver beat the column teammate (lower metric wins)"""
+    n_drivers = team.shape[1]
+    same_team = (team[:, :, None] == team[:, None, :]) & (team[:, :, None] >= 0)
+    same_team &= ~np.eye(n_drivers, dtype=bool)[None, :, :]
+    present = ~np.isnan(metric)
+    compared = same_team & present[:, :, None] & present[:, None, :]
+    wins = (compared & (metric[:, :, None] < metric[:, None, :])).sum(axis=0)
+    return wins, same_team.any(axis=0)
+
+
+def championship(points):
+    """Championship position, total points and the index of the driver one place ahead"""
+    totals = points.sum(axis=0)
+    order = np.argsort(-totals, kind='stable')
+    position = np.empty(len(totals), dtype=np.int32)
+    position[order] = np.arange(1, len(totals) + 1)
+    ahead = order[np.maximum(position - 2, 0)]
+    return position, totals, ahead
+
+
+def season_drivers(names, race_rounds):
+    """names followed by anyone else who scored or started this season, so standings are complete"""
+    seen = set(names)
+    extra = []
+    for race_data in race_rounds:
+        if not f1data.has_results(race_data):
+            continue
+        for result in race_data['races']['results']:
+            name = f1data.driver_display_name(result['driver'])
+            if name not in seen:
+                seen.add(name)
+                extra.append(name)
+    return list(names) + extra
+
+
+def compute_form(names, race_rounds, quali_rounds, first_round=1, last_n=FORM_ROUNDS):
+    """Stats for each driver in names from the season's results, oldest round first"""
+    roster = names
+    names = season_drivers(roster, race_rounds)
+    arrays = results_arrays.build_results_arrays(names, race_rounds, quali_rounds)
+    race_pos, quali_pos, points, dnf, team = (
+        arrays["race"], arrays["quali"], arrays["points"], arrays["dnf"], arrays["team"]
+    )
+    recent = slice(max(0, len(race_rounds) - last_n), None)
+
+    avg_race = column_mean(race_pos[recent])
+    avg_quali = column_mean(quali_pos[recent])
+    starts = (~np.isnan(dnf)).sum(axis=0)
+    recent_starts = (~np.isnan(dnf[recent])).sum(axis=0)
+    dnfs = np.nansum(dnf, axis=0)
+    recent_dnfs = np.nansum(dnf[recent], axis=0)
+    position, totals, ahead = championship(points)
+
+    race_score = np.where(dnf == 1.0, DNF_SCORE, race_pos)
+    quali_wins, teammates = head_to_head(quali_pos, team)
+    race_wins, _ = head_to_head(race_score, team)
+
+    rounds = np.arange(first_round, first_round + len(race_rounds))[recent]
+    rows = []
+    for i, name in enumerate(roster):
+        last_results = []
+        for r, round_num in zip(range(len(race_rounds))[recent], rounds):
+            if np.isnan(dnf[r, i]):
+                last_results.append(f"R{round_num} —")
+            elif dnf[r, i]:
+                last_results.append(f"R{round_num} DNF")
+            else:
+                last_results.append(f"R{round_num} P{int(race_pos[r, i])}")
+
+        rows.append({
+            "driver": name,
+            "starts": int(starts[i]),
+            "lastResults": last_results,
+            "avgQuali": None if np.isnan(avg_quali[i]) else round(float(avg_quali[i]), 1),
+            "avgRace": None if np.isnan(avg_race[i]) else round(float(avg_race[i]), 1),
+            "recentPoints": [int(p) for p in points[recent, i]],
+            "recentPointsPerRace": round(float(points[recent, i].sum() / recent_starts[i]), 1)
+            if recent_starts[i] else 0.0,
+            "seasonPointsPerRace": round(float(totals[i] / starts[i]), 1) if starts[i] else 0.0,
+            "dnfs": int(dnfs[i]),
+            "recentDnfs": int(recent_dnfs[i]),
+            "position": int(position[i]),
+            "points": int(totals[i]),
+            "gapToLeader": int(totals.max() - totals[i]),
+            "gapToAhead": int(totals[ahead[i]] - totals[i]),
+            "driverAhead": names[ahead[i]] if position[i] > 1 else None,
+            "teammates": [
+                {
+                    "driver": names[j],
+                    "quali": [int(quali_wins[i, j]), int(quali_wins[j, i])],
+                    "race": [int(race_wins[i, j]), int(race_wins[j, i])],
+                }
+                for j in np.flatnonzero(teammates[i])
+            ],
+        })
+    return rows
+
+
+def format_digest(row, season, latest_round):
+    """Compact text digest of one driver's form for the driver_preview prompt"""
+    if not row["starts"]:
+        return ""
+
+    lines = [
+        f"RESULTS DATA FOR {row['driver'].upper()} ({season} season after round {latest_round}, "
+        f"from official results):",
+        f"- Last {len(row['lastResults'])} races: {', '.join(row['lastResults'])}",
+        f"- Average over those races: qualifying P{row['avgQuali'] or '-'}, finish P{row['avgRace'] or '-'}; "
+        f"DNFs {row['recentDnfs']} ({row['dnfs']} this season)",
+        f"- Points per race: {', '.join(str(p) for p in row['recentPoints'])} "
+        f"({row['recentPointsPerRace']}/race recently vs {row['seasonPointsPerRace']}/race season average)",
+    ]
+
+    standing = f"- Championship: P{row['position']} with {row['points']} pts"
+    if row["driverAhead"]:
+        standing += (f", {row['gapToLeader']} behind the leader and {row['gapToAhead']} behind "
+                     f"{row['driverAhead']} in P{row['position'] - 1}")
+    lines.append(standing)
+
+    for mate in row["teammates"]:
+        lines.append(f"- Teammate head-to-head vs {mate['driver']}: qualifying {mate['quali'][0]}-{mate['quali'][1]}, "
+                     f"race {mate['race'][0]}-{mate['race'][1]}")
+
+    lines.append("Grand Prix points only (sprints excluded). Use these numbers for results, standings and "
+                 "teammate comparisons instead of searching for them.")
+    return "\n".join(lines)
+
+
+async def build_digests(session, season, latest_round, names, last_n=FORM_ROUNDS):
+    """Digest text per driver name from rounds 1..latest_round of the season"""
+    rounds = range(1, latest_round + 1)
+    race_rounds = await asyncio.gather(*[f1data.get_race_results(session, season, r) for r in rounds])
+    quali_rounds = await asyncio.gather(*[f1data.get_qualifying_results(session, season, r) for r in rounds])
+
+    rows = compute_form(names, race_rounds, quali_rounds, last_n=last_n)
+    return {row["driver"]: format_digest(row, season, latest_round) for row in rows}
@@ -10,26 +10,90 @@ Usage:
   python generate_previews.py --only=standings          # Only generate standings data
   python generate_previews.py --only=drivers            # Only regenerate all driver profiles
   python generate_previews.py --only=driver --driver="Max Verstappen"  # Regenerate single driver
+  python generate_previews.py --only=standings --startup-profile       # Also report import times
+  python generate_previews.py --only=serve --port=8080                 # Run the local regeneration API
+  python generate_previews.py --only=backfill --season=2024            # Archive previews for a whole season
+  python generate_previews.py --only=circuit-history                   # Precompute circuit history for prompts
+  python generate_previews.py --only=sessions                          # Show this weekend's analysed sessions
+  python generate_previews.py --deadline=13:30                         # Full run that must publish by 13:30
+  python generate_previews.py --dry-run                                # Predict tokens and cost without API calls
+  python generate_previews.py --only=pregenerate                       # Pre-generate the next GP off-peak (cron)
+  python generate_previews.py --only=localize --languages=es,de        # Translate preview_data.json per language
+  python generate_previews.py --only=experiment --variants=prompt_variants/top5 --fake-model  # Compare prompts
 """
 
+import time
+_MODULE_IMPORT_STARTED = time.perf_counter()
+
 import asyncio
 import json
 import os
 import sys
-import base64
 import argparse
-from datetime import datetime
-from openai import AsyncOpenAI
+import importlib
+import contextlib
+import contextvars
+from datetime import datetime, timezone
+
+import f1data
+import circuit_breaker
+import job_coordinator
+import stage_budgets
+import deadline_scheduler
+import run_budget
+
+# Heavy dependencies (openai, aiohttp) are imported lazily via lazy_import() so
+# cheap modes like --only=standings don't pay for them at startup
+MODULE_IMPORT_TIME = time.perf_counter() - _MODULE_IMPORT_STARTED
+IMPORT_TIMINGS = {}
 
 # Configuration - Leave None to auto-detect next GP
 CIRCUIT = None  # e.g., "singapore" or None for auto-detect
 RACE_DATE = None  # e.g., "2025-10-05" or None for auto-detect
 SEASON = "2025"
-MODEL = "gpt-5"
-MAX_OUTPUT_TOKENS = 30000
+MODEL = "gpt-5"  # Heavy tier: used for stages that need flagship quality
+MODEL_TIERS = {
+    "heavy": MODEL,
+    "fast": "gpt-5-mini",
+    "nano": "gpt-5-nano",
+}
+# Model tier per stage; unlisted stages use the heavy tier
+STAGE_ROUTES = {
+    "detect_gp": "fast",
+    "race_context": "heavy",
+    "driver_preview": "fast",
+    "top5": "heavy",
+    "underdogs": "fast",
+    "prediction": "heavy",
+    "repair": "fast",
+    "race_context_update": "fast",
+    "driver_update": "fast",
+    "translate": "fast",
+    "translate_batch": "fast",
+}
+ESCALATE_ON_INVALID = True  # Re-run on the heavy tier if a cheaper tier's output fails validation
+MAX_OUTPUT_TOKENS = 30000  # Ceiling for any single call; per-stage budgets are calibrated below it
+TRUNCATION_RETRIES = 2  # Retries with a doubled budget when a response hits max_output_tokens
 ENABLE_WEB_SEARCH = True  # Enable GPT-5 to search for latest race data, weather, results
+ARCHIVE_DB = "archive/previews.sqlite"  # Every written section is indexed here; None to disable
+PREVIEW_HISTORY_RACES = 3  # Previous previews of a driver fed into driver_preview prompts
+RUN_TOKEN_BUDGET = None  # Max input + output tokens per run (--max-tokens); None for no limit
+RUN_COST_BUDGET = None  # Max estimated USD per run (--max-cost); None for no limit
+STAGE_TOKEN_BUDGETS = {}  # Per-stage token ceilings per run, e.g. {"prediction": 150000}
+BASELINE_FRESH_HOURS = 12  # A pre-generated driver preview this recent is reused as is until sessions run
+LANGUAGES = {  # Language code -> name used in translation prompts
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "nl": "Dutch",
+    "pt-BR": "Brazilian Portuguese",
+    "ja": "Japanese",
+}
+LOCALIZE_LANGUAGES = []  # Languages written after a full run and by --only=localize, e.g. ["es", "de"]
+CONTENDER_POSITIONS = 5  # Drivers this high in the standings are scheduled first and never degraded
 
-# Session results (if available) - UPDATE THIS MANUALLY
+# Session results (if available) - UPDATE THIS MANUALLY, or leave None to use the automatic analysis
 # Set to None if session hasn't happened yet
 SESSION_RESULTS = {
     "fp1": None,  # Free Practice 1 results
@@ -42,33 +106,109 @@ SESSION_RESULTS = {
     # "fp1": "P1: Verstappen, P2: Norris, P3: Leclerc. Red flags: 1 (Stroll crash T7). Key: Mercedes struggling with balance.",
     # "qualifying": "P1: Norris (1:29.525), P2: Verstappen (+0.203), P3: Hamilton (+0.421). Out in Q2: Perez, Tsunoda. Conditions: Dry, 28°C track temp.",
 }
+AUTO_SESSION_ANALYSIS = True  # Fill sessions missing from SESSION_RESULTS from OpenF1 lap timing
+SESSION_DUMPS_DIR = None  # e.g. "sessions/" with fp1.json, qualifying.json... dumps to analyse instead of the API
+SESSION_ANALYSIS = {}  # Filled by refresh_session_analysis(); SESSION_RESULTS entries take precedence
 
 drivers_2025 = [
-    {"name": "Max Verstappen", "team": "Red Bull", "number": 1},
-    {"name": "Yuki Tsunoda", "team": "Red Bull", "number": 22},
-    {"name": "Lewis Hamilton", "team": "Ferrari", "number": 44},
-    {"name": "Charles Leclerc", "team": "Ferrari", "number": 16},
-    {"name": "Lando Norris", "team": "McLaren", "number": 4},
-    {"name": "Oscar Piastri", "team": "McLaren", "number": 81},
-    {"name": "George Russell", "team": "Mercedes", "number": 63},
-    {"name": "Kimi Antonelli", "team": "Mercedes", "number": 12},
-    {"name": "Fernando Alonso", "team": "Aston Martin", "number": 14},
-    {"name": "Lance Stroll", "team": "Aston Martin", "number": 18},
-    {"name": "Pierre Gasly", "team": "Alpine", "number": 10},
-    {"name": "Franco Colapinto", "team": "Alpine", "number": 45},
-    {"name": "Esteban Ocon", "team": "Haas", "number": 31},
-    {"name": "Oliver Bearman", "team": "Haas", "number": 87},
-    {"name": "Alex Albon", "team": "Williams", "number": 23},
-    {"name": "Carlos Sainz", "team": "Williams", "number": 55},
-    {"name": "Liam Lawson", "team": "Racing Bulls", "number": 30},
-    {"name": "Isack Hadjar", "team": "Racing Bulls", "number": 6},
-    {"name": "Nico Hulkenberg", "team": "Sauber", "number": 27},
-    {"name": "Gabriel Bortoleto", "team": "Sauber", "number": 5},
+    {"name": "Max Verstappen", "team": "Red Bull", "number": 1, "code": "VER"},
+    {"name": "Yuki Tsunoda", "team": "Red Bull", "number": 22, "code": "TSU"},
+    {"name": "Lewis Hamilton", "team": "Ferrari", "number": 44, "code": "HAM"},
+    {"name": "Charles Leclerc", "team": "Ferrari", "number": 16, "code": "LEC"},
+    {"name": "Lando Norris", "team": "McLaren", "number": 4, "code": "NOR"},
+    {"name": "Oscar Piastri", "team": "McLaren", "number": 81, "code": "PIA"},
+    {"name": "George Russell", "team": "Mercedes", "number": 63, "code": "RUS"},
+    {"name": "Kimi Antonelli", "team": "Mercedes", "number": 12, "code": "ANT"},
+    {"name": "Fernando Alonso", "team": "Aston Martin", "number": 14, "code": "ALO"},
+    {"name": "Lance Stroll", "team": "Aston Martin", "number": 18, "code": "STR"},
+    {"name": "Pierre Gasly", "team": "Alpine", "number": 10, "code": "GAS"},
+    {"name": "Franco Colapinto", "team": "Alpine", "number": 45, "code": "COL"},
+    {"name": "Esteban Ocon", "team": "Haas", "number": 31, "code": "OCO"},
+    {"name": "Oliver Bearman", "team": "Haas", "number": 87, "code": "BEA"},
+    {"name": "Alex Albon", "team": "Williams", "number": 23, "code": "ALB"},
+    {"name": "Carlos Sainz", "team": "Williams", "number": 55, "code": "SAI"},
+    {"name": "Liam Lawson", "team": "Racing Bulls", "number": 30, "code": "LAW"},
+    {"name": "Isack Hadjar", "team": "Racing Bulls", "number": 6, "code": "HAD"},
+    {"name": "Nico Hulkenberg", "team": "Sauber", "number": 27, "code": "HUL"},
+    {"name": "Gabriel Bortoleto", "team": "Sauber", "number": 5, "code": "BOR"},
 ]
+ROSTER = None  # Alias index used to normalise driver names; see current_roster() and roster.py
+
+def lazy_import(module_name):
+    """Import a heavy dependency on first use and record how long it took"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMINGS[module_name] = time.perf_counter() - started
+    return module
+
+
+def create_openai_client(api_key):
+    """Create the async OpenAI client, importing the SDK only when needed"""
+    openai = lazy_import("openai")
+    return openai.AsyncOpenAI(api_key=api_key)
+
+
+@contextlib.asynccontextmanager
+async def http_session_scope(session=None):
+    """Yield the given aiohttp session, or a short-lived one if none was passed"""
+    if session is not None:
+        yield session
+        return
+
+    aiohttp = lazy_import("aiohttp")
+    async with aiohttp.ClientSession() as new_session:
+        yield new_session
+
+
+def current_roster():
+    """The roster driver references are resolved against: the loaded season's, else drivers_2025"""
+    global ROSTER
+    if ROSTER is None:
+        ROSTER = lazy_import("roster").Roster(drivers_2025)
+    return ROSTER
+
+
+async def use_season_roster(season, http_session=None, round_num=None):
+    """Load a season's roster from f1api (see roster.py) and resolve driver references against it"""
+    global ROSTER
+    ROSTER = await lazy_import("roster").load_roster(season, http_session, round_num)
+    print(f"   ✓ {season} roster: {len(ROSTER.lineup)} drivers in the line-up, {len(ROSTER.index)} aliases")
+    return ROSTER
+
+
+def session_results():
+    """SESSION_RESULTS with sessions left as None filled from the automatic session analysis"""
+    return {k: SESSION_RESULTS.get(k) or SESSION_ANALYSIS.get(k) for k in SESSION_RESULTS}
+
+
+async def refresh_session_analysis(race_date, http_session=None):
+    """Analyse the weekend's completed sessions from lap timing into SESSION_ANALYSIS"""
+    if not AUTO_SESSION_ANALYSIS or not race_date or all(SESSION_RESULTS.values()):
+        return
+    try:
+        session_analysis = lazy_import("session_analysis")
+        async with http_session_scope(http_session) as session:
+            analysis = await session_analysis.analyse_weekend(session, race_date, SESSION_DUMPS_DIR)
+    except Exception as e:
+        print(f"   ⚠ Session analysis skipped: {e}")
+        return
+
+    SESSION_ANALYSIS.clear()
+    SESSION_ANALYSIS.update(analysis)
+
+
+async def load_session_context(metadata, http_session=None):
+    """Session context for a preview document, refreshing the automatic analysis first"""
+    await refresh_session_analysis(metadata.get('date'), http_session)
+    return get_session_context()
+
 
 def get_session_context():
     """Build a summary of completed sessions"""
-    completed = {k: v for k, v in SESSION_RESULTS.items() if v is not None}
+    completed = {k: v for k, v in session_results().items() if v is not None}
 
     if not completed:
         return None
@@ -97,6 +237,8 @@ IMPORTANT: Use web search to find the LATEST information about:
 - Any recent practice/qualifying session results if the weekend has started
 - Latest F1 news and developments
 
+{circuitHistory}
+
 Provide a comprehensive race context summary including:
 - Weather forecast (temperature, rain probability, wind)
 - Track characteristics and key corners
@@ -112,16 +254,20 @@ Keep it factual and informative - this will be used to brief preview writers."""
 Driver: {driverName} (#{driverNumber})
 Team: {team}
 
+{formDigest}
+
 IMPORTANT: Use web search to find {driverName}'s:
-- Latest race results and current form (last 3-5 races in {season})
 - Recent news, incidents, or statements
 - Practice/qualifying results if this race weekend has started
+- Latest race results and current form (last 3-5 races in {season}), only if no results data is given above
 
 Race Context:
 {raceContext}
 
 {sessionContext}
 
+{previewHistory}
+
 Consider:
 - Current form and recent results this season (last 5 races)
 - Previous performance at this circuit (if applicable)
@@ -172,6 +318,8 @@ GOOD_RACE: [e.g., "Points finish" or "P6-P8"]""",
 
 {sessionContext}
 
+{simulation}
+
 Consider:
 - Championship stakes (title fight, team battles)
 - Pressure situations (contract year, recent struggles/success)
@@ -202,6 +350,8 @@ Race Context:
 
 {sessionContext}
 
+{simulation}
+
 An underdog story should feature drivers who:
 - Could surprise with performance above expectations
 - Have something significant to prove
@@ -237,6 +387,8 @@ Race Context:
 
 {sessionContext}
 
+{simulation}
+
 Driver Previews:
 {driverPreviews}
 
@@ -251,23 +403,213 @@ Provide predictions in markdown format as a numbered list including:
 5. **Key Battle** - The most exciting head-to-head fight to watch
 6. **Bold Prediction** - One surprising or controversial prediction
 
-Be specific, use driver names, and explain your reasoning based on the preview data."""
+Be specific, use driver names, and explain your reasoning based on the preview data.""",
+
+    "race_context_update": """Update this race weekend context for the {circuit} Grand Prix on {raceDate} in {season}. It was written on {baselineDate}.
+
+IMPORTANT: Use web search ONLY for what may have changed since {baselineDate}:
+- Latest weather forecast for the race weekend
+- Practice/qualifying results if the weekend has started
+- F1 news since {baselineDate}
+
+{sessionContext}
+
+Keep track characteristics, circuit history, safety car statistics and strategy considerations as they are. Return the complete updated context in the same structure.
+
+EXISTING RACE CONTEXT:
+{raceContext}""",
+
+    "driver_update": """Update this "what to look for with {driverName}" preview for the upcoming F1 {circuit} GP. It was written on {baselineDate}, before the race weekend.
+
+Driver: {driverName} (#{driverNumber})
+Team: {team}
+
+IMPORTANT: Use web search only for {driverName}'s news, incidents or statements since {baselineDate}.
+
+Race Context:
+{raceContext}
+
+{sessionContext}
+
+Revise only what the news and any session results change (form, situation, brief, what to watch, stakes and result expectations) and keep the rest as it is.
+- **IF SESSION RESULTS PROVIDED**: How this driver performed in completed sessions (practice/qualifying) and what it means for the race
+
+Return the complete preview in EXACTLY the same format as the existing one (FULL: with the same markdown sections, then STAKES, PERFECT_QUALI, PERFECT_RACE, GOOD_QUALI and GOOD_RACE).
+
+EXISTING PREVIEW:
+{existingPreview}""",
+
+    "repair": """The response below was written for the task that follows it, but it does not match the output format the task requires.
+
+Rewrite the response so it follows the task's format instructions EXACTLY (labels, numbering, order and markdown sections). Keep the content and facts of the response; do not add new information or commentary.
+
+RESPONSE TO REPAIR:
+{response}
+
+ORIGINAL TASK:
+{originalPrompt}"""
 }
 
 
-async def call_openai(client, prompt, enable_search=True):
-    """Call OpenAI Responses API asynchronously"""
-    request_body = {
-        "model": MODEL,
-        "input": prompt,
-        "max_output_tokens": MAX_OUTPUT_TOKENS,
-    }
+# Usage meters active in the current task. call_openai adds each response's
+# token usage to all of them, e.g. a run-wide total and a per-race total.
+_usage_meters = contextvars.ContextVar("usage_meters", default=())
+_api_semaphore = None
 
-    # Enable web search for GPT-5
-    if enable_search and ENABLE_WEB_SEARCH and MODEL.startswith("gpt-5"):
-        request_body["tools"] = [{"type": "web_search"}]
 
-    response = await client.responses.create(**request_body)
+def new_usage_meter():
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+
+@contextlib.contextmanager
+def track_usage(meter):
+    """Record the token usage of every call_openai made inside the block into meter"""
+    token = _usage_meters.set(_usage_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _usage_meters.reset(token)
+
+
+def record_usage(response):
+    usage = getattr(response, "usage", None)
+    for meter in _usage_meters.get():
+        meter["calls"] += 1
+        if usage is not None:
+            meter["input_tokens"] += usage.input_tokens or 0
+            meter["output_tokens"] += usage.output_tokens or 0
+
+
+def set_api_concurrency(limit):
+    """Cap the number of OpenAI requests in flight across all concurrent pipelines"""
+    global _api_semaphore
+    _api_semaphore = asyncio.Semaphore(limit) if limit else None
+
+
+def api_slot():
+    """Context manager holding one of the set_api_concurrency() request slots, if a limit is set"""
+    return _api_semaphore or contextlib.nullcontext()
+
+
+STAGE_BUDGETS = stage_budgets.StageBudgets(ceiling=MAX_OUTPUT_TOKENS)
+RUN_BUDGET = run_budget.RunBudget(
+    STAGE_BUDGETS, RUN_TOKEN_BUDGET, RUN_COST_BUDGET, STAGE_TOKEN_BUDGETS,
+    cheaper_tiers=deadline_scheduler.DEGRADE_TIERS
+)
+TIER_STATS = {}
+ROUTING_EVENTS = {"repairs": 0, "escalations": 0}
+_job_runs = contextvars.ContextVar("job_runs", default=None)
+
+
+def current_run():
+    """Budget, tier stats and routing events calls count against: the service job's, else the process's"""
+    return _job_runs.get() or {"budget": RUN_BUDGET, "tiers": TIER_STATS, "routing": ROUTING_EVENTS}
+
+
+@contextlib.contextmanager
+def job_run():
+    """Count the calls made inside the block against a fresh run budget and tier stats
+
+    The service wraps each job in this, so RUN_TOKEN_BUDGET / RUN_COST_BUDGET
+    cap one job rather than the lifetime of the daemon. Yields the job's
+    {"budget", "tiers", "routing"}.
+    """
+    budget = run_budget.RunBudget(
+        STAGE_BUDGETS, RUN_BUDGET.max_tokens, RUN_BUDGET.max_cost, RUN_BUDGET.stage_tokens,
+        cheaper_tiers=RUN_BUDGET.cheaper_tiers, dry_run=RUN_BUDGET.dry_run
+    )
+    run = {"budget": budget, "tiers": {}, "routing": {"repairs": 0, "escalations": 0}}
+    token = _job_runs.set(run)
+    try:
+        yield run
+    finally:
+        _job_runs.reset(token)
+
+
+def record_tier_call(tier, model, response, latency):
+    stats = current_run()["tiers"].setdefault(tier, {
+        "model": model, "calls": 0, "input_tokens": 0, "output_tokens": 0, "latencies": []
+    })
+    usage = getattr(response, "usage", None)
+    stats["calls"] += 1
+    stats["latencies"].append(latency)
+    if usage is not None:
+        stats["input_tokens"] += usage.input_tokens or 0
+        stats["output_tokens"] += usage.output_tokens or 0
+
+
+async def call_model(client, prompt, tier, enable_search=True, stage="default"):
+    """Make one Responses API call on a tier's model
+
+    The output budget and reasoning effort come from the stage's calibrated
+    settings. Requests go through the "openai" circuit breaker, so once the
+    API is failing calls raise circuit_breaker.CircuitOpen at once. The run
+    budget admits the call first and may defer it, move it to a cheaper tier
+    or refuse it (run_budget.BudgetExceeded). A response truncated by
+    max_output_tokens is retried with a doubled budget, up to
+    MAX_OUTPUT_TOKENS, while the retry fits the run budget. In a dry run the
+    call is only estimated.
+    """
+    run = current_run()["budget"]
+
+    def search_enabled(model):
+        return enable_search and ENABLE_WEB_SEARCH and model.startswith("gpt-5")
+
+    def estimate_for(candidate_tier, max_output_tokens=None):
+        model = MODEL_TIERS.get(candidate_tier, MODEL)
+        budget = max_output_tokens or STAGE_BUDGETS.settings(stage, model)["max_output_tokens"]
+        return run.estimate(stage, model, prompt, budget, search_enabled(model))
+
+    tier, estimate, reservation = await run.admit(stage, tier, estimate_for)
+    model = MODEL_TIERS.get(tier, MODEL)
+    settings = STAGE_BUDGETS.settings(stage, model)
+    max_output_tokens = settings["max_output_tokens"]
+
+    try:
+        if run.dry_run:
+            run.account(stage, model, estimate["input_tokens"], estimate["output_tokens"], estimate["searches"])
+            return run_budget.dry_run_text(stage, estimate["output_tokens"])
+
+        for attempt in range(TRUNCATION_RETRIES + 1):
+            request_body = {
+                "model": model,
+                "input": prompt,
+                "max_output_tokens": max_output_tokens,
+            }
+
+            # Enable web search for GPT-5
+            if search_enabled(model):
+                request_body["tools"] = [{"type": "web_search"}]
+
+            if settings["reasoning_effort"] and model.startswith(("gpt-5", "o")):
+                request_body["reasoning"] = {"effort": settings["reasoning_effort"]}
+
+            started = time.perf_counter()
+            async with api_slot():
+                response = await circuit_breaker.breaker("openai").call(client.responses.create, **request_body)
+            latency = time.perf_counter() - started
+            web_searches = run_budget.count_web_searches(response)
+            record_usage(response)
+            record_tier_call(tier, model, response, latency)
+            entry = STAGE_BUDGETS.record(
+                stage, model, response, max_output_tokens, latency,
+                prompt_tokens=run_budget.prompt_tokens(prompt), web_searches=web_searches
+            )
+            run.account(
+                stage, model, entry["input_tokens"] or 0, entry["output_tokens"] or 0, web_searches
+            )
+
+            if not stage_budgets.is_truncated(response) or max_output_tokens >= MAX_OUTPUT_TOKENS:
+                break
+            if attempt < TRUNCATION_RETRIES:
+                retry_budget = min(MAX_OUTPUT_TOKENS, max_output_tokens * 2)
+                if run.limited() and not run.fits(stage, estimate_for(tier, retry_budget)):
+                    print(f"   ⚠ {stage} response truncated, retry skipped to stay within the run budget")
+                    break
+                print(f"   ↻ {stage} response truncated at {max_output_tokens} output tokens, retrying with {retry_budget}")
+                max_output_tokens = retry_budget
+    finally:
+        await run.release(reservation)
 
     # Extract text from response
     for item in response.output:
@@ -279,6 +621,57 @@ async def call_openai(client, prompt, enable_search=True):
     raise Exception("No text found in response")
 
 
+async def call_openai(client, prompt, enable_search=True, stage="default", validate=None, tier=None):
+    """Call OpenAI Responses API asynchronously on the model tier routed for this stage
+
+    tier overrides the routed tier (e.g. the deadline scheduler degrading a
+    low-priority item). If validate(text) rejects the output, a cheap repair
+    call reformats it; if that also fails and the stage ran below the heavy
+    tier, the original prompt is re-run on the heavy tier (ESCALATE_ON_INVALID).
+    """
+    tier = tier or STAGE_ROUTES.get(stage, "heavy")
+    text = await call_model(client, prompt, tier, enable_search, stage)
+    if validate is None or RUN_BUDGET.dry_run or validate(text):
+        return text
+
+    print(f"   ⚠ {stage} output from {tier} tier failed validation, repairing format")
+    current_run()["routing"]["repairs"] += 1
+    repair_prompt = prompts["repair"].format(response=text, originalPrompt=prompt)
+    repaired = await call_model(client, repair_prompt, STAGE_ROUTES.get("repair", "heavy"), False, "repair")
+    if validate(repaired):
+        return repaired
+
+    if ESCALATE_ON_INVALID and tier != "heavy":
+        print(f"   ⇧ Escalating {stage} to the heavy tier ({MODEL_TIERS['heavy']})")
+        current_run()["routing"]["escalations"] += 1
+        return await call_model(client, prompt, "heavy", enable_search, stage)
+
+    return text
+
+
+def tier_summary(tiers):
+    """Per-tier call counts, latency percentiles and tokens, JSON-serialisable"""
+    return {
+        tier: {
+            "model": stats["model"], "calls": stats["calls"],
+            "latencyP50": round(stage_budgets.percentile(stats["latencies"], 0.5), 3),
+            "latencyP95": round(stage_budgets.percentile(stats["latencies"], 0.95), 3),
+            "inputTokens": stats["input_tokens"], "outputTokens": stats["output_tokens"],
+        }
+        for tier, stats in tiers.items()
+    }
+
+
+def print_tier_summary():
+    """Per-tier call counts, latency and tokens for this run"""
+    print("\n📊 Model tier summary:")
+    for tier, stats in tier_summary(TIER_STATS).items():
+        print(f"   {tier:<6} {stats['model']:<12} {stats['calls']:>3} calls, "
+              f"latency p50 {stats['latencyP50']:.1f}s / p95 {stats['latencyP95']:.1f}s, "
+              f"tokens {stats['inputTokens']} in / {stats['outputTokens']} out")
+    print(f"   repairs: {ROUTING_EVENTS['repairs']}, escalations to heavy: {ROUTING_EVENTS['escalations']}")
+
+
 def clean_urls(text):
     """Remove all URLs and URL markdown from text"""
     import re
@@ -324,6 +717,12 @@ def parse_driver_preview(text):
     return preview
 
 
+def is_valid_driver_preview(text):
+    """Driver preview output has the FULL section and result expectations"""
+    preview = parse_driver_preview(text)
+    return bool(preview['full'] and preview['perfect_race'] and preview['good_race'])
+
+
 def parse_top5(text):
     """Parse top 5 text into list of dicts"""
     import re
@@ -343,16 +742,20 @@ def parse_top5(text):
         reason = match.group(3).strip()
         stakes = match.group(4).strip()
 
-        top5.append({
+        top5.append(current_roster().tag({
             "rank": rank,
             "driver": driver,
             "reason": reason,
             "stakes": stakes
-        })
+        }))
 
     return sorted(top5, key=lambda x: x['rank'])
 
 
+def is_valid_top5(text):
+    return len(parse_top5(text)) == 5
+
+
 def parse_underdogs(text):
     """Parse underdogs text into list of dicts"""
     import re
@@ -372,30 +775,52 @@ def parse_underdogs(text):
         story = match.group(3).strip()
         surprise_factor = match.group(4).strip()
 
-        underdogs.append({
+        underdogs.append(current_roster().tag({
             "driver": driver,
             "title": title,
             "story": story,
             "surprise_factor": surprise_factor
-        })
+        }))
 
     return underdogs
 
 
-async def generate_driver_preview_async(client, driver, circuit, race_context, session_context, season):
+def is_valid_underdogs(text):
+    return len(parse_underdogs(text)) == 3
+
+
+def is_valid_gp_detection(text):
+    """GP detection output contains a JSON object with circuit and race_date"""
+    import re
+    json_match = re.search(r'\{[^{}]*\}', text)
+    if not json_match:
+        return False
+    try:
+        data = json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return False
+    return bool(data.get("circuit") and data.get("race_date"))
+
+
+async def generate_driver_preview_async(client, driver, circuit, race_context, session_context, season,
+                                        race_date=None, form_digest="", tier=None):
     """Generate a single driver preview asynchronously"""
     driver_prompt = prompts["driver_preview"].format(
         driverName=driver["name"],
         driverNumber=driver["number"],
         team=driver["team"],
+        formDigest=form_digest,
         circuit=circuit,
         season=season,
         raceContext=race_context,
-        sessionContext=session_context or ""
+        sessionContext=session_context or "",
+        previewHistory=get_preview_history(driver["name"], race_date)
     )
 
     try:
-        preview_text = await call_openai(client, driver_prompt)
+        preview_text = await call_openai(
+            client, driver_prompt, stage="driver_preview", validate=is_valid_driver_preview, tier=tier
+        )
         preview = parse_driver_preview(preview_text)
         return driver["name"], preview, None
     except Exception as e:
@@ -406,6 +831,57 @@ async def generate_driver_preview_async(client, driver, circuit, race_context, s
         }, str(e)
 
 
+def format_driver_preview(preview):
+    """A parsed driver preview back in the FULL/STAKES/... text format of the driver_preview prompt"""
+    return (f"FULL: {preview.get('full', '')}\n\n"
+            f"STAKES: {preview.get('stakes_level', 'medium')}\n\n"
+            f"PERFECT_QUALI: {preview.get('perfect_quali', '')}\n"
+            f"PERFECT_RACE: {preview.get('perfect_race', '')}\n"
+            f"GOOD_QUALI: {preview.get('good_quali', '')}\n"
+            f"GOOD_RACE: {preview.get('good_race', '')}")
+
+
+async def generate_driver_update_async(client, driver, baseline_preview, baseline_date, circuit, race_context,
+                                       session_context, tier=None):
+    """Update a pre-generated driver preview for news and session results"""
+    update_prompt = prompts["driver_update"].format(
+        driverName=driver["name"],
+        driverNumber=driver["number"],
+        team=driver["team"],
+        circuit=circuit,
+        baselineDate=baseline_date,
+        raceContext=race_context,
+        sessionContext=session_context or "",
+        existingPreview=format_driver_preview(baseline_preview)
+    )
+
+    try:
+        preview_text = await call_openai(
+            client, update_prompt, stage="driver_update", validate=is_valid_driver_preview, tier=tier
+        )
+        return driver["name"], parse_driver_preview(preview_text), None
+    except Exception as e:
+        return driver["name"], {
+            "tldr": "Error generating preview",
+            "full": str(e),
+            "stakes_level": "medium"
+        }, str(e)
+
+
+async def next_gp_from_calendar(http_session=None):
+    """(circuit, race_date, gp_name) of the next race from the cached f1api calendar, or None"""
+    try:
+        async with http_session_scope(http_session) as session:
+            current = await f1data.get_current_season(session)
+    except Exception as e:
+        print(f"   ⚠ Could not read the calendar: {e}")
+        return None
+    race = f1data.next_race(current['races']) if current else None
+    if race is None:
+        return None
+    return f1data.circuit_name(race), f1data.race_day(race), race.get('raceName')
+
+
 async def detect_next_gp(client):
     """Auto-detect the next Grand Prix using web search"""
     print("\n🔍 Auto-detecting next Grand Prix...")
@@ -421,7 +897,7 @@ async def detect_next_gp(client):
 
     Use today's date to determine which is the NEXT upcoming race."""
 
-    response = await call_openai(client, prompt)
+    response = await call_openai(client, prompt, stage="detect_gp", validate=is_valid_gp_detection)
 
     try:
         # Try to extract JSON from response
@@ -463,7 +939,7 @@ No text or logos - pure visual imagery with dark tones."""
             image_url = response.data[0].url
 
             # Download the image
-            import aiohttp
+            aiohttp = lazy_import("aiohttp")
             async with aiohttp.ClientSession() as session:
                 async with session.get(image_url) as img_response:
                     if img_response.status == 200:
@@ -483,6 +959,10 @@ No text or logos - pure visual imagery with dark tones."""
         return False
 
 
+class GenerationFailed(Exception):
+    """A targeted regeneration that left its section unchanged (no input data, upstream down, generation error)"""
+
+
 def load_existing_data(json_file="preview_data.json"):
     """Load existing preview data from JSON file"""
     if not os.path.exists(json_file):
@@ -496,6 +976,248 @@ def load_existing_data(json_file="preview_data.json"):
     return data
 
 
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive advisory lock on lock_path for the duration of the block"""
+    import fcntl
+
+    with open(lock_path, 'a+') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield lock_file
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def save_sections(json_file, sections, replace=False, stale=None):
+    """Merge sections into the preview JSON under a file lock and write it atomically
+
+    Keys of `sections` are top-level section names, or (section, key) tuples to
+    update a single entry such as ('drivers', 'Max Verstappen'). The document is
+    re-read while holding the lock so concurrent writers never drop each other's
+    sections. With replace=True the document is replaced wholesale. Otherwise
+    stale marks of the written sections are cleared and `stale` marks (see
+    mark_stale) are recorded in metadata. A dry run writes nothing.
+    """
+    if RUN_BUDGET.dry_run:
+        print(f"   ℹ Dry run: {json_file} left unchanged")
+        return
+
+    with file_lock(f"{json_file}.lock"):
+        data = {}
+        if not replace and os.path.exists(json_file):
+            with open(json_file, 'r') as f:
+                data = json.load(f)
+
+        for key, value in sections.items():
+            if isinstance(key, tuple):
+                section, entry = key
+                data.setdefault(section, {})[entry] = value
+            else:
+                data[key] = value
+        if not replace:
+            update_stale_marks(data, sections, stale or {})
+
+        tmp_file = f"{json_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, json_file)
+
+    archive_sections(data, list(sections))
+    return data
+
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+
+def mark_stale(stale, section, as_of, reason, entry=None):
+    """Record that a section (or one entry, e.g. a driver) holds last known good data as of as_of"""
+    info = {"asOf": as_of, "reason": reason}
+    if entry is None:
+        stale[section] = info
+    else:
+        stale.setdefault(section, {})[entry] = info
+    print(f"   ⚠ {entry or section}: using data as of {as_of} ({reason})")
+
+
+def previous_as_of(json_file, document, section, entry=None):
+    """When a section of an existing preview document was last generated fresh"""
+    info = document.get('metadata', {}).get('stale', {}).get(section)
+    if entry is not None:
+        info = (info or {}).get(entry)
+    if info and info.get('asOf'):
+        return info['asOf']
+    return iso_time(os.path.getmtime(json_file))
+
+
+def update_stale_marks(data, sections, stale):
+    """Clear metadata.stale for freshly written sections and add the new stale marks"""
+    metadata = data.setdefault('metadata', {})
+    marks = metadata.get('stale', {})
+    for key in sections:
+        if isinstance(key, tuple):
+            section, entry = key
+            if isinstance(marks.get(section), dict) and 'asOf' not in marks[section]:
+                marks[section].pop(entry, None)
+                if not marks[section]:
+                    del marks[section]
+        else:
+            marks.pop(key, None)
+
+    for section, info in stale.items():
+        if 'asOf' in info:
+            marks[section] = info
+        else:
+            marks.setdefault(section, {}).update(info)
+
+    if marks:
+        metadata['stale'] = marks
+    else:
+        metadata.pop('stale', None)
+
+
+_archives = {}
+
+
+def saved_to(json_file):
+    """How a success message should say where results went: nowhere in a dry run"""
+    return "not saved (dry run)" if RUN_BUDGET.dry_run else f"saved to {json_file}"
+
+
+def get_archive():
+    """Shared PreviewArchive for ARCHIVE_DB, opened on first use"""
+    if ARCHIVE_DB not in _archives:
+        preview_archive = lazy_import("preview_archive")
+        _archives[ARCHIVE_DB] = preview_archive.PreviewArchive(ARCHIVE_DB)
+    return _archives[ARCHIVE_DB]
+
+
+def archive_sections(data, sections):
+    """Index freshly written sections in the preview archive; never fails the write"""
+    if not ARCHIVE_DB:
+        return
+    try:
+        get_archive().add_document(data, sections)
+    except Exception as e:
+        print(f"   ⚠ Could not archive sections: {e}")
+
+
+def get_preview_history(driver_name, race_date):
+    """Our previous previews of a driver as compact prompt context, or "" if none"""
+    if not ARCHIVE_DB or not PREVIEW_HISTORY_RACES or not race_date or RUN_BUDGET.dry_run:
+        return ""
+    try:
+        history = get_archive().driver_history(driver_name, before_date=race_date, limit=PREVIEW_HISTORY_RACES)
+    except Exception as e:
+        print(f"   ⚠ Could not read preview history for {driver_name}: {e}")
+        return ""
+
+    if not history:
+        return ""
+    return (f"OUR PREVIOUS PREVIEWS OF {driver_name.upper()} "
+            f"(compare these expectations with how those races actually went):\n{history}")
+
+
+def get_circuit_history(circuit, season, race_date=None):
+    """The circuit's history in the precomputed index up to (excluding) race_date, or None if not built"""
+    try:
+        circuit_history = lazy_import("circuit_history")
+        index = circuit_history.load_index(season)
+        history = circuit_history.find_circuit(index, circuit) if index else None
+        return circuit_history.before(history, race_date) if history else None
+    except Exception as e:
+        print(f"   ⚠ Could not read circuit history for {circuit}: {e}")
+        return None
+
+
+def get_circuit_history_context(history):
+    """Compact prompt digest of a circuit's history, or "" if none"""
+    if not history:
+        return ""
+    return lazy_import("circuit_history").format_digest(history)
+
+
+def circuit_safety_car_rate(history):
+    """Observed safety cars per race at the circuit, or None to use the simulator default"""
+    return history["summary"].get("safetyCarsPerRace") if history else None
+
+
+async def latest_completed_round(session, latest_round=None):
+    """latest_round if given, else the number of completed rounds in the current season"""
+    if latest_round is not None:
+        return latest_round
+    current_data = await f1data.get_current_season(session)
+    return f1data.completed_rounds(current_data['races']) if current_data else 0
+
+
+def previous_round(metadata):
+    """Last round before the preview's race, or None to use the latest completed round"""
+    return metadata['round'] - 1 if metadata.get('round') else None
+
+
+async def compute_form_digests(season, latest_round, driver_names, http_session=None):
+    """Results-based form digest text per driver name, or {} if unavailable"""
+    try:
+        form_digest = lazy_import("form_digest")
+        async with http_session_scope(http_session) as session:
+            latest_round = await latest_completed_round(session, latest_round)
+            if not latest_round:
+                return {}
+            digests = await form_digest.build_digests(session, season, latest_round, driver_names)
+    except Exception as e:
+        print(f"   ⚠ Form digests skipped: {e}")
+        return {}
+
+    print(f"   ✓ Form digests computed for {len([d for d in digests.values() if d])} drivers")
+    return digests
+
+
+async def compute_simulation(season, latest_round, driver_names, qualifying_text=None, http_session=None,
+                             safety_car_rate=None):
+    """Monte Carlo win/podium/points probabilities for the upcoming race, or None if unavailable"""
+    try:
+        race_simulator = lazy_import("race_simulator")
+        async with http_session_scope(http_session) as session:
+            latest_round = await latest_completed_round(session, latest_round)
+            if not latest_round:
+                return None
+            simulation = await race_simulator.run_simulation(
+                session, season, latest_round, driver_names, qualifying_text,
+                safety_car_rate=race_simulator.SAFETY_CAR_RATE if safety_car_rate is None else safety_car_rate
+            )
+    except Exception as e:
+        print(f"   ⚠ Race simulation skipped: {e}")
+        return None
+    if simulation is None:
+        print("   ⚠ Race simulation skipped: no race results to simulate from")
+        return None
+
+    for row in simulation["drivers"]:
+        current_roster().tag(row)
+    print(f"   ✓ Simulated {simulation['simulations']:,} races in {simulation['elapsedSeconds']}s")
+    return simulation
+
+
+def get_simulation_context(simulation):
+    """Compact prompt table of the simulation's win/podium/points probabilities"""
+    if not simulation or not simulation.get("drivers"):
+        return ""
+
+    grid = "actual qualifying grid" if simulation.get("gridFromQualifying") else "simulated grid"
+    lines = [
+        f"MONTE CARLO SIMULATION ({simulation['simulations']:,} races from recent results, {grid}, "
+        f"reliability and safety-car variance):",
+        "Driver | Win | Podium | Points finish | Avg finish",
+    ]
+    for row in simulation["drivers"]:
+        lines.append(
+            f"{row['driver']} | {row['win']:.1%} | {row['podium']:.1%} | {row['points']:.1%} | {row['meanFinish']:.1f}"
+        )
+    lines.append("Use these probabilities to ground your picks and say why when you deviate from them.")
+    return "\n".join(lines)
+
+
 def get_preview_summary(preview):
     """Extract a brief summary from the full preview text"""
     import re
@@ -511,358 +1233,349 @@ def get_preview_summary(preview):
     return full_text[:200].strip() if full_text else ""
 
 
-async def generate_prediction_only(client, json_file="preview_data.json"):
+def format_preview_summaries(driver_previews):
+    """Driver previews as readable text for the top 5 and underdogs prompts"""
+    return "\n\n".join([
+        f"{name}:\n{get_preview_summary(preview)}"
+        for name, preview in driver_previews.items()
+    ])
+
+
+def format_full_previews(driver_previews):
+    """Full driver previews with result expectations for the prediction prompt"""
+    return "\n\n".join([
+        f"**{name}** ({preview.get('stakes_level', 'medium')} stakes):\n{preview.get('full', '')}\n\nPerfect Result: Quali {preview.get('perfect_quali', 'N/A')}, Race {preview.get('perfect_race', 'N/A')}\nGood Result: Quali {preview.get('good_quali', 'N/A')}, Race {preview.get('good_race', 'N/A')}"
+        for name, preview in driver_previews.items()
+    ])
+
+
+async def generate_prediction_only(client, json_file="preview_data.json", http_session=None):
     """Generate only race prediction using existing data"""
     print("\n📊 Generating race prediction from existing data...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
+        raise GenerationFailed(f"{json_file} not found")
 
     # Get session context
-    session_context = get_session_context()
+    session_context = await load_session_context(data['metadata'], http_session)
+    simulation_context = get_simulation_context(data.get('simulation'))
 
     # Format driver previews
-    driver_previews_text = "\n\n".join([
-        f"**{name}** ({data['drivers'][name].get('stakes_level', 'medium')} stakes):\n{preview.get('full', '')}\n\nPerfect Result: Quali {preview.get('perfect_quali', 'N/A')}, Race {preview.get('perfect_race', 'N/A')}\nGood Result: Quali {preview.get('good_quali', 'N/A')}, Race {preview.get('good_race', 'N/A')}"
-        for name, preview in data['drivers'].items()
-    ])
+    driver_previews_text = format_full_previews(data['drivers'])
 
     prediction_prompt = prompts["prediction"].format(
         circuit=data['metadata']['circuit'],
         raceDate=data['metadata']['date'],
         sessionContext=session_context or "",
+        simulation=simulation_context,
         driverPreviews=driver_previews_text,
         raceContext=data['raceContext']
     )
 
-    prediction_text = await call_openai(client, prediction_prompt)
+    prediction_text = await call_openai(client, prediction_prompt, stage="prediction")
     prediction = clean_urls(prediction_text)
 
-    # Update data
-    data['prediction'] = prediction
-
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Merge only this section into the shared document
+    save_sections(json_file, {'prediction': prediction})
 
-    print(f"   ✓ Race prediction generated and saved to {json_file}")
+    print(f"   ✓ Race prediction generated and {saved_to(json_file)}")
 
 
-async def generate_top5_only(client, json_file="preview_data.json"):
+async def generate_top5_only(client, json_file="preview_data.json", http_session=None):
     """Generate only top 5 using existing data"""
     print("\n🏆 Generating top 5 analysis from existing data...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
+        raise GenerationFailed(f"{json_file} not found")
 
     # Get session context
-    session_context = get_session_context()
+    session_context = await load_session_context(data['metadata'], http_session)
+    simulation_context = get_simulation_context(data.get('simulation'))
 
     # Format driver previews
-    driver_previews_text = "\n\n".join([
-        f"{name}:\n{get_preview_summary(preview)}"
-        for name, preview in data['drivers'].items()
-    ])
+    driver_previews_text = format_preview_summaries(data['drivers'])
 
     top5_prompt = prompts["top5"].format(
         sessionContext=session_context or "",
+        simulation=simulation_context,
         driverPreviews=driver_previews_text,
         raceContext=data['raceContext']
     )
 
-    top5_text = await call_openai(client, top5_prompt)
+    top5_text = await call_openai(client, top5_prompt, stage="top5", validate=is_valid_top5)
     top5 = parse_top5(top5_text)
 
-    # Update data
-    data['top5'] = top5
-
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Merge only this section into the shared document
+    save_sections(json_file, {'top5': top5})
 
-    print(f"   ✓ Top 5 analysis generated and saved to {json_file}")
+    print(f"   ✓ Top 5 analysis generated and {saved_to(json_file)}")
 
 
-async def generate_underdogs_only(client, json_file="preview_data.json"):
+async def generate_underdogs_only(client, json_file="preview_data.json", http_session=None):
     """Generate only underdogs using existing data"""
     print("\n⚡ Generating underdog stories from existing data...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
+        raise GenerationFailed(f"{json_file} not found")
 
     # Get session context
-    session_context = get_session_context()
+    session_context = await load_session_context(data['metadata'], http_session)
+    simulation_context = get_simulation_context(data.get('simulation'))
 
     # Format driver previews
-    driver_previews_text = "\n\n".join([
-        f"{name}:\n{get_preview_summary(preview)}"
-        for name, preview in data['drivers'].items()
-    ])
+    driver_previews_text = format_preview_summaries(data['drivers'])
 
     underdogs_prompt = prompts["underdogs"].format(
         sessionContext=session_context or "",
+        simulation=simulation_context,
         driverPreviews=driver_previews_text,
         raceContext=data['raceContext']
     )
 
-    underdogs_text = await call_openai(client, underdogs_prompt)
+    underdogs_text = await call_openai(client, underdogs_prompt, stage="underdogs", validate=is_valid_underdogs)
     underdogs = parse_underdogs(underdogs_text)
 
-    # Update data
-    data['underdogs'] = underdogs
+    # Merge only this section into the shared document
+    save_sections(json_file, {'underdogs': underdogs})
+
+    print(f"   ✓ Underdog stories generated and {saved_to(json_file)}")
+
+
+async def fetch_standings(session, season, latest_round=None):
+    """Build cumulative championship positions per round from f1api race results
 
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    latest_round defaults to the number of completed rounds in the current
+    season. Returns None if the season data or results couldn't be fetched.
+    """
+    if latest_round is None:
+        current_data = await f1data.get_current_season(session)
+        if not current_data:
+            print(f"   ✗ Failed to fetch current season data")
+            return None
+        latest_round = f1data.completed_rounds(current_data['races'])
+
+    print(f"   ℹ Found {latest_round} completed rounds")
+
+    # Fetch every round concurrently; finished rounds come from the local cache
+    race_results = await asyncio.gather(*[
+        f1data.get_race_results(session, season, round_num)
+        for round_num in range(1, latest_round + 1)
+    ])
 
-    print(f"   ✓ Underdog stories generated and saved to {json_file}")
+    # Calculate cumulative points for each round
+    driver_points = {}
+    standings_data = {}
+
+    for round_num, race_data in enumerate(race_results, start=1):
+        if not f1data.has_results(race_data):
+            continue
+
+        for result in race_data['races']['results']:
+            display_name = f1data.driver_display_name(result['driver'])
+
+            if display_name not in driver_points:
+                driver_points[display_name] = 0
+
+            driver_points[display_name] += result.get('points', 0)
+
+            if display_name not in standings_data:
+                standings_data[display_name] = {
+                    'driverId': lazy_import("roster").driver_id(display_name),
+                    'positions': [],
+                    'team': result['team']['teamName'],
+                    'number': result['driver']['number']
+                }
+
+        # Calculate standings for this round
+        round_standings = sorted(
+            [{'name': name, 'points': points} for name, points in driver_points.items()],
+            key=lambda x: x['points'],
+            reverse=True
+        )
+
+        # Assign positions
+        for idx, standing in enumerate(round_standings):
+            if standing['name'] in standings_data:
+                standings_data[standing['name']]['positions'].append({
+                    'round': round_num,
+                    'position': idx + 1
+                })
+
+        print(f"   ✓ Processed round {round_num}/{latest_round}")
+
+    if latest_round and not standings_data:
+        print(f"   ✗ No race results available for {season}")
+        return None
+
+    return {
+        'standingsData': standings_data,
+        'latestRound': latest_round
+    }
 
 
-async def generate_standings_only(json_file="preview_data.json"):
+async def generate_standings_only(json_file="preview_data.json", http_session=None):
     """Generate only standings data using F1 API"""
     print("\n📈 Generating standings data from F1 API...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
-
-    import aiohttp
+        raise GenerationFailed(f"{json_file} not found")
 
-    # Determine current season and latest round
     season = data['metadata'].get('season', SEASON)
 
-    async with aiohttp.ClientSession() as session:
-        # Get current season data
-        async with session.get(f'https://f1api.dev/api/current') as response:
-            if response.status != 200:
-                print(f"   ✗ Failed to fetch current season data")
-                return
-
-            current_data = await response.json()
-            completed_races = [r for r in current_data['races'] if r.get('winner') is not None]
-            latest_round = len(completed_races)
-
-        print(f"   ℹ Found {latest_round} completed rounds")
-
-        # Calculate cumulative points for each round
-        driver_points = {}
-        standings_data = {}
-
-        for round_num in range(1, latest_round + 1):
-            async with session.get(f'https://f1api.dev/api/{season}/{round_num}/race') as response:
-                if response.status != 200:
-                    continue
-
-                race_data = await response.json()
-
-                if race_data.get('races', {}).get('results'):
-                    for result in race_data['races']['results']:
-                        driver_name = f"{result['driver']['name']} {result['driver']['surname']}"
-                        display_name = 'Kimi Antonelli' if driver_name == 'Andrea Kimi Antonelli' else driver_name
-
-                        if display_name not in driver_points:
-                            driver_points[display_name] = 0
-
-                        driver_points[display_name] += result.get('points', 0)
-
-                        if display_name not in standings_data:
-                            standings_data[display_name] = {
-                                'positions': [],
-                                'team': result['team']['teamName'],
-                                'number': result['driver']['number']
-                            }
-
-                    # Calculate standings for this round
-                    round_standings = sorted(
-                        [{'name': name, 'points': points} for name, points in driver_points.items()],
-                        key=lambda x: x['points'],
-                        reverse=True
-                    )
-
-                    # Assign positions
-                    for idx, standing in enumerate(round_standings):
-                        if standing['name'] in standings_data:
-                            standings_data[standing['name']]['positions'].append({
-                                'round': round_num,
-                                'position': idx + 1
-                            })
-
-            print(f"   ✓ Processed round {round_num}/{latest_round}")
-
-    # Update data
-    data['standings'] = {
-        'standingsData': standings_data,
-        'latestRound': latest_round
-    }
+    f1data.reset_stale_reads()
+    async with http_session_scope(http_session) as session:
+        standings = await fetch_standings(session, season)
+
+    if not standings:
+        print("   ⚠ f1api unavailable and nothing cached; keeping the existing standings")
+        raise GenerationFailed("f1api unavailable and no cached results, standings left unchanged")
 
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    stale = {}
+    cache_as_of = f1data.oldest_stale_read("f1api")
+    if cache_as_of:
+        mark_stale(stale, 'standings', iso_time(cache_as_of), "built from cached results, f1api unavailable")
 
-    print(f"   ✓ Standings data generated and saved to {json_file}")
+    # Merge only this section into the shared document
+    save_sections(json_file, {'standings': standings}, stale=stale)
 
+    print(f"   ✓ Standings data generated and {saved_to(json_file)}")
 
-async def generate_single_driver_only(client, driver_name, json_file="preview_data.json"):
+
+async def generate_single_driver_only(client, driver_name, json_file="preview_data.json", http_session=None):
     """Generate only a single driver profile using existing data"""
     print(f"\n👤 Regenerating profile for {driver_name}...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
+        raise GenerationFailed(f"{json_file} not found")
 
-    # Find driver in drivers_2025 list
-    driver = next((d for d in drivers_2025 if d['name'] == driver_name), None)
+    # Resolve the name, number or code against the season's roster
+    season = data['metadata']['season']
+    roster = await use_season_roster(season, http_session, round_num=previous_round(data['metadata']))
+    driver = roster.resolve(driver_name)
     if not driver:
-        print(f"   ✗ Driver '{driver_name}' not found in drivers list")
-        print(f"   Available drivers: {', '.join([d['name'] for d in drivers_2025])}")
-        return
+        print(f"   ✗ Driver '{driver_name}' not found in the {season} roster")
+        print(f"   Available drivers: {', '.join([d['name'] for d in roster.lineup])}")
+        raise GenerationFailed(f"Driver '{driver_name}' not found in the {season} roster")
+    driver_name = driver['name']
 
     # Get session context
-    session_context = get_session_context()
+    session_context = await load_session_context(data['metadata'], http_session)
 
     # Generate preview
     circuit = data['metadata']['circuit']
     race_date = data['metadata']['date']
-    season = data['metadata']['season']
     race_context = data['raceContext']
+    form_digests = await compute_form_digests(season, previous_round(data['metadata']), [driver_name], http_session)
 
     _, preview, error = await generate_driver_preview_async(
-        client, driver, circuit, race_context, session_context, season
+        client, driver, circuit, race_context, session_context, season, race_date,
+        form_digest=form_digests.get(driver_name, "")
     )
 
     if error:
         print(f"   ✗ Failed to generate preview: {error}")
-        return
-
-    # Update only this driver in data
-    data['drivers'][driver_name] = preview
+        print(f"   ℹ Keeping the existing {driver_name} profile")
+        raise GenerationFailed(f"{driver_name} preview failed: {error}")
 
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Merge only this driver into the shared document
+    preview["driverId"] = driver["id"]
+    save_sections(json_file, {('drivers', driver_name): preview})
 
-    print(f"   ✓ {driver_name} profile regenerated and saved to {json_file}")
+    print(f"   ✓ {driver_name} profile regenerated and {saved_to(json_file)}")
 
 
-async def generate_all_drivers_only(client, json_file="preview_data.json"):
+async def generate_all_drivers_only(client, json_file="preview_data.json", http_session=None):
     """Generate only all driver profiles using existing data"""
-    print(f"\n👥 Regenerating all {len(drivers_2025)} driver profiles...")
+    print("\n👥 Regenerating all driver profiles...")
 
     data = load_existing_data(json_file)
     if not data:
-        return
-
-    # Get session context
-    session_context = get_session_context()
+        raise GenerationFailed(f"{json_file} not found")
 
     # Get metadata
     circuit = data['metadata']['circuit']
     race_date = data['metadata']['date']
     season = data['metadata']['season']
     race_context = data['raceContext']
+    roster = await use_season_roster(season, http_session, round_num=previous_round(data['metadata']))
+    drivers = roster.lineup
+
+    # Get session context
+    session_context = await load_session_context(data['metadata'], http_session)
+    form_digests = await compute_form_digests(
+        season, previous_round(data['metadata']), [d['name'] for d in drivers], http_session
+    )
 
     # Create tasks for all drivers
     tasks = [
-        generate_driver_preview_async(client, driver, circuit, race_context, session_context, season)
-        for driver in drivers_2025
+        generate_driver_preview_async(
+            client, driver, circuit, race_context, session_context, season, race_date,
+            form_digest=form_digests.get(driver["name"], "")
+        )
+        for driver in drivers
     ]
 
     # Run all tasks concurrently
     results = await asyncio.gather(*tasks)
 
-    # Process results
+    # Process results; failed drivers keep their existing profile
     driver_previews = {}
     for driver_name, preview, error in results:
-        driver_previews[driver_name] = preview
         if error:
-            print(f"   ✗ {driver_name}: {error}")
+            print(f"   ✗ {driver_name}: {error} (keeping the existing profile)")
         else:
+            driver_previews[driver_name] = preview
             print(f"   ✓ {driver_name}")
+    if not driver_previews:
+        raise GenerationFailed(f"none of the {len(drivers)} driver profiles could be regenerated")
 
-    # Update drivers in data
-    data['drivers'] = driver_previews
+    # Merge only the regenerated drivers into the shared document
+    lazy_import("roster").tag_previews(driver_previews)
+    save_sections(json_file, {('drivers', name): preview for name, preview in driver_previews.items()})
 
-    # Save updated data
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    print(f"   ✓ {len(driver_previews)} of {len(drivers)} driver profiles regenerated and {saved_to(json_file)}")
 
-    print(f"   ✓ All {len(driver_previews)} driver profiles regenerated and saved to {json_file}")
 
-async def main():
-    # Parse command-line arguments
-    parser = argparse.ArgumentParser(
-        description="Generate F1 race weekend previews",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  python generate_previews.py                              # Generate everything
-  python generate_previews.py --only=prediction            # Only generate race prediction
-  python generate_previews.py --only=top5                  # Only regenerate top 5
-  python generate_previews.py --only=underdogs             # Only regenerate underdogs
-  python generate_previews.py --only=standings             # Only regenerate standings
-  python generate_previews.py --only=drivers               # Only regenerate all driver profiles
-  python generate_previews.py --only=driver --driver="Max Verstappen"  # Regenerate single driver
-        """
-    )
-    parser.add_argument(
-        '--only',
-        choices=['prediction', 'top5', 'underdogs', 'standings', 'drivers', 'driver'],
-        help='Generate only a specific section using existing data'
-    )
-    parser.add_argument(
-        '--driver',
-        type=str,
-        help='Driver name when using --only=driver (e.g., "Max Verstappen")'
-    )
-    parser.add_argument(
-        '--json',
-        default='preview_data.json',
-        help='Path to preview data JSON file (default: preview_data.json)'
-    )
+COMMANDS = {}
 
-    args = parser.parse_args()
 
-    # Validate driver argument
-    if args.only == 'driver' and not args.driver:
-        print("Error: --driver argument is required when using --only=driver")
-        print(f"Available drivers: {', '.join([d['name'] for d in drivers_2025])}")
-        return
+def command(name, help, needs_client=True, coalesce=True):
+    """Register a generation mode so main() can dispatch to it by name"""
+    def register(func):
+        COMMANDS[name] = {"func": func, "help": help, "needs_client": needs_client, "coalesce": coalesce}
+        return func
+    return register
 
-    # Initialize OpenAI client (not needed for standings-only)
-    api_key = os.environ.get("OPENAI_API_KEY")
-    client = None
 
-    if args.only != 'standings':
-        if not api_key:
-            print("Error: OPENAI_API_KEY environment variable not set")
-            return
-        client = AsyncOpenAI(api_key=api_key)
-
-    # Handle --only mode
-    if args.only:
-        if args.only == 'prediction':
-            await generate_prediction_only(client, args.json)
-        elif args.only == 'top5':
-            await generate_top5_only(client, args.json)
-        elif args.only == 'underdogs':
-            await generate_underdogs_only(client, args.json)
-        elif args.only == 'standings':
-            await generate_standings_only(args.json)
-        elif args.only == 'drivers':
-            await generate_all_drivers_only(client, args.json)
-        elif args.only == 'driver':
-            await generate_single_driver_only(client, args.driver, args.json)
-        return
+async def find_race_round(season, race_date, http_session=None):
+    """Round number of the race on race_date from the season calendar, if available"""
+    try:
+        async with http_session_scope(http_session) as session:
+            calendar = await f1data.get_season_calendar(session, season)
+    except Exception as e:
+        print(f"   ⚠ Could not fetch the {season} calendar: {e}")
+        return None
+    return f1data.find_round(calendar, race_date)
 
+
+@command("all", "Generate everything (default)")
+async def generate_full_preview(client, args):
+    """Run the full pipeline: context, drivers, top 5, underdogs, prediction, standings"""
     # Auto-detect next GP if not specified
     global CIRCUIT, RACE_DATE
     gp_name = None
 
     if CIRCUIT is None or RACE_DATE is None:
-        detected_circuit, detected_date, detected_name = await detect_next_gp(client)
+        detected_circuit, detected_date, detected_name = await next_gp_from_calendar() or (None, None, None)
+        if detected_date:
+            print(f"\n📅 Next Grand Prix from the calendar: {detected_name}")
+        else:
+            detected_circuit, detected_date, detected_name = await detect_next_gp(client)
         if detected_circuit and detected_date:
             CIRCUIT = detected_circuit
             RACE_DATE = detected_date
@@ -875,7 +1588,7 @@ Examples:
     print(f"\nGenerating previews for {CIRCUIT} GP on {RACE_DATE}...")
 
     # Generate header image
-    if gp_name:
+    if gp_name and not RUN_BUDGET.dry_run:
         await generate_gp_header_image(client, CIRCUIT, gp_name)
 
     # Check for web search capability
@@ -884,195 +1597,713 @@ Examples:
     else:
         print(f"\n📝 Web search DISABLED - Using model's training data only")
 
-    # Check for session results
-    session_context = get_session_context()
+    # Check for session results, analysing lap timing for sessions not filled in by hand
+    print("\n⏱  Checking completed sessions...")
+    session_context = await load_session_context({'date': RACE_DATE})
     if session_context:
         print(f"\n📊 Including results from completed sessions:")
-        completed_sessions = [k for k, v in SESSION_RESULTS.items() if v is not None]
+        completed_sessions = [
+            f"{k} ({'manual' if SESSION_RESULTS.get(k) else 'lap timing'})"
+            for k, v in session_results().items() if v is not None
+        ]
         print(f"   {', '.join(completed_sessions)}")
     else:
-        print("\n📅 No manual session results provided")
-
-    # Step 1: Generate race context
-    print("\n1. Generating race context...")
-    race_context_prompt = prompts["race_context"].format(
-        circuit=CIRCUIT,
-        raceDate=RACE_DATE,
-        season=SEASON
+        print("\n📅 No session results available yet")
+
+    deadline = None
+    if args.deadline:
+        deadline = deadline_scheduler.parse_deadline(args.deadline)
+        set_api_concurrency(args.api_concurrency)
+        print(f"\n⏱  Publish deadline {datetime.fromtimestamp(deadline):%Y-%m-%d %H:%M}, "
+              f"{args.api_concurrency} requests at a time")
+
+    baseline = lazy_import("pregenerate").load_baseline(RACE_DATE)
+    if baseline:
+        print(f"\n🔮 Starting from the baseline pre-generated at {baseline['metadata']['generatedAt']}")
+
+    round_num = await find_race_round(SEASON, RACE_DATE)
+    await use_season_roster(SEASON, round_num=round_num - 1 if round_num else None)
+    await run_race_pipeline(
+        client, CIRCUIT, RACE_DATE, SEASON, args.json, session_context=session_context, round_num=round_num,
+        qualifying_text=session_results().get("qualifying"),
+        deadline=deadline, workers=args.api_concurrency if deadline else None, baseline=baseline
     )
-    race_context_raw = await call_openai(client, race_context_prompt)
-    race_context = clean_urls(race_context_raw)
-    print(f"   ✓ Race context generated ({len(race_context)} chars)")
 
-    # Step 2: Generate driver previews in parallel
-    print(f"\n2. Generating {len(drivers_2025)} driver previews in parallel...")
+    languages = parse_languages(args.languages) if args.languages else LOCALIZE_LANGUAGES
+    if languages and not RUN_BUDGET.dry_run:
+        await lazy_import("localize").localize_file(client, args.json, languages)
 
-    # Create tasks for all drivers
-    tasks = [
-        generate_driver_preview_async(client, driver, CIRCUIT, race_context, session_context, SEASON)
-        for driver in drivers_2025
-    ]
+    print(f"\nTo use: Upload {args.json} to your website and load it via JavaScript")
 
-    # Run all tasks concurrently
-    results = await asyncio.gather(*tasks)
 
-    # Process results
+def load_preview_document(json_file):
+    """The existing preview document, or {} if missing or unreadable"""
+    if not os.path.exists(json_file):
+        return {}
+    try:
+        with open(json_file, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def load_previous_preview(json_file, race_date):
+    """The existing preview document if it is for the same race, else {}"""
+    data = load_preview_document(json_file)
+    return data if data.get('metadata', {}).get('date') == race_date else {}
+
+
+def estimate_latency(stage, tier):
+    """Recorded p90 latency of a stage on a tier's model, or None if not enough calls yet"""
+    return STAGE_BUDGETS.latency_estimate(stage, MODEL_TIERS.get(tier, MODEL))
+
+
+def driver_priority(driver_name, standings, previous_drivers):
+    """Scheduling priority: championship contenders, then by the previous preview's stakes level"""
+    positions = ((standings or {}).get('standingsData', {}).get(driver_name) or {}).get('positions')
+    if positions and positions[-1]['position'] <= CONTENDER_POSITIONS:
+        return deadline_scheduler.PRIORITY_CONTENDER
+    return deadline_scheduler.stakes_priority(previous_drivers.get(driver_name, {}).get('stakes_level'))
+
+
+def with_previous_fallback(job, stale, output_file, previous):
+    """Wrap a section job's run so a failure returns the previous version (marked stale), or None"""
+    run = job["run"]
+
+    async def run_with_fallback(tier):
+        try:
+            return await run(tier)
+        except Exception as e:
+            if job["fallback"] is None:
+                print(f"   ✗ {job['name']} failed, left out: {e}")
+                return None
+            mark_stale(stale, job["name"], previous_as_of(output_file, previous, job["name"]),
+                       f"generation failed: {e}")
+            return job["fallback"]
+
+    return run_with_fallback
+
+
+async def run_race_pipeline(client, circuit, race_date, season, output_file, session_context=None,
+                            drivers=None, latest_round=None, round_num=None, qualifying_text=None,
+                            http_session=None, deadline=None, workers=None, baseline=None):
+    """Generate and save the full preview document for one race
+
+    drivers defaults to the current roster's line-up and latest_round (the last round counted in
+    the standings) to the latest completed round of the current season.
+    qualifying_text, if set, fixes the simulated grid to the actual one.
+    With a deadline (epoch seconds), driver previews and sections run in
+    priority order on `workers` slots and low-priority items are degraded
+    when the deadline is at risk. Sections whose upstream fails fall back to
+    the previous preview's version and are listed in metadata.stale. With a
+    pre-generated baseline (see pregenerate.py) the race context and driver
+    previews are only updated for news and session results.
+    """
+    drivers = drivers or current_roster().lineup
+    f1data.reset_stale_reads()
+    previous_document = load_preview_document(output_file)
+    previous = previous_document if previous_document.get('metadata', {}).get('date') == race_date else {}
+    stale = {}
+    scheduler = deadline_scheduler.DeadlineScheduler(deadline, estimate_latency, workers)
+
+    # Step 1: Generate race context; simulation, form digests and standings are fetched alongside it
+    print("\n1. Generating race context, race simulation, form digests and standings...")
+    circuit_history = get_circuit_history(circuit, season, race_date)
+    if circuit_history:
+        print(f"   ✓ Using precomputed history for {circuit_history['circuitName']} "
+              f"({circuit_history['summary']['races']} races)")
+    baseline_date = baseline['metadata']['generatedAt'] if baseline else None
+    if baseline:
+        race_context_stage = "race_context_update"
+        race_context_prompt = prompts["race_context_update"].format(
+            circuit=circuit,
+            raceDate=race_date,
+            season=season,
+            baselineDate=baseline_date,
+            sessionContext=session_context or "",
+            raceContext=baseline['raceContext']
+        )
+    else:
+        race_context_stage = "race_context"
+        race_context_prompt = prompts["race_context"].format(
+            circuit=circuit,
+            raceDate=race_date,
+            season=season,
+            circuitHistory=get_circuit_history_context(circuit_history)
+        )
+
+    async def load_race_context():
+        try:
+            return clean_urls(await call_openai(client, race_context_prompt, stage=race_context_stage))
+        except Exception as e:
+            if previous.get('raceContext'):
+                as_of, fallback = previous_as_of(output_file, previous, 'raceContext'), previous['raceContext']
+            elif baseline:
+                as_of, fallback = baseline_date, baseline['raceContext']
+            else:
+                raise
+            mark_stale(stale, 'raceContext', as_of, f"generation failed: {e}")
+            return fallback
+
+    async def load_form_digests():
+        if baseline and baseline.get('formDigests'):
+            return baseline['formDigests']
+        return await compute_form_digests(season, latest_round, driver_names, http_session)
+
+    async def load_standings():
+        async with http_session_scope(http_session) as session:
+            return await fetch_standings(session, season, latest_round)
+
+    driver_names = [driver["name"] for driver in drivers]
+    race_context, simulation, form_digests, standings = await asyncio.gather(
+        load_race_context(),
+        compute_simulation(
+            season, latest_round, driver_names, qualifying_text, http_session,
+            safety_car_rate=circuit_safety_car_rate(circuit_history)
+        ),
+        load_form_digests(),
+        load_standings()
+    )
+    print(f"   ✓ Race context ready ({len(race_context)} chars)")
+
+    # f1api down: use results cached earlier, else the last published standings and simulation
+    cache_as_of = f1data.oldest_stale_read("f1api")
+    if standings:
+        print(f"   ✓ Championship standings data generated")
+        if cache_as_of:
+            mark_stale(stale, 'standings', iso_time(cache_as_of), "built from cached results, f1api unavailable")
+    elif previous_document.get('standings') and (
+        str(previous_document.get('metadata', {}).get('season')) == str(season)
+    ):
+        standings = previous_document['standings']
+        mark_stale(stale, 'standings', previous_as_of(output_file, previous_document, 'standings'),
+                   "f1api unavailable")
+    else:
+        print(f"   ✗ Failed to fetch standings data")
+    if simulation and cache_as_of:
+        mark_stale(stale, 'simulation', iso_time(cache_as_of), "built from cached results, f1api unavailable")
+    elif not simulation and previous.get('simulation'):
+        simulation = previous['simulation']
+        mark_stale(stale, 'simulation', previous_as_of(output_file, previous, 'simulation'), "simulation unavailable")
+    simulation_context = get_simulation_context(simulation)
+
+    # Sections need every driver preview; their prompts are built once step 2 is done
+    previews_for_sections = {}
+
+    async def run_top5(tier):
+        top5_prompt = prompts["top5"].format(
+            sessionContext=session_context or "",
+            simulation=simulation_context,
+            driverPreviews=previews_for_sections["summary"],
+            raceContext=race_context
+        )
+        top5_text = await call_openai(client, top5_prompt, stage="top5", validate=is_valid_top5, tier=tier)
+        print(f"   ✓ Top 5 generated")
+        return parse_top5(top5_text)
+
+    async def run_underdogs(tier):
+        underdogs_prompt = prompts["underdogs"].format(
+            sessionContext=session_context or "",
+            simulation=simulation_context,
+            driverPreviews=previews_for_sections["summary"],
+            raceContext=race_context
+        )
+        underdogs_text = await call_openai(
+            client, underdogs_prompt, stage="underdogs", validate=is_valid_underdogs, tier=tier
+        )
+        print(f"   ✓ Underdog stories generated")
+        return parse_underdogs(underdogs_text)
+
+    async def run_prediction(tier):
+        prediction_prompt = prompts["prediction"].format(
+            circuit=circuit,
+            raceDate=race_date,
+            sessionContext=session_context or "",
+            simulation=simulation_context,
+            driverPreviews=previews_for_sections["full"],
+            raceContext=race_context
+        )
+        prediction_text = await call_openai(client, prediction_prompt, stage="prediction", tier=tier)
+        print(f"   ✓ Race prediction generated")
+        return clean_urls(prediction_text)
+
+    section_jobs = [
+        {"name": "top5", "stage": "top5", "run": run_top5,
+         "priority": deadline_scheduler.PRIORITY_KEY_SECTION},
+        {"name": "prediction", "stage": "prediction", "run": run_prediction,
+         "priority": deadline_scheduler.PRIORITY_KEY_SECTION},
+        {"name": "underdogs", "stage": "underdogs", "run": run_underdogs,
+         "priority": deadline_scheduler.PRIORITY_SECTION},
+    ]
+    for job in section_jobs:
+        job["tier"] = STAGE_ROUTES.get(job["stage"], "heavy")
+        job["fallback"] = previous.get(job["name"])
+        job["run"] = with_previous_fallback(job, stale, output_file, previous)
+
+    # Step 2: Generate driver previews, championship contenders and high-stakes drivers first.
+    # Baseline previews are updated for news and sessions, or reused as is while fresh and no session has run.
+    print(f"\n2. Generating {len(drivers)} driver previews...")
+    previous_drivers = previous.get('drivers', {})
+    baseline_drivers = baseline.get('drivers', {}) if baseline else {}
+    reuse_baseline = bool(baseline) and not session_context and (
+        lazy_import("pregenerate").baseline_age_hours(baseline) < BASELINE_FRESH_HOURS
+    )
+    if baseline_drivers:
+        print(f"   ℹ {len(baseline_drivers)} baseline previews "
+              f"{'reused as is (no sessions yet)' if reuse_baseline else 'updated for news and sessions'}")
+
+    def driver_job(driver):
+        name = driver["name"]
+        job = {
+            "name": name,
+            "stage": "driver_preview",
+            "priority": driver_priority(name, standings, previous_drivers),
+            "fallback": (name, previous_drivers[name], None) if name in previous_drivers else None,
+            "run": lambda tier: generate_driver_preview_async(
+                client, driver, circuit, race_context, session_context, season, race_date,
+                form_digest=form_digests.get(name, ""), tier=tier
+            ),
+        }
+        if name in baseline_drivers and reuse_baseline:
+            async def reuse(tier):
+                return name, baseline_drivers[name], None
+            job["run"] = reuse
+        elif name in baseline_drivers:
+            job["stage"] = "driver_update"
+            job["run"] = lambda tier: generate_driver_update_async(
+                client, driver, baseline_drivers[name], baseline_date, circuit, race_context, session_context,
+                tier=tier
+            )
+        job["tier"] = STAGE_ROUTES.get(job["stage"], "heavy")
+        return job
+
+    driver_jobs = [driver_job(driver) for driver in drivers]
+    results = await scheduler.run(driver_jobs, reserve=scheduler.reserve_for(section_jobs))
+
+    # Process results; a failed driver gets the previous preview, or is left out rather than published as an error
     driver_previews = {}
     for driver_name, preview, error in results:
-        driver_previews[driver_name] = preview
-        if error:
-            print(f"   ✗ {driver_name}: {error}")
-        else:
+        if not error:
+            driver_previews[driver_name] = preview
             print(f"   ✓ {driver_name}")
+        elif driver_name in previous_drivers:
+            driver_previews[driver_name] = previous_drivers[driver_name]
+            mark_stale(stale, 'drivers', previous_as_of(output_file, previous, 'drivers', driver_name),
+                       f"generation failed: {error}", entry=driver_name)
+        elif driver_name in baseline_drivers:
+            driver_previews[driver_name] = baseline_drivers[driver_name]
+            mark_stale(stale, 'drivers', baseline_date, f"update failed: {error}", entry=driver_name)
+        else:
+            print(f"   ✗ {driver_name}: {error} (left out, no previous preview)")
 
-    print(f"   ✓ All {len(driver_previews)} driver previews generated")
+    print(f"   ✓ {len(driver_previews)} of {len(drivers)} driver previews ready")
 
-    # Step 3: Generate top 5
-    print("\n3. Generating top 5 analysis...")
+    # Step 3: Generate top 5, race prediction and underdogs from the driver previews
+    print("\n3. Generating top 5, race prediction and underdog stories...")
 
-    # Format driver previews as readable text for the prompt
-    driver_previews_text = "\n\n".join([
-        f"{name}:\n{get_preview_summary(preview)}"
-        for name, preview in driver_previews.items()
-    ])
+    # Format driver previews as readable text for the top 5 and underdogs prompts
+    previews_for_sections["summary"] = format_preview_summaries(driver_previews)
 
-    top5_prompt = prompts["top5"].format(
-        sessionContext=session_context or "",
-        driverPreviews=driver_previews_text,
-        raceContext=race_context
+    # Format full driver previews for prediction
+    previews_for_sections["full"] = format_full_previews(driver_previews)
+
+    top5, prediction, underdogs = await scheduler.run(section_jobs)
+
+    # Compile results; a section that failed with nothing to fall back to is left out
+    roster = lazy_import("roster")
+    result = {
+        "drivers": roster.tag_previews(driver_previews),
+        "roster": roster.roster_section(drivers),
+        "raceContext": race_context,
+        "metadata": {
+            "circuit": circuit,
+            "date": race_date,
+            "season": season,
+            "round": round_num,
+            "generatedAt": None  # Will be set by JS when loaded
+        }
+    }
+    for name, section in (("top5", top5), ("underdogs", underdogs), ("prediction", prediction)):
+        if section is not None:
+            result[name] = section
+    if deadline is not None:
+        result["metadata"]["degraded"] = scheduler.degraded
+    if stale:
+        result["metadata"]["stale"] = stale
+    if baseline:
+        result["metadata"]["baseline"] = baseline_date
+
+    # Add standings and simulation if available
+    if standings:
+        result["standings"] = standings
+    if simulation:
+        result["simulation"] = simulation
+
+    # Save to file, replacing the whole document
+    save_sections(output_file, result, replace=True)
+    scheduler.print_report()
+
+    print(f"\n✅ All done! Preview data {saved_to(output_file)}")
+    return result
+
+
+@command("pregenerate", "Pre-generate the next GP's baseline once the last race is finished (for cron)")
+async def run_pregenerate(client, args):
+    await lazy_import("pregenerate").pregenerate_next_gp(client, force=args.force)
+
+
+def parse_languages(spec):
+    """Parse "es,de" into ["es", "de"]"""
+    return [code.strip() for code in spec.split(',') if code.strip()]
+
+
+@command("localize", "Translate --json into --languages (default LOCALIZE_LANGUAGES) as per-language files")
+async def run_localize(client, args):
+    languages = parse_languages(args.languages) if args.languages else LOCALIZE_LANGUAGES
+    if not languages:
+        print(f"Error: no languages configured; pass --languages (available: {', '.join(LANGUAGES)})")
+        return
+    if not os.path.exists(args.json):
+        print(f"   ✗ {args.json} not found. Generate full data first.")
+        return
+    set_api_concurrency(args.api_concurrency)
+    await lazy_import("localize").localize_file(client, args.json, languages)
+
+
+@command("prediction", "Only generate race prediction")
+async def run_prediction(client, args):
+    await generate_prediction_only(client, args.json)
+
+
+@command("top5", "Only regenerate top 5")
+async def run_top5(client, args):
+    await generate_top5_only(client, args.json)
+
+
+@command("underdogs", "Only regenerate underdogs")
+async def run_underdogs(client, args):
+    await generate_underdogs_only(client, args.json)
+
+
+@command("standings", "Only regenerate standings", needs_client=False)
+async def run_standings(client, args):
+    await generate_standings_only(args.json)
+
+
+@command("drivers", "Only regenerate all driver profiles")
+async def run_drivers(client, args):
+    await generate_all_drivers_only(client, args.json)
+
+
+@command("driver", "Regenerate a single driver (requires --driver)")
+async def run_driver(client, args):
+    if not args.driver:
+        print("Error: --driver argument is required when using --only=driver")
+        print(f"Available drivers: {', '.join([d['name'] for d in current_roster().lineup])}")
+        return
+    await generate_single_driver_only(client, args.driver, args.json)
+
+
+@command("simulation", "Re-run the Monte Carlo race simulation for the current preview", needs_client=False)
+async def run_simulation(client, args):
+    print("\n🎲 Simulating the upcoming race...")
+    data = load_existing_data(args.json)
+    if not data:
+        return
+
+    season = data['metadata'].get('season', SEASON)
+    driver_names = list(data.get('drivers') or {}) or [d['name'] for d in current_roster().lineup]
+    history = get_circuit_history(data['metadata'].get('circuit', CIRCUIT), season, data['metadata'].get('date'))
+    await refresh_session_analysis(data['metadata'].get('date'))
+    simulation = await compute_simulation(
+        season, None, driver_names, session_results().get("qualifying"),
+        safety_car_rate=circuit_safety_car_rate(history)
     )
+    if simulation:
+        save_sections(args.json, {'simulation': simulation})
+        print(f"   ✓ Simulation {saved_to(args.json)}")
 
-    top5_text = await call_openai(client, top5_prompt)
-    top5 = parse_top5(top5_text)
-    print(f"   ✓ Top 5 generated")
 
-    # Step 4: Generate underdogs
-    print("\n4. Generating underdog stories...")
-    underdogs_prompt = prompts["underdogs"].format(
-        sessionContext=session_context or "",
-        driverPreviews=driver_previews_text,
-        raceContext=race_context
+@command("sessions", "Analyse this weekend's sessions from lap timing and print the session context",
+         needs_client=False, coalesce=False)
+async def run_session_analysis(client, args):
+    data = load_existing_data(args.json)
+    if not data:
+        return
+
+    print(f"\n⏱  Analysing sessions for the {data['metadata']['circuit']} GP on {data['metadata']['date']}...")
+    session_context = await load_session_context(data['metadata'])
+    print(f"\n{session_context}" if session_context else "   ℹ No completed sessions with timing data yet")
+
+
+@command("circuit-history", "Build the circuit history index (winners, safety cars, strategies)", needs_client=False)
+async def run_circuit_history(client, args):
+    circuit_history = lazy_import("circuit_history")
+    season = args.season or SEASON
+    print(f"\n🏟  Building circuit history for {season} "
+          f"(previous {circuit_history.HISTORY_SEASONS} seasons + completed rounds)...")
+    async with http_session_scope() as session:
+        index = await circuit_history.build_index(session, season)
+        circuit_history.save_index(index)
+        print(f"   ✓ Indexed {len(index['circuits'])} circuits into {circuit_history.history_file(season)}")
+
+        circuit = CIRCUIT
+        if circuit is None:
+            circuit, _, _ = await next_gp_from_calendar(session) or (None, None, None)
+    if not circuit:
+        print("   ℹ No upcoming circuit known, skipping the digest preview")
+        return
+    history = circuit_history.find_circuit(index, circuit)
+    if history:
+        print(f"\n{circuit_history.format_digest(history)}")
+    else:
+        print(f"   ⚠ No history found for {circuit}")
+
+
+@command("serve", "Run the preview service with a local HTTP regeneration API", coalesce=False)
+async def run_serve(client, args):
+    preview_service = lazy_import("preview_service")
+    await preview_service.serve(
+        client, json_file=args.json, host=args.host, port=args.port,
+        queue_size=args.queue_size, workers=args.workers
     )
 
-    underdogs_text = await call_openai(client, underdogs_prompt)
-    underdogs = parse_underdogs(underdogs_text)
-    print(f"   ✓ Underdog stories generated")
 
-    # Step 5: Generate race prediction
-    print("\n5. Generating race prediction...")
+@command("archive", "Index preview_data.json and --archive-dir files into the preview archive", needs_client=False)
+async def run_archive_index(client, args):
+    preview_archive = lazy_import("preview_archive")
+    paths = preview_archive.archive_files(args.archive_dir, extra_files=[args.json])
+    rows = get_archive().import_files(paths)
+    print(f"\n🗂  Indexed {rows} sections from {len(paths)} files into {ARCHIVE_DB}")
 
-    # Format full driver previews for prediction
-    full_driver_previews_text = "\n\n".join([
-        f"**{name}** ({preview.get('stakes_level', 'medium')} stakes):\n{preview.get('full', '')}\n\nPerfect Result: Quali {preview.get('perfect_quali', 'N/A')}, Race {preview.get('perfect_race', 'N/A')}\nGood Result: Quali {preview.get('good_quali', 'N/A')}, Race {preview.get('good_race', 'N/A')}"
-        for name, preview in driver_previews.items()
-    ])
 
-    prediction_prompt = prompts["prediction"].format(
-        circuit=CIRCUIT,
-        raceDate=RACE_DATE,
-        sessionContext=session_context or "",
-        driverPreviews=full_driver_previews_text,
-        raceContext=race_context
+@command("budgets", "Show calibrated per-stage output budgets from recorded usage", needs_client=False, coalesce=False)
+async def run_budgets(client, args):
+    print(f"\n📏 Per-stage output budgets (p{int(stage_budgets.CALIBRATION_PERCENTILE * 100)} "
+          f"x {stage_budgets.CALIBRATION_HEADROOM} headroom, min {stage_budgets.CALIBRATION_MIN_SAMPLES} samples)")
+    rows = STAGE_BUDGETS.report(lambda stage: MODEL_TIERS.get(STAGE_ROUTES.get(stage, "heavy"), MODEL))
+    for stage, model, samples, p50, p99, budget, effort in rows:
+        observed = f"p50 {p50}, p99 {p99}" if samples else "no data"
+        print(f"   {stage:<16} {model:<12} {samples:>4} calls ({observed}) "
+              f"→ max_output_tokens {budget}, effort {effort or 'default'}")
+
+
+@command("experiment", "Benchmark prompt variants in --variants against the current template",
+         needs_client=False, coalesce=False)
+async def run_experiment(client, args):
+    if not args.variants:
+        print("Error: --variants=<dir> is required, e.g. prompt_variants/driver_preview with one <name>.txt per variant")
+        return
+    if not args.fake_model and not args.dry_run:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            print("Error: OPENAI_API_KEY environment variable not set (or use --fake-model)")
+            return
+        client = create_openai_client(api_key)
+    set_api_concurrency(args.api_concurrency)
+    experiments = lazy_import("experiments")
+    await experiments.run_experiment(
+        client, args.variants, json_file=args.json, archive_dir=args.archive_dir,
+        fake=args.fake_model or args.dry_run
     )
 
-    prediction_text = await call_openai(client, prediction_prompt)
-    prediction = clean_urls(prediction_text)
-    print(f"   ✓ Race prediction generated")
-
-    # Step 6: Generate standings data
-    print("\n6. Generating championship standings data...")
-
-    import aiohttp
-
-    async with aiohttp.ClientSession() as session:
-        # Get current season data
-        async with session.get(f'https://f1api.dev/api/current') as response:
-            if response.status == 200:
-                current_data = await response.json()
-                completed_races = [r for r in current_data['races'] if r.get('winner') is not None]
-                latest_round = len(completed_races)
-
-                print(f"   ℹ Found {latest_round} completed rounds")
-
-                # Calculate cumulative points for each round
-                driver_points = {}
-                standings_data = {}
-
-                for round_num in range(1, latest_round + 1):
-                    async with session.get(f'https://f1api.dev/api/{SEASON}/{round_num}/race') as race_response:
-                        if race_response.status != 200:
-                            continue
-
-                        race_data = await race_response.json()
-
-                        if race_data.get('races', {}).get('results'):
-                            for result in race_data['races']['results']:
-                                driver_name = f"{result['driver']['name']} {result['driver']['surname']}"
-                                display_name = 'Kimi Antonelli' if driver_name == 'Andrea Kimi Antonelli' else driver_name
-
-                                if display_name not in driver_points:
-                                    driver_points[display_name] = 0
-
-                                driver_points[display_name] += result.get('points', 0)
-
-                                if display_name not in standings_data:
-                                    standings_data[display_name] = {
-                                        'positions': [],
-                                        'team': result['team']['teamName'],
-                                        'number': result['driver']['number']
-                                    }
-
-                            # Calculate standings for this round
-                            round_standings = sorted(
-                                [{'name': name, 'points': points} for name, points in driver_points.items()],
-                                key=lambda x: x['points'],
-                                reverse=True
-                            )
-
-                            # Assign positions
-                            for idx, standing in enumerate(round_standings):
-                                if standing['name'] in standings_data:
-                                    standings_data[standing['name']]['positions'].append({
-                                        'round': round_num,
-                                        'position': idx + 1
-                                    })
-
-                standings = {
-                    'standingsData': standings_data,
-                    'latestRound': latest_round
-                }
-                print(f"   ✓ Championship standings data generated")
-            else:
-                print(f"   ✗ Failed to fetch standings data")
-                standings = None
 
-    # Compile results
-    result = {
-        "drivers": driver_previews,
-        "top5": top5,
-        "underdogs": underdogs,
-        "prediction": prediction,
-        "raceContext": race_context,
-        "metadata": {
-            "circuit": CIRCUIT,
-            "date": RACE_DATE,
-            "season": SEASON,
-            "generatedAt": None  # Will be set by JS when loaded
-        }
-    }
+@command("backfill", "Generate previews for a season or list of rounds into --archive-dir", coalesce=False)
+async def run_backfill(client, args):
+    backfill = lazy_import("backfill")
+    await backfill.run_backfill(
+        client,
+        args.season or SEASON,
+        rounds=backfill.parse_rounds(args.rounds) if args.rounds else None,
+        archive_dir=args.archive_dir,
+        race_concurrency=args.race_concurrency,
+        api_concurrency=args.api_concurrency,
+        token_budget=args.token_budget,
+    )
 
-    # Add standings if generated
-    if standings:
-        result["standings"] = standings
 
-    # Save to file
-    output_file = "preview_data.json"
-    with open(output_file, "w") as f:
-        json.dump(result, f, indent=2)
+def print_startup_profile():
+    """Report how long module and lazily-loaded dependency imports took"""
+    print("\n⏱  Startup profile:")
+    print(f"   module imports: {MODULE_IMPORT_TIME * 1000:.1f} ms")
+    for module_name, seconds in IMPORT_TIMINGS.items():
+        print(f"   {module_name} (lazy): {seconds * 1000:.1f} ms")
+    total = MODULE_IMPORT_TIME + sum(IMPORT_TIMINGS.values())
+    print(f"   total import time: {total * 1000:.1f} ms")
+
+
+async def main():
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Generate F1 race weekend previews",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Modes:\n" + "\n".join(
+            f"  --only={name:<12} {spec['help']}" for name, spec in COMMANDS.items() if name != "all"
+        )
+    )
+    parser.add_argument(
+        '--only',
+        choices=[name for name in COMMANDS if name != "all"],
+        help='Generate only a specific section using existing data'
+    )
+    parser.add_argument(
+        '--driver',
+        type=str,
+        help='Driver name, surname, number or code when using --only=driver (e.g., "Max Verstappen" or VER)'
+    )
+    parser.add_argument(
+        '--json',
+        default='preview_data.json',
+        help='Path to preview data JSON file (default: preview_data.json)'
+    )
+    parser.add_argument(
+        '--startup-profile',
+        action='store_true',
+        help='Report module and dependency import times after the run'
+    )
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Address for --only=serve to bind (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='Port for --only=serve (default: 8080)'
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=16,
+        help='Maximum queued regeneration jobs for --only=serve (default: 16)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Concurrent regeneration workers for --only=serve (default: 4)'
+    )
+    parser.add_argument(
+        '--season',
+        help=f'Season for --only=backfill and --only=circuit-history (default: {SEASON})'
+    )
+    parser.add_argument(
+        '--rounds',
+        help='Rounds for --only=backfill, e.g. "1-5,8" (default: whole season)'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        default='archive',
+        help='Directory for per-race backfill output, also read by --only=experiment (default: archive)'
+    )
+    parser.add_argument(
+        '--race-concurrency',
+        type=int,
+        default=2,
+        help='Races generated at once by --only=backfill (default: 2)'
+    )
+    parser.add_argument(
+        '--api-concurrency',
+        type=int,
+        default=10,
+        help='OpenAI requests in flight across all races in --only=backfill, --only=localize, '
+             '--only=experiment, or at once with --deadline (default: 10)'
+    )
+    parser.add_argument(
+        '--token-budget',
+        type=int,
+        help='Stop starting new races in --only=backfill once this many tokens are projected'
+    )
+
+    parser.add_argument(
+        '--deadline',
+        help='Publish deadline for a full run: "13:30", "+90m" or an ISO datetime; '
+             'low-priority items are degraded if it is at risk'
+    )
+
+    parser.add_argument(
+        '--languages',
+        help=f'Language codes for --only=localize and after a full run, e.g. "es,de" '
+             f'(default: LOCALIZE_LANGUAGES; known: {", ".join(LANGUAGES)})'
+    )
+    parser.add_argument(
+        '--variants',
+        help='Directory of prompt variants for --only=experiment, named after the stage (e.g. prompt_variants/top5)'
+    )
+    parser.add_argument(
+        '--fake-model',
+        action='store_true',
+        help='Answer --only=experiment calls with a deterministic local model instead of the API'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Run --only=pregenerate now, outside off-peak hours or over an existing baseline'
+    )
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Predict the token and cost footprint of the run without calling the API or writing previews '
+             '(only the F1 data cache is filled)'
+    )
+    parser.add_argument(
+        '--max-tokens',
+        type=int,
+        default=RUN_TOKEN_BUDGET,
+        help='Token budget for this run; calls that would exceed it are deferred, downgraded or refused'
+    )
+    parser.add_argument(
+        '--max-cost',
+        type=float,
+        default=RUN_COST_BUDGET,
+        help='Estimated cost budget in USD for this run'
+    )
+
+    args = parser.parse_args()
+    mode = args.only or "all"
+    spec = COMMANDS[mode]
+    RUN_BUDGET.max_tokens = args.max_tokens
+    RUN_BUDGET.max_cost = args.max_cost
+    RUN_BUDGET.dry_run = args.dry_run
+
+    # Initialize OpenAI client only for modes that call the API
+    client = None
+    if spec["needs_client"] and not args.dry_run:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            print("Error: OPENAI_API_KEY environment variable not set")
+            return
+        client = create_openai_client(api_key)
+
+    try:
+        if spec["coalesce"] and not args.dry_run:
+            # Coalesce with an identical run already in flight (e.g. cron and a human at once)
+            coordinator = job_coordinator.JobCoordinator.for_json_file(args.json)
+            if mode == "driver" and args.driver:
+                # Key on the canonical name so --driver=VER and --driver="Max Verstappen" coalesce
+                driver = current_roster().resolve(args.driver)
+                args.driver = driver["name"] if driver else args.driver
+            key = job_coordinator.job_key(mode, args.json, args.driver if mode == "driver" else None)
+            await coordinator.run(key, lambda: spec["func"](client, args))
+        else:
+            await spec["func"](client, args)
+    except run_budget.BudgetExceeded as e:
+        print(f"\n✗ Run stopped by the budget: {e}")
+    except GenerationFailed as e:
+        print(f"\n✗ Nothing updated: {e}")
+
+    if TIER_STATS:
+        print_tier_summary()
+    RUN_BUDGET.print_report()
+    circuit_breaker.print_report()
 
-    print(f"\n✅ All done! Preview data saved to {output_file}")
-    print(f"\nTo use: Upload {output_file} to your website and load it via JavaScript")
+    if args.startup_profile:
+        print_startup_profile()
 
 
 if __name__ == "__main__":
+    # Let sibling modules (e.g. preview_service) import this script without loading it twice
+    sys.modules.setdefault("generate_previews", sys.modules[__name__])
     asyncio.run(main())
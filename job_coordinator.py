@@ -0,0 +1,115 @@
+"""
+Single-flight coordination for generation jobs
+
+Identical jobs (same mode, driver and preview file) are coalesced: within one
+process concurrent callers await the same task, and across processes (cron
+and a human both running --only=standings) a per-job file lock makes the
+later caller wait for the running job and reuse its result instead of
+calling the APIs a second time.
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import re
+import time
+
+STATE_DIR_NAME = ".preview_jobs"
+
+
+def job_key(kind, json_file, driver=None):
+    """Identity of a job: two requests with the same key produce the same update"""
+    key = f"{kind}:{os.path.abspath(json_file)}"
+    if driver:
+        key += f":{driver}"
+    return key
+
+
+class JobCoordinator:
+    """Coalesces identical in-flight jobs in this process and across processes"""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.in_flight = {}
+
+    @classmethod
+    def for_json_file(cls, json_file):
+        return cls(os.path.join(os.path.dirname(os.path.abspath(json_file)), STATE_DIR_NAME))
+
+    async def run(self, key, job_factory):
+        """Run job_factory() once per key; concurrent identical calls share one run
+
+        Returns True if this call ran the job, False if it was coalesced into a
+        run that another caller or process already performed.
+        """
+        task = self.in_flight.get(key)
+        if task is not None:
+            print(f"   ↺ Joining in-flight job {key}")
+            await asyncio.shield(task)
+            return False
+
+        task = asyncio.ensure_future(self.run_exclusive(key, job_factory))
+        self.in_flight[key] = task
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def lock_path(self, key):
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', key).strip('_')[-120:]
+        return os.path.join(self.state_dir, f"{slug}.lock")
+
+    async def run_exclusive(self, key, job_factory):
+        """Hold the job's file lock while running; skip if another process just ran it"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        requested_at = time.time()
+
+        with open(self.lock_path(key), 'a+') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("   ⏳ Identical job already running in another process, waiting for it...")
+                await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+
+                # The other process finished while we waited: only a run that wrote covers this request
+                state = self.read_state(lock_file)
+                if state.get("finishedAt", 0) >= requested_at:
+                    if state.get("status") == "done":
+                        print(f"   ↺ Coalesced with job finished by pid {state.get('pid')}")
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                        return False
+                    error = state.get("error", "unknown error")
+                    print(f"   ↻ Job by pid {state.get('pid')} failed ({error}), running it again")
+
+            try:
+                started_at = time.time()
+                self.write_state(lock_file, {"key": key, "pid": os.getpid(), "status": "running",
+                                             "startedAt": started_at})
+                state = {"key": key, "pid": os.getpid(), "status": "failed", "startedAt": started_at}
+                try:
+                    await job_factory()
+                    state["status"] = "done"
+                except Exception as e:
+                    # Jobs raise when they updated nothing, so a failed run is never coalesced into
+                    state["error"] = str(e)
+                    raise
+                finally:
+                    self.write_state(lock_file, dict(state, finishedAt=time.time()))
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        return True
+
+    @staticmethod
+    def read_state(lock_file):
+        lock_file.seek(0)
+        try:
+            return json.loads(lock_file.read() or "{}")
+        except json.JSONDecodeError:
+            return {}
+
+    @staticmethod
+    def write_state(lock_file, state):
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(json.dumps(state))
+        lock_file.flush()
@@ -0,0 +1,265 @@
+"""
+Localization of the finished preview document into several languages
+
+Takes preview_data.json and writes preview_data.<language>.json per
+configured language, all languages concurrently. Long markdown fields (race
+context, driver previews, prediction) are translated one request each and
+must keep the headings and list items app.js renders; short fields (result
+expectations, top 5 reasons, underdog titles and stories) go into a single
+JSON request per language. Translations are cached by content hash under
+.translations/, so sections that haven't changed are never retranslated.
+
+Usage:
+  python generate_previews.py --only=localize                   # All languages in LOCALIZE_LANGUAGES
+  python generate_previews.py --only=localize --languages=es,de
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+
+import generate_previews as gp
+
+CACHE_DIR = ".translations"
+CACHE_VERSION = 1  # Bump when the prompts change so cached translations are redone
+
+DRIVER_SHORT_FIELDS = ["perfect_quali", "perfect_race", "good_quali", "good_race"]
+TOP5_SHORT_FIELDS = ["reason", "stakes"]
+UNDERDOG_SHORT_FIELDS = ["title", "story", "surprise_factor"]
+
+PROMPTS = {
+    "markdown": """Translate the following Formula 1 race preview text from English into {language}.
+
+Rules:
+- Keep the markdown structure EXACTLY: the same headings (#, ##, ###) and list items (-, *, 1.) on their own lines in the same order, the same **bold** markup and blank lines between blocks. Translate the heading text.
+- Keep driver, team, circuit and sponsor names, car numbers, lap times and abbreviations (P1, DNF, DRS, FP1, SC, VSC) unchanged.
+- Use natural motorsport terminology in {language}.
+- Return ONLY the translated text, with no preface or notes.
+
+TEXT:
+{text}""",
+
+    "batch": """Translate the values of this JSON object of short Formula 1 preview texts from English into {language}.
+
+Rules:
+- Return ONLY a JSON object with exactly the same keys, each value translated.
+- Keep driver, team and circuit names, positions (P1, P4-P6), lap times and abbreviations unchanged.
+- Use natural motorsport terminology in {language}.
+
+JSON:
+{json}""",
+}
+
+
+def content_hash(text):
+    return hashlib.sha256(f"{CACHE_VERSION}\n{text}".encode('utf-8')).hexdigest()
+
+
+def cache_file(language, directory=CACHE_DIR):
+    return os.path.join(directory, f"{language}.json")
+
+
+def load_cache(language, directory=CACHE_DIR):
+    path = cache_file(language, directory)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(language, cache, directory=CACHE_DIR):
+    if gp.RUN_BUDGET.dry_run:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = cache_file(language, directory)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def localized_path(json_file, language):
+    root, ext = os.path.splitext(json_file)
+    return f"{root}.{language}{ext or '.json'}"
+
+
+def collect_fields(data):
+    """(markdown fields, short fields) of the document as {path: text}; paths are key tuples"""
+    markdown, short = {}, {}
+    for key in ("raceContext", "prediction"):
+        if isinstance(data.get(key), str) and data[key].strip():
+            markdown[(key,)] = data[key]
+
+    for name, preview in data.get("drivers", {}).items():
+        if preview.get("full"):
+            markdown[("drivers", name, "full")] = preview["full"]
+        for field in DRIVER_SHORT_FIELDS:
+            if preview.get(field):
+                short[("drivers", name, field)] = preview[field]
+
+    for section, fields in (("top5", TOP5_SHORT_FIELDS), ("underdogs", UNDERDOG_SHORT_FIELDS)):
+        for i, item in enumerate(data.get(section) or []):
+            for field in fields:
+                if item.get(field):
+                    short[(section, i, field)] = item[field]
+    return markdown, short
+
+
+def set_field(document, path, value):
+    target = document
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+
+
+def markdown_skeleton(text):
+    """Heading levels and list markers in order, the structure simpleMarkdownToHtml renders"""
+    skeleton = []
+    for line in text.splitlines():
+        line = line.strip()
+        heading = re.match(r'(#{1,3}) ', line)
+        if heading:
+            skeleton.append(heading.group(1))
+        elif re.match(r'[-*]\s+\S', line):
+            skeleton.append('-')
+        elif re.match(r'\d+\.\s+\S', line):
+            skeleton.append('1.')
+    return skeleton
+
+
+def parse_batch(text):
+    """The JSON object in a batch response, or None"""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def translate_markdown(client, text, language_name):
+    """Translate one markdown field; raises if the translation lost headings or list items"""
+    def same_structure(translated):
+        return markdown_skeleton(translated) == markdown_skeleton(text)
+
+    translated = await gp.call_openai(
+        client, PROMPTS["markdown"].format(language=language_name, text=text),
+        enable_search=False, stage="translate", validate=same_structure
+    )
+    if not gp.RUN_BUDGET.dry_run and not same_structure(translated):
+        raise ValueError("translation does not keep the markdown structure")
+    return translated
+
+
+async def translate_batch(client, texts, language_name):
+    """Translate {id: text} in one request; returns {id: translation}"""
+    payload = json.dumps(texts, ensure_ascii=False, indent=1)
+
+    def is_complete(response):
+        data = parse_batch(response)
+        return bool(data) and set(data) == set(texts) and all(isinstance(v, str) for v in data.values())
+
+    response = await gp.call_openai(
+        client, PROMPTS["batch"].format(language=language_name, json=payload),
+        enable_search=False, stage="translate_batch", validate=is_complete
+    )
+    if gp.RUN_BUDGET.dry_run:
+        return dict(texts)
+    data = parse_batch(response)
+    if not data or set(data) != set(texts):
+        raise ValueError("batch translation returned a different set of keys")
+    return data
+
+
+async def localize_document(client, data, language, language_name, cache_dir=CACHE_DIR):
+    """Translated copy of the preview document and the number of fields served from the cache"""
+    cache = load_cache(language, cache_dir)
+    markdown, short = collect_fields(data)
+    localized = copy.deepcopy(data)
+    translated, untranslated = {}, []
+
+    pending_markdown = {}
+    for path, text in markdown.items():
+        cached = cache.get(content_hash(text))
+        if cached is not None:
+            translated[path] = cached
+        else:
+            pending_markdown[path] = text
+
+    pending_short = {}
+    for path, text in short.items():
+        cached = cache.get(content_hash(text))
+        if cached is not None:
+            translated[path] = cached
+        else:
+            pending_short[path] = text
+    from_cache = len(translated)
+
+    async def run_markdown(path, text):
+        try:
+            translated[path] = await translate_markdown(client, text, language_name)
+            cache[content_hash(text)] = translated[path]
+        except Exception as e:
+            print(f"   ✗ {language}: {'/'.join(map(str, path))} not translated: {e}")
+            untranslated.append("/".join(map(str, path)))
+
+    async def run_short():
+        if not pending_short:
+            return
+        ids = {str(i): path for i, path in enumerate(pending_short)}
+        try:
+            result = await translate_batch(client, {i: pending_short[path] for i, path in ids.items()}, language_name)
+        except Exception as e:
+            print(f"   ✗ {language}: {len(ids)} short fields not translated: {e}")
+            untranslated.extend("/".join(map(str, path)) for path in ids.values())
+            return
+        for i, path in ids.items():
+            translated[path] = result[i]
+            cache[content_hash(pending_short[path])] = result[i]
+
+    await asyncio.gather(run_short(), *[run_markdown(path, text) for path, text in pending_markdown.items()])
+
+    for path, text in translated.items():
+        set_field(localized, path, text)
+    localized.setdefault("metadata", {})["language"] = language
+    if untranslated:
+        localized["metadata"]["untranslated"] = untranslated
+
+    save_cache(language, cache, cache_dir)
+    return localized, from_cache
+
+
+def write_document(path, document):
+    if gp.RUN_BUDGET.dry_run:
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+async def localize_file(client, json_file, languages, cache_dir=CACHE_DIR):
+    """Write json_file translated into each language code of `languages`; returns {language: path}"""
+    with open(json_file, 'r') as f:
+        data = json.load(f)
+
+    markdown, short = collect_fields(data)
+    print(f"\n🌍 Localizing {json_file} into {', '.join(languages)} "
+          f"({len(markdown)} long and {len(short)} short fields each)...")
+
+    async def localize_language(language):
+        language_name = gp.LANGUAGES.get(language, language)
+        localized, from_cache = await localize_document(client, data, language, language_name, cache_dir)
+        path = localized_path(json_file, language)
+        write_document(path, localized)
+        print(f"   ✓ {language_name}: {path} "
+              f"({from_cache} of {len(markdown) + len(short)} fields reused from the cache)")
+        return language, path
+
+    return dict(await asyncio.gather(*[localize_language(language) for language in languages]))
@@ -0,0 +1,151 @@
+"""
+Speculative pre-generation of the next Grand Prix
+
+As soon as a race is finished the next race is known from the cached
+season calendar, with no model call. In off-peak hours this mode
+pre-generates that race's context, form digests and baseline driver
+previews into pregenerated/<race date>.json. On the race weekend a full
+run starts from the baseline: the race context and each driver preview get
+a short update call for news and session results instead of a full
+search-heavy generation, and only the sections are generated from scratch.
+
+Usage:
+  python generate_previews.py --only=pregenerate            # From cron (e.g. hourly); runs in off-peak hours
+  python generate_previews.py --only=pregenerate --force    # Pre-generate now, replacing an existing baseline
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+import f1data
+import generate_previews as gp
+
+PREGENERATED_DIR = "pregenerated"
+OFF_PEAK_HOURS = range(0, 7)  # Local hours in which speculative generation may run
+
+
+def baseline_path(race_date, directory=PREGENERATED_DIR):
+    return os.path.join(directory, f"{race_date}.json")
+
+
+def load_baseline(race_date, directory=PREGENERATED_DIR):
+    """The pre-generated baseline for the race on race_date, or None"""
+    path = baseline_path(race_date, directory)
+    if not race_date or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"   ⚠ Ignoring unreadable baseline {path}: {e}")
+        return None
+
+
+def save_baseline(baseline, directory=PREGENERATED_DIR):
+    if gp.RUN_BUDGET.dry_run:
+        return None
+    path = baseline_path(baseline['metadata']['date'], directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def baseline_age_hours(baseline, now=None):
+    generated_at = datetime.fromisoformat(baseline['metadata']['generatedAt'])
+    return ((now or datetime.now(timezone.utc)) - generated_at).total_seconds() / 3600
+
+
+async def generate_baseline(client, circuit, race_date, season, round_num, drivers=None, http_session=None):
+    """Race context, form digests and driver previews for a race, without session results"""
+    drivers = drivers or gp.current_roster().lineup
+    circuit_history = gp.get_circuit_history(circuit, season, race_date)
+    race_context_prompt = gp.prompts["race_context"].format(
+        circuit=circuit,
+        raceDate=race_date,
+        season=season,
+        circuitHistory=gp.get_circuit_history_context(circuit_history)
+    )
+
+    print("\n1. Generating race context and form digests...")
+    race_context_raw, form_digests = await asyncio.gather(
+        gp.call_openai(client, race_context_prompt, stage="race_context"),
+        gp.compute_form_digests(season, round_num - 1, [d["name"] for d in drivers], http_session)
+    )
+    race_context = gp.clean_urls(race_context_raw)
+    print(f"   ✓ Race context generated ({len(race_context)} chars)")
+
+    print(f"\n2. Generating {len(drivers)} baseline driver previews...")
+    results = await asyncio.gather(*[
+        gp.generate_driver_preview_async(
+            client, driver, circuit, race_context, None, season, race_date,
+            form_digest=form_digests.get(driver["name"], "")
+        )
+        for driver in drivers
+    ])
+    previews = {}
+    for driver_name, preview, error in results:
+        if error:
+            print(f"   ✗ {driver_name}: {error} (will be generated in full on the race weekend)")
+        else:
+            previews[driver_name] = preview
+            print(f"   ✓ {driver_name}")
+
+    return {
+        "metadata": {
+            "circuit": circuit,
+            "date": race_date,
+            "season": season,
+            "round": round_num,
+            "generatedAt": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        "raceContext": race_context,
+        "formDigests": form_digests,
+        "drivers": previews,
+    }
+
+
+async def pregenerate_next_gp(client, force=False, now=None, directory=PREGENERATED_DIR):
+    """Pre-generate the next race's baseline once the previous race is finished, in off-peak hours
+
+    Returns the baseline path, or None if there was nothing to do yet.
+    """
+    now = now or datetime.now()
+    print("\n🔮 Checking for a Grand Prix to pre-generate...")
+
+    async with gp.http_session_scope() as session:
+        current = await f1data.get_current_season(session)
+        if not current:
+            print("   ✗ Could not fetch the current season")
+            return None
+
+        race = f1data.next_race(current['races'], now.date())
+        if race is None:
+            print("   ℹ No races left this season")
+            return None
+
+        circuit, race_date, round_num = f1data.circuit_name(race), f1data.race_day(race), int(race['round'])
+        season = str(current.get('season') or gp.SEASON)
+        print(f"   ℹ Next race: round {round_num}, {race.get('raceName') or circuit} on {race_date}")
+
+        if f1data.completed_rounds(current['races']) < round_num - 1:
+            print(f"   ℹ Round {round_num - 1} has no results yet, waiting for it to finish")
+            return None
+        if not force and load_baseline(race_date, directory):
+            print(f"   ✓ Baseline already pre-generated: {baseline_path(race_date, directory)}")
+            return None
+        if not force and now.hour not in OFF_PEAK_HOURS:
+            print(f"   ℹ Outside off-peak hours ({OFF_PEAK_HOURS.start:02d}:00-{OFF_PEAK_HOURS.stop:02d}:00), "
+                  f"use --force to run now")
+            return None
+
+        await gp.use_season_roster(season, session, round_num - 1)
+        baseline = await generate_baseline(client, circuit, race_date, season, round_num, http_session=session)
+
+    path = save_baseline(baseline, directory)
+    if path:
+        print(f"\n✅ Baseline for {circuit} saved to {path} ({len(baseline['drivers'])} driver previews)")
+    return path
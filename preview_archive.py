@@ -0,0 +1,169 @@
+"""
+Indexed archive of generated preview documents
+
+Every section written to a preview JSON is also stored here as its own row,
+keyed by season, race date, section and driver (one row per driver for the
+drivers section). Queries like "Verstappen's previews across the season"
+then read only the rows they need instead of loading whole ~100 KB documents,
+and iter_sections() yields rows one at a time.
+
+Usage:
+  python generate_previews.py --only=archive     # Index preview_data.json and archive/**/*.json
+"""
+
+import glob
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    season TEXT NOT NULL,
+    race_date TEXT NOT NULL,
+    round INTEGER,
+    circuit TEXT,
+    section TEXT NOT NULL,
+    driver TEXT NOT NULL DEFAULT '',
+    archived_at TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (season, race_date, section, driver)
+);
+CREATE INDEX IF NOT EXISTS sections_by_driver ON sections (driver, section, race_date);
+CREATE INDEX IF NOT EXISTS sections_by_round ON sections (season, round, section);
+"""
+
+
+class PreviewArchive:
+    """SQLite-backed store of preview sections indexed by season, round, driver and section"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_document(self, document, sections=None):
+        """Store a preview document's sections, or only the given section keys
+
+        Keys follow save_sections(): a section name, or a (section, entry) tuple
+        for a single driver. Documents without metadata can't be placed in the
+        index and are skipped; returns the number of rows written.
+        """
+        metadata = document.get('metadata') or {}
+        if not metadata.get('season') or not metadata.get('date'):
+            return 0
+
+        if sections is None:
+            sections = [key for key in document if key != 'metadata']
+
+        archived_at = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for key in sections:
+            if isinstance(key, tuple):
+                section, driver = key
+                entries = {driver: document.get(section, {}).get(driver)}
+            elif key == 'drivers':
+                section, entries = key, document.get('drivers') or {}
+            elif key == 'metadata' or key not in document:
+                continue
+            else:
+                section, entries = key, {'': document[key]}
+
+            for driver, payload in entries.items():
+                if payload is None:
+                    continue
+                rows.append((
+                    str(metadata['season']), metadata['date'], metadata.get('round'), metadata.get('circuit'),
+                    section, driver, archived_at, json.dumps(payload)
+                ))
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO sections "
+                "(season, race_date, round, circuit, section, driver, archived_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def import_files(self, paths):
+        """Index existing preview JSON files, e.g. a backfill archive directory"""
+        total = 0
+        for path in paths:
+            with open(path, 'r') as f:
+                document = json.load(f)
+            if isinstance(document, dict):
+                total += self.add_document(document)
+        return total
+
+    def iter_sections(self, section=None, driver=None, season=None, round_num=None,
+                      before_date=None, limit=None, newest_first=True):
+        """Yield matching sections one row at a time, decoding only each row's payload"""
+        clauses, params = [], []
+        for column, value in (("section", section), ("driver", driver), ("season", season), ("round", round_num)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value) if column == "season" else value)
+        if before_date is not None:
+            clauses.append("race_date < ?")
+            params.append(before_date)
+
+        query = "SELECT season, round, circuit, race_date, section, driver, archived_at, payload FROM sections"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY race_date {'DESC' if newest_first else 'ASC'}, section, driver"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        for season_value, round_value, circuit, race_date, section_name, driver_name, archived_at, payload in \
+                self.db.execute(query, params):
+            yield {
+                "season": season_value,
+                "round": round_value,
+                "circuit": circuit,
+                "date": race_date,
+                "section": section_name,
+                "driver": driver_name or None,
+                "archivedAt": archived_at,
+                "data": json.loads(payload),
+            }
+
+    def races(self, season=None):
+        """Archived races as (season, round, circuit, date), oldest first"""
+        query = "SELECT DISTINCT season, round, circuit, race_date FROM sections"
+        params = []
+        if season is not None:
+            query += " WHERE season = ?"
+            params.append(str(season))
+        return list(self.db.execute(query + " ORDER BY race_date", params))
+
+    def driver_history(self, driver, before_date=None, limit=3):
+        """Compact text of our last `limit` previews for a driver, for prompt context"""
+        lines = []
+        for row in self.iter_sections(section='drivers', driver=driver, before_date=before_date, limit=limit):
+            preview = row["data"]
+            if preview.get('tldr') == "Error generating preview":
+                continue
+            label = f"R{row['round']} " if row['round'] else ""
+            lines.append(
+                f"- {label}{row['circuit']} ({row['date']}): {preview.get('stakes_level', 'medium')} stakes; "
+                f"perfect {preview.get('perfect_quali', 'N/A')} / {preview.get('perfect_race', 'N/A')}, "
+                f"good {preview.get('good_quali', 'N/A')} / {preview.get('good_race', 'N/A')}"
+            )
+        return "\n".join(lines)
+
+
+def archive_files(archive_dir, extra_files=()):
+    """Preview JSON files under an archive directory (skipping backfill state files)"""
+    paths = [
+        path for path in glob.glob(os.path.join(archive_dir, '**', '*.json'), recursive=True)
+        if not os.path.basename(path).startswith('backfill_state')
+    ]
+    return [path for path in extra_files if os.path.exists(path)] + sorted(paths)
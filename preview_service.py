@@ -0,0 +1,247 @@
+"""
+Long-running preview service with warm clients and a local HTTP API
+
+Keeps the OpenAI client and an aiohttp session open between requests so
+targeted refreshes skip interpreter start, client construction and TLS
+handshakes. Regeneration jobs go through a bounded queue and reuse the
+existing generate_*_only functions. Identical jobs are coalesced while in
+flight, and several workers run distinct jobs concurrently since each job
+merges only its own section into the preview file.
+
+Usage:
+  python generate_previews.py --only=serve --port=8080 --workers=4
+
+Endpoints:
+  GET  /preview                      Current preview document (ETag / If-None-Match)
+  POST /regenerate/standings         Refresh standings from the F1 API
+  POST /regenerate/driver/{name}     Regenerate a single driver profile
+  POST /regenerate/{section}         prediction, top5, underdogs or drivers
+  GET  /jobs                         Recent jobs and queue depth
+  GET  /jobs/{job_id}                Status of a single job
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+import generate_previews as gp
+import job_coordinator
+
+SECTIONS = ("prediction", "top5", "underdogs", "drivers")
+MAX_JOB_HISTORY = 200
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PreviewService:
+    """Owns the warm clients, the in-memory preview document and the job queue"""
+
+    def __init__(self, client, json_file="preview_data.json", queue_size=16, workers=4):
+        self.client = client
+        self.json_file = json_file
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.coordinator = job_coordinator.JobCoordinator.for_json_file(json_file)
+        self.worker_count = workers
+        self.http_session = None
+        self.workers = []
+        self.document = None
+        self.etag = None
+        self.document_mtime = None
+
+    async def start(self, app):
+        aiohttp = gp.lazy_import("aiohttp")
+        self.http_session = aiohttp.ClientSession()
+        self.reload_document()
+        self.workers = [asyncio.create_task(self.run_worker()) for _ in range(self.worker_count)]
+
+    async def stop(self, app):
+        for worker in self.workers:
+            worker.cancel()
+        if self.http_session:
+            await self.http_session.close()
+        if self.client is not None:
+            await self.client.close()
+
+    def reload_document(self):
+        """Re-read the preview JSON if it changed on disk since the last read"""
+        if not os.path.exists(self.json_file):
+            return
+
+        mtime = os.path.getmtime(self.json_file)
+        if mtime == self.document_mtime:
+            return
+
+        with open(self.json_file, 'rb') as f:
+            raw = f.read()
+
+        self.document = raw
+        self.etag = f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+        self.document_mtime = mtime
+
+    def job_coroutine(self, job):
+        """Map a queued job onto the existing generate_*_only functions"""
+        kind = job["kind"]
+        if kind == "standings":
+            return gp.generate_standings_only(self.json_file, http_session=self.http_session)
+        if kind == "driver":
+            return gp.generate_single_driver_only(
+                self.client, job["driver"], self.json_file, http_session=self.http_session
+            )
+        if kind == "prediction":
+            return gp.generate_prediction_only(self.client, self.json_file, http_session=self.http_session)
+        if kind == "top5":
+            return gp.generate_top5_only(self.client, self.json_file, http_session=self.http_session)
+        if kind == "underdogs":
+            return gp.generate_underdogs_only(self.client, self.json_file, http_session=self.http_session)
+        if kind == "drivers":
+            return gp.generate_all_drivers_only(self.client, self.json_file, http_session=self.http_session)
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    def submit(self, kind, **params):
+        """Queue a job, returning None if the queue is full
+
+        An identical job that is still queued or running is returned instead of
+        queueing a duplicate.
+        """
+        key = job_coordinator.job_key(kind, self.json_file, params.get("driver"))
+        for job in self.jobs.values():
+            if job["key"] == key and job["status"] in ("queued", "running"):
+                job["coalesced"] += 1
+                return job
+
+        if self.queue.full():
+            return None
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "key": key,
+            "kind": kind,
+            "status": "queued",
+            "submittedAt": utc_now(),
+            "startedAt": None,
+            "finishedAt": None,
+            "durationSeconds": None,
+            "error": None,
+            "coalesced": 0,
+            **params,
+        }
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > MAX_JOB_HISTORY:
+            self.jobs.popitem(last=False)
+
+        self.queue.put_nowait(job)
+        return job
+
+    async def run_worker(self):
+        """Run queued jobs; the coordinator also coalesces with other processes"""
+        while True:
+            job = await self.queue.get()
+            job["status"] = "running"
+            job["startedAt"] = utc_now()
+            started = asyncio.get_running_loop().time()
+
+            try:
+                # Each job gets its own run budget, so the daemon's lifetime usage never exhausts it
+                with gp.job_run() as run:
+                    ran = await self.coordinator.run(job["key"], lambda: self.job_coroutine(job))
+                job["status"] = "done" if ran else "coalesced"
+                job["usage"] = dict(run["budget"].total)
+                job["tiers"] = gp.tier_summary(run["tiers"])
+                job["routing"] = dict(run["routing"])
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"   ✗ Job {job['id']} ({job['kind']}) failed: {e}")
+            finally:
+                job["finishedAt"] = utc_now()
+                job["durationSeconds"] = round(asyncio.get_running_loop().time() - started, 3)
+                self.reload_document()
+                self.queue.task_done()
+
+    # HTTP handlers
+
+    async def handle_preview(self, request):
+        self.reload_document()
+        if self.document is None:
+            return web.json_response({"error": f"{self.json_file} not found"}, status=404)
+
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(body=self.document, content_type="application/json", headers=headers)
+
+    def accepted(self, job):
+        if job is None:
+            return web.json_response({"error": "Job queue is full, try again shortly"}, status=503)
+        return web.json_response(job, status=202, headers={"Location": f"/jobs/{job['id']}"})
+
+    async def handle_standings(self, request):
+        return self.accepted(self.submit("standings"))
+
+    async def handle_driver(self, request):
+        driver = gp.current_roster().resolve(request.match_info["name"])
+        if not driver:
+            return web.json_response(
+                {"error": f"Driver '{request.match_info['name']}' not found in the roster"}, status=404
+            )
+        return self.accepted(self.submit("driver", driver=driver["name"]))
+
+    async def handle_section(self, request):
+        section = request.match_info["section"]
+        if section not in SECTIONS:
+            return web.json_response(
+                {"error": f"Unknown section '{section}'", "sections": list(SECTIONS) + ["standings", "driver/{name}"]},
+                status=404
+            )
+        return self.accepted(self.submit(section))
+
+    async def handle_jobs(self, request):
+        return web.json_response({
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "jobs": list(reversed(self.jobs.values())),
+        })
+
+    async def handle_job(self, request):
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "Job not found"}, status=404)
+        return web.json_response(job)
+
+    def create_app(self):
+        app = web.Application()
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        app.add_routes([
+            web.get("/preview", self.handle_preview),
+            web.post("/regenerate/standings", self.handle_standings),
+            web.post("/regenerate/driver/{name}", self.handle_driver),
+            web.post("/regenerate/{section}", self.handle_section),
+            web.get("/jobs", self.handle_jobs),
+            web.get("/jobs/{job_id}", self.handle_job),
+        ])
+        return app
+
+
+async def serve(client, json_file="preview_data.json", host="127.0.0.1", port=8080, queue_size=16, workers=4):
+    """Run the preview service until interrupted"""
+    service = PreviewService(client, json_file=json_file, queue_size=queue_size, workers=workers)
+    runner = web.AppRunner(service.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    print(f"\n🛰  Preview service listening on http://{host}:{port} (queue size {queue_size}, {workers} workers)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
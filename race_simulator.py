@@ -0,0 +1,183 @@
+"""
+Monte Carlo race simulator that grounds the top 5, underdogs and prediction prompts
+
+Builds per-driver pace, qualifying pace and reliability from the cached
+f1api race and qualifying results, then runs 100k+ races at once as NumPy
+arrays: a simulated (or known) grid, race pace with noise, random DNFs, and
+extra variance for every safety car. The result is each driver's win, podium
+and points probability, published in the preview document and injected into
+the prompts as a compact table.
+
+Usage:
+  python generate_previews.py --only=simulation     # Re-run the simulation for the current preview
+"""
+
+import asyncio
+import re
+import time
+
+import numpy as np
+
+import f1data
+import results_arrays
+
+N_SIMULATIONS = 100_000
+FORM_ROUNDS = 6  # Most recent rounds used for pace and reliability
+FORM_DECAY = 0.8  # Weight of each older round relative to the next newer one
+GRID_WEIGHT = 0.45  # Share of the race outcome explained by starting position
+QUALI_NOISE = 2.0  # Position-scale noise of a simulated qualifying session
+RACE_NOISE = 2.6  # Position-scale noise of a race without safety cars
+SAFETY_CAR_RATE = 0.6  # Expected safety cars per race when no circuit history is available
+SAFETY_CAR_NOISE = 0.35  # Extra relative race noise per safety car
+DNF_PRIOR = (1.0, 11.0)  # Beta prior on DNF probability (mean ~8%)
+POINTS = np.array([25, 18, 15, 12, 10, 8, 6, 4, 2, 1], dtype=np.float32)
+
+
+def weighted_form(matrix, default):
+    """Recency-weighted mean per driver over rows (oldest first), ignoring NaN"""
+    n_rounds = matrix.shape[0]
+    if n_rounds == 0:
+        return np.full(matrix.shape[1], default, dtype=np.float32)
+
+    weights = FORM_DECAY ** np.arange(n_rounds - 1, -1, -1, dtype=np.float32)
+    present = ~np.isnan(matrix)
+    total_weight = (weights[:, None] * present).sum(axis=0)
+    weighted = (weights[:, None] * np.nan_to_num(matrix)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        form = weighted / total_weight
+    return np.where(total_weight > 0, form, default).astype(np.float32)
+
+
+def driver_inputs(names, race_rounds, quali_rounds):
+    """Race pace, quali pace (lower is better) and DNF probability per driver"""
+    arrays = results_arrays.build_results_arrays(names, race_rounds, quali_rounds)
+    race_pos, dnf, quali_pos = arrays["race"], arrays["dnf"], arrays["quali"]
+    n_drivers = len(names)
+    midfield = (n_drivers + 1) / 2 + 2  # Drivers without results are assumed below midfield
+
+    race_pace = weighted_form(race_pos, midfield)
+    quali_pace = weighted_form(quali_pos, midfield)
+
+    starts = (~np.isnan(dnf)).sum(axis=0)
+    dnfs = np.nansum(dnf, axis=0)
+    alpha, beta = DNF_PRIOR
+    dnf_prob = ((dnfs + alpha) / (starts + alpha + beta)).astype(np.float32)
+    return race_pace, quali_pace, dnf_prob
+
+
+def parse_session_grid(session_text, names):
+    """Grid order from free-text session results like "P1: Norris (1:29.5), P2: Verstappen"
+
+    Returns an array of grid positions (NaN where unknown), or None if the
+    text names no drivers we recognise.
+    """
+    if not session_text:
+        return None
+
+    surnames = {name.split()[-1].lower(): i for i, name in enumerate(names)}
+    grid = np.full(len(names), np.nan, dtype=np.float32)
+    for position, driver in re.findall(r"P(\d+):\s*([A-Za-zÀ-ÿ'\- ]+?)\s*(?:\(|,|\.|$)", session_text):
+        i = surnames.get(driver.strip().split()[-1].lower()) if driver.strip() else None
+        if i is not None:
+            grid[i] = int(position)
+
+    return grid if not np.isnan(grid).all() else None
+
+
+def rank_rows(scores):
+    """1-based rank of each column within its row (lowest score ranks 1)"""
+    order = scores.argsort(axis=1)
+    ranks = np.empty_like(order)
+    rows = np.arange(scores.shape[0])[:, None]
+    ranks[rows, order] = np.arange(1, scores.shape[1] + 1)
+    return ranks
+
+
+def simulate(race_pace, quali_pace, dnf_prob, grid=None, n_sims=N_SIMULATIONS,
+             safety_car_rate=SAFETY_CAR_RATE, seed=None):
+    """Run n_sims races at once; returns (finish positions, DNF mask), each (n_sims x drivers)
+
+    grid holds known starting positions (NaN for unknown ones); unknown grid
+    slots come from a simulated qualifying session.
+    """
+    rng = np.random.default_rng(seed)
+    n_drivers = race_pace.shape[0]
+
+    # Grid: known positions stay fixed, the rest are ranked from noisy quali pace behind them
+    quali_score = quali_pace[None, :] + rng.normal(0.0, QUALI_NOISE, (n_sims, n_drivers)).astype(np.float32)
+    if grid is not None:
+        known = ~np.isnan(grid)
+        quali_score = np.where(known[None, :], np.nan_to_num(grid)[None, :] - 1000.0, quali_score)
+    grid_pos = rank_rows(quali_score).astype(np.float32)
+
+    # Race: blend of grid and race pace, noisier with every safety car
+    safety_cars = rng.poisson(safety_car_rate, n_sims).astype(np.float32)
+    noise_scale = RACE_NOISE * (1.0 + SAFETY_CAR_NOISE * safety_cars)
+    race_score = (GRID_WEIGHT * grid_pos + (1.0 - GRID_WEIGHT) * race_pace[None, :]
+                  + rng.standard_normal((n_sims, n_drivers), dtype=np.float32) * noise_scale[:, None])
+
+    dnf = rng.random((n_sims, n_drivers), dtype=np.float32) < dnf_prob[None, :]
+    race_score = np.where(dnf, race_score + 1000.0, race_score)
+    finish = rank_rows(race_score)
+    return finish, dnf
+
+
+def summarise(names, finish, dnf):
+    """Per-driver probabilities, sorted by win probability"""
+    n_points = min(len(POINTS), finish.shape[1])
+    points_table = np.zeros(finish.shape[1] + 1, dtype=np.float32)
+    points_table[1:n_points + 1] = POINTS[:n_points]
+    classified = ~dnf
+
+    win = ((finish == 1) & classified).mean(axis=0)
+    podium = ((finish <= 3) & classified).mean(axis=0)
+    in_points = ((finish <= 10) & classified).mean(axis=0)
+    expected_points = (points_table[finish] * classified).mean(axis=0)
+    mean_finish = finish.mean(axis=0)
+    dnf_rate = dnf.mean(axis=0)
+
+    rows = [
+        {
+            "driver": name,
+            "win": round(float(win[i]), 4),
+            "podium": round(float(podium[i]), 4),
+            "points": round(float(in_points[i]), 4),
+            "expectedPoints": round(float(expected_points[i]), 2),
+            "meanFinish": round(float(mean_finish[i]), 2),
+            "dnf": round(float(dnf_rate[i]), 4),
+        }
+        for i, name in enumerate(names)
+    ]
+    return sorted(rows, key=lambda row: (-row["win"], -row["podium"], row["meanFinish"]))
+
+
+async def run_simulation(session, season, latest_round, names, qualifying_text=None,
+                         safety_car_rate=SAFETY_CAR_RATE, n_sims=N_SIMULATIONS, seed=None):
+    """Simulate the upcoming race from the last FORM_ROUNDS completed rounds
+
+    Returns None if none of those rounds has results, since every driver
+    would then get the same prior and the table would carry no information.
+    """
+    if not latest_round:
+        return None
+    first_round = max(1, latest_round - FORM_ROUNDS + 1)
+    rounds = range(first_round, latest_round + 1)
+    race_rounds = await asyncio.gather(*[f1data.get_race_results(session, season, r) for r in rounds])
+    quali_rounds = await asyncio.gather(*[f1data.get_qualifying_results(session, season, r) for r in rounds])
+    if not any(f1data.has_results(race_data) for race_data in race_rounds):
+        return None
+
+    started = time.perf_counter()
+    race_pace, quali_pace, dnf_prob = driver_inputs(names, race_rounds, quali_rounds)
+    grid = parse_session_grid(qualifying_text, names)
+    finish, dnf = simulate(race_pace, quali_pace, dnf_prob, grid, n_sims, safety_car_rate, seed)
+    drivers = summarise(names, finish, dnf)
+
+    return {
+        "simulations": n_sims,
+        "basedOnRounds": [first_round, latest_round],
+        "gridFromQualifying": grid is not None,
+        "safetyCarRate": safety_car_rate,
+        "elapsedSeconds": round(time.perf_counter() - started, 3),
+        "drivers": drivers,
+    }
@@ -0,0 +1,55 @@
+"""
+Cached f1api race and qualifying results stacked into NumPy arrays
+
+Shared by the form digest and the race simulator, which both look at a run
+of rounds per driver.
+"""
+
+import numpy as np
+
+import f1data
+
+
+def build_results_arrays(names, race_rounds, quali_rounds):
+    """Stack results into (rounds x drivers) arrays, oldest round first
+
+    race_rounds and quali_rounds are lists of f1api responses. Returns race
+    and quali positions (NaN where missing or not classified), points, DNF
+    flags (NaN where the driver didn't start) and team ids (-1 where the
+    driver didn't take part). Team ids are per round, so mid-season driver
+    swaps pair the right teammates.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    shape = (len(race_rounds), len(names))
+    race_pos = np.full(shape, np.nan, dtype=np.float32)
+    quali_pos = np.full((len(quali_rounds), len(names)), np.nan, dtype=np.float32)
+    points = np.zeros(shape, dtype=np.float32)
+    dnf = np.full(shape, np.nan, dtype=np.float32)
+    team = np.full(shape, -1, dtype=np.int32)
+    team_ids = {}
+
+    for r, race_data in enumerate(race_rounds):
+        if not f1data.has_results(race_data):
+            continue
+        for result in race_data['races']['results']:
+            i = index.get(f1data.driver_display_name(result['driver']))
+            if i is None:
+                continue
+            position = f1data.to_int(result.get('position'))
+            retired = result.get('retired') is not None or position is None
+            team[r, i] = team_ids.setdefault(result['team']['teamName'], len(team_ids))
+            points[r, i] = result.get('points') or 0
+            dnf[r, i] = 1.0 if retired else 0.0
+            if not retired:
+                race_pos[r, i] = position
+
+    for r, quali_data in enumerate(quali_rounds):
+        if not f1data.has_results(quali_data, 'qualyResults'):
+            continue
+        for result in quali_data['races']['qualyResults']:
+            i = index.get(f1data.driver_display_name(result['driver']))
+            position = f1data.to_int(result.get('gridPosition'))
+            if i is not None and position is not None:
+                quali_pos[r, i] = position
+
+    return {"race": race_pos, "quali": quali_pos, "points": points, "dnf": dnf, "team": team}
@@ -0,0 +1,177 @@
+"""
+Driver roster and alias index for a season
+
+The roster is built from the cached f1api.dev drivers and teams of a season,
+with the line-up taken from the latest round that has race results (so
+mid-season swaps and reserve drivers are handled), and falls back to the
+hard-coded drivers_2025 list when the upstream has nothing. Every driver is
+indexed by full name, surname, first name, car number, three-letter code
+and f1api id, case- and accent-insensitively, so a free-text reference from
+the model ("VER", "#44", "Hülkenberg", "Lando Norris (McLaren)") resolves
+with a dictionary lookup. Resolved references carry a stable driverId (the
+slug of the display name, e.g. "kimi_antonelli") the frontend can join on.
+"""
+
+import asyncio
+import re
+import unicodedata
+
+import f1data
+import generate_previews as gp
+
+MAX_NGRAM = 3  # Longest run of words tried when scanning free text for a name
+
+
+def normalize(text):
+    """Lower-case, accent-free words of a name: "Nico Hülkenberg" -> "nico hulkenberg" """
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return " ".join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def driver_id(name):
+    """Stable id for a display name, the same whichever source the roster came from"""
+    return normalize(name).replace(" ", "_")
+
+
+def driver_aliases(driver):
+    """Normalised names a driver can be referred to by"""
+    aliases = {driver["id"].replace("_", " ")}
+    for name in [driver["name"]] + driver.get("aliases", []):
+        words = normalize(name).split()
+        if not words:
+            continue
+        aliases.update(" ".join(words[i:]) for i in range(len(words)))  # Full name and surname
+        aliases.add(words[0])
+    if driver.get("number") is not None:
+        aliases.add(str(driver["number"]))
+    if driver.get("code"):
+        aliases.add(normalize(driver["code"]))
+    return aliases
+
+
+def from_f1api(driver, team=None):
+    """Roster entry for an f1api.dev driver object"""
+    name = f1data.driver_display_name(driver)
+    return {
+        "id": driver_id(name),
+        "name": name,
+        "team": team or "",
+        "number": driver.get("number"),
+        "code": driver.get("shortName"),
+        "aliases": [f"{driver['name']} {driver['surname']}"] + (
+            [driver["driverId"].replace("_", " ")] if driver.get("driverId") else []
+        ),
+    }
+
+
+class Roster:
+    """A season's drivers indexed by every alias; `lineup` is who previews are generated for"""
+
+    def __init__(self, drivers, lineup=None):
+        """drivers: entries in the drivers_2025 shape, a later entry for the same driver updating an
+        earlier one; lineup: ids of the drivers in the line-up (default: all)"""
+        self.by_id = {}
+        for driver in drivers:
+            driver = dict(driver, id=driver.get("id") or driver_id(driver["name"]))
+            known = self.by_id.get(driver["id"], {})
+            driver["aliases"] = known.get("aliases", []) + driver.get("aliases", [])
+            self.by_id[driver["id"]] = {**known, **driver}
+        self.drivers = list(self.by_id.values())
+        self.lineup = [self.by_id[key] for key in lineup if key in self.by_id] if lineup else self.drivers
+
+        self.index = {}
+        for driver in self.drivers:
+            for alias in driver_aliases(driver):
+                # An alias shared by two drivers resolves to neither
+                self.index[alias] = driver if self.index.get(alias, driver) is driver else None
+
+    def get(self, driver_id):
+        return self.by_id.get(driver_id)
+
+    def resolve(self, text):
+        """Roster entry a driver reference points to, or None if it names nobody or several drivers
+
+        Tries the whole reference first, then the longest runs of words in
+        it, so "P1 Max Verstappen (Red Bull)" still resolves.
+        """
+        key = normalize(text or "")
+        if key in self.index:
+            return self.index[key]
+
+        words = [word for word in key.split() if not word.isdigit()]
+        for size in range(min(len(words), MAX_NGRAM), 0, -1):
+            found = {
+                self.index[ngram]["id"]: self.index[ngram]
+                for ngram in (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+                if self.index.get(ngram)
+            }
+            if len(found) == 1:
+                return next(iter(found.values()))
+            if found:
+                return None
+        return None
+
+    def tag(self, item, key="driver"):
+        """Rewrite item[key] to the canonical name and add its driverId (None if unresolved)"""
+        driver = self.resolve(item.get(key))
+        if driver:
+            item[key] = driver["name"]
+        item["driverId"] = driver["id"] if driver else None
+        return item
+
+
+def tag_previews(previews):
+    """Add its driverId to each preview of a {display name: preview} dict"""
+    for name, preview in previews.items():
+        preview["driverId"] = driver_id(name)
+    return previews
+
+
+def roster_section(drivers):
+    """The "roster" section of the preview document: the drivers previewed, joinable on id"""
+    return [
+        {"id": d.get("id") or driver_id(d["name"]), "name": d["name"], "team": d.get("team", ""),
+         "number": d.get("number"), "code": d.get("code")}
+        for d in drivers
+    ]
+
+
+def lineup_from_results(race_data):
+    """Roster entries for the drivers who raced a round, or None without results"""
+    if not f1data.has_results(race_data):
+        return None
+    return [from_f1api(result['driver'], result['team']['teamName']) for result in race_data['races']['results']]
+
+
+async def lineup_for_round(session, season, round_num):
+    """Drivers who raced this round, else the most recent earlier round with results, or None"""
+    for candidate in range(round_num, 0, -1):
+        lineup = lineup_from_results(await f1data.get_race_results(session, season, candidate))
+        if lineup:
+            return lineup
+    return None
+
+
+async def load_roster(season, http_session=None, round_num=None):
+    """Roster for a season from the cached f1api drivers and teams
+
+    The line-up is the drivers of round_num (default: the latest completed
+    round) or the most recent round before it with results. Falls back to
+    drivers_2025 if the upstream has no drivers for the season.
+    """
+    async with gp.http_session_scope(http_session) as session:
+        drivers_data, teams_data, calendar = await asyncio.gather(
+            f1data.get_drivers(session, season), f1data.get_teams(session, season),
+            f1data.get_season_calendar(session, season)
+        )
+        if round_num is None:
+            round_num = f1data.completed_rounds(calendar)
+        lineup = await lineup_for_round(session, season, round_num) if round_num else None
+
+    teams = {team.get('teamId'): team.get('teamName') for team in (teams_data or {}).get('teams', [])}
+    drivers = [
+        from_f1api(driver, teams.get(driver.get('teamId'))) for driver in (drivers_data or {}).get('drivers', [])
+    ]
+    if not drivers and not lineup:
+        return Roster(gp.drivers_2025)
+    return Roster(drivers + (lineup or []), lineup=[driver["id"] for driver in lineup] if lineup else None)
@@ -0,0 +1,234 @@
+"""
+Run-level token and cost budget for OpenAI calls, with a dry-run mode
+
+Before each call the budget estimates its input tokens (prompt plus the
+input web search typically adds for the stage), output tokens (the stage's
+typical output) and cost. A call that would push the run or its stage over
+a ceiling is deferred until in-flight calls settle, downgraded to a cheaper
+tier, or refused with BudgetExceeded. Actual usage from each response
+replaces the estimate, and truncation retries are skipped when they would
+not fit.
+
+In dry-run mode no requests are made: every call is recorded at its
+estimate and answered with placeholder text of the expected length, so a
+full run or any --only mode reports its predicted footprint.
+
+Usage:
+  python generate_previews.py --dry-run                       # Predict tokens and cost of a full run
+  python generate_previews.py --only=drivers --dry-run
+  python generate_previews.py --max-tokens=1500000 --max-cost=8
+"""
+
+import asyncio
+import json
+from datetime import date, timedelta
+
+# USD per million tokens (input, output)
+MODEL_PRICES = {
+    "gpt-5": (1.25, 10.00),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5-nano": (0.05, 0.40),
+}
+WEB_SEARCH_PRICE = 0.01  # USD per web search call
+CHARS_PER_TOKEN = 4  # Prompt size estimate; the learned search overhead absorbs the error
+DEFAULT_SEARCH_INPUT = 12000  # Input tokens web search adds to a call before any are recorded
+DEFAULT_SEARCHES = 2
+# Typical output tokens (including reasoning) per stage before any calls are recorded
+DEFAULT_OUTPUT_TOKENS = {
+    "detect_gp": 1500,
+    "race_context": 6000,
+    "driver_preview": 4000,
+    "top5": 6000,
+    "underdogs": 5000,
+    "prediction": 8000,
+    "repair": 2000,
+    "race_context_update": 3000,
+    "driver_update": 3000,
+    "translate": 2500,
+    "translate_batch": 4000,
+}
+
+
+class BudgetExceeded(Exception):
+    """A call was refused because it would exceed the run or stage budget"""
+
+
+def prompt_tokens(prompt):
+    return len(prompt) // CHARS_PER_TOKEN + 1
+
+
+def call_cost(model, input_tokens, output_tokens, searches=0):
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES["gpt-5"])
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000 + searches * WEB_SEARCH_PRICE
+
+
+def count_web_searches(response):
+    return len([item for item in getattr(response, "output", None) or [] if item.type == "web_search_call"])
+
+
+def dry_run_text(stage, output_tokens):
+    """Placeholder response of roughly the expected length, in the shape the stage's parser expects"""
+    filler = " ".join(["lorem"] * max(1, output_tokens * CHARS_PER_TOKEN // 6))
+    if stage == "detect_gp":
+        race_date = (date.today() + timedelta(days=(6 - date.today().weekday()) or 7)).isoformat()
+        return json.dumps({"circuit": "dry-run", "race_date": race_date, "gp_name": "Dry Run Grand Prix"})
+    if stage in ("driver_preview", "driver_update"):
+        return (f"FULL: {filler}\nSTAKES: medium\nPERFECT_QUALI: P1\nPERFECT_RACE: P1\n"
+                f"GOOD_QUALI: P5\nGOOD_RACE: P5\n")
+    return filler
+
+
+def new_tally():
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+
+
+class RunBudget:
+    """Estimates, admits and accounts for every OpenAI call of one run
+
+    max_tokens and max_cost cap the whole run; stage_tokens maps a stage to
+    its own token ceiling. cheaper_tiers maps a tier to the one to try when
+    a call doesn't fit.
+    """
+
+    def __init__(self, stage_budgets, max_tokens=None, max_cost=None, stage_tokens=None,
+                 cheaper_tiers=None, dry_run=False):
+        self.stage_budgets = stage_budgets
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.stage_tokens = stage_tokens or {}
+        self.cheaper_tiers = cheaper_tiers or {}
+        self.dry_run = dry_run
+        self.total = new_tally()
+        self.stages = {}
+        self.reserved = {}  # id(reservation) -> (stage, estimate)
+        self.events = {"deferred": 0, "downgraded": 0, "refused": 0}
+        self.condition = None
+
+    def estimate(self, stage, model, prompt, max_output_tokens, search):
+        """Expected input/output tokens, web searches and cost of one call"""
+        typical = self.stage_budgets.typical
+        input_tokens = prompt_tokens(prompt)
+        searches = 0
+        if search:
+            overhead = typical("input_overheads", stage, model)
+            input_tokens += DEFAULT_SEARCH_INPUT if overhead is None else max(0, int(overhead))
+            searches = typical("searches", stage, model)
+            searches = DEFAULT_SEARCHES if searches is None else searches
+        output_tokens = typical("samples", stage, model) or DEFAULT_OUTPUT_TOKENS.get(stage, 4000)
+        output_tokens = min(max_output_tokens, int(output_tokens))
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "searches": searches,
+            "cost": call_cost(model, input_tokens, output_tokens, searches),
+        }
+
+    def limited(self):
+        return bool(self.max_tokens or self.max_cost or self.stage_tokens)
+
+    def committed(self, stage=None, include_reserved=True):
+        """Tokens and cost spent (plus reserved for in-flight calls), run-wide or for one stage"""
+        tally = self.total if stage is None else self.stages.get(stage, new_tally())
+        tokens, cost = tally["input_tokens"] + tally["output_tokens"], tally["cost"]
+        if include_reserved:
+            for reserved_stage, estimate in self.reserved.values():
+                if stage is None or reserved_stage == stage:
+                    tokens += estimate["input_tokens"] + estimate["output_tokens"]
+                    cost += estimate["cost"]
+        return tokens, cost
+
+    def fits(self, stage, estimate, include_reserved=True):
+        call_tokens = estimate["input_tokens"] + estimate["output_tokens"]
+        run_tokens, run_cost = self.committed(include_reserved=include_reserved)
+        if self.max_tokens and run_tokens + call_tokens > self.max_tokens:
+            return False
+        if self.max_cost and run_cost + estimate["cost"] > self.max_cost:
+            return False
+        stage_limit = self.stage_tokens.get(stage)
+        if stage_limit and self.committed(stage, include_reserved)[0] + call_tokens > stage_limit:
+            return False
+        return True
+
+    async def admit(self, stage, tier, estimate_for):
+        """Reserve budget for a call; returns (tier to use, estimate, reservation)
+
+        estimate_for(tier) estimates the call on a tier. Calls that only fit
+        once in-flight calls settle wait for them; calls that don't fit at
+        all move to cheaper tiers, and raise BudgetExceeded if none fits.
+        The caller must release() the reservation when the call is done.
+        """
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+
+        async with self.condition:
+            deferred = False
+            while True:
+                estimate = estimate_for(tier)
+                if not self.limited() or self.fits(stage, estimate):
+                    return self.reserve(stage, tier, estimate)
+                if self.reserved and self.fits(stage, estimate, include_reserved=False):
+                    if not deferred:
+                        self.events["deferred"] += 1
+                        print(f"   ⏸ {stage}: waiting for in-flight calls before spending more of the budget")
+                        deferred = True
+                    await self.condition.wait()
+                    continue
+                break
+
+            cheaper = self.cheaper_tiers.get(tier)
+            while cheaper:
+                estimate = estimate_for(cheaper)
+                if self.fits(stage, estimate):
+                    self.events["downgraded"] += 1
+                    print(f"   ⇩ {stage}: {tier} → {cheaper} tier to stay within the budget")
+                    return self.reserve(stage, cheaper, estimate)
+                cheaper = self.cheaper_tiers.get(cheaper)
+
+            self.events["refused"] += 1
+            run_tokens, run_cost = self.committed()
+            raise BudgetExceeded(
+                f"{stage} call refused: run at {run_tokens} tokens / ${run_cost:.2f}, "
+                f"call needs ~{estimate['input_tokens'] + estimate['output_tokens']} tokens"
+            )
+
+    def reserve(self, stage, tier, estimate):
+        reservation = object()
+        self.reserved[id(reservation)] = (stage, estimate)
+        return tier, estimate, reservation
+
+    def account(self, stage, model, input_tokens, output_tokens, searches=0):
+        """Add one request's actual usage"""
+        cost = call_cost(model, input_tokens, output_tokens, searches)
+        for tally in (self.total, self.stages.setdefault(stage, new_tally())):
+            tally["calls"] += 1
+            tally["input_tokens"] += input_tokens
+            tally["output_tokens"] += output_tokens
+            tally["cost"] += cost
+
+    async def release(self, reservation):
+        """Drop a call's reservation once its usage is accounted (or it failed) and wake deferred calls"""
+        self.reserved.pop(id(reservation), None)
+        if self.condition is not None:
+            async with self.condition:
+                self.condition.notify_all()
+
+    def print_report(self):
+        if not self.total["calls"]:
+            if self.dry_run:
+                print("\n🧪 Dry run: this mode makes no OpenAI calls")
+            return
+        title = "🧪 Dry run: predicted footprint" if self.dry_run else "💰 Run budget"
+        limits = [f"max {self.max_tokens} tokens" if self.max_tokens else None,
+                  f"max ${self.max_cost:.2f}" if self.max_cost else None]
+        limits = ", ".join(limit for limit in limits if limit)
+        print(f"\n{title}{f' ({limits})' if limits else ''}:")
+        for stage, tally in self.stages.items():
+            print(f"   {stage:<16} {tally['calls']:>3} calls, {tally['input_tokens']:>9} in / "
+                  f"{tally['output_tokens']:>8} out, ${tally['cost']:.2f}")
+        print(f"   {'total':<16} {self.total['calls']:>3} calls, {self.total['input_tokens']:>9} in / "
+              f"{self.total['output_tokens']:>8} out, ${self.total['cost']:.2f}")
+        if self.limited():
+            print(f"   deferred: {self.events['deferred']}, downgraded: {self.events['downgraded']}, "
+                  f"refused: {self.events['refused']}")
+        if self.dry_run:
+            print("   (estimates from recorded usage where available; header image not included)")
@@ -0,0 +1,281 @@
+"""
+Automatic session analysis from OpenF1 lap timing
+
+Fetches lap, stint and classification data for the weekend's practice,
+sprint and qualifying sessions (or reads local dumps of the same OpenF1
+endpoints), holds each session as (drivers x laps) NumPy arrays and
+computes, for all drivers at once: best laps and gaps, sector deltas and
+ideal laps, long-run pace per compound and tyre degradation slopes. The
+result is the session text get_session_context() feeds into the prompts,
+in the same "P1: Name (time)" shape as hand-typed SESSION_RESULTS.
+
+Usage:
+  python generate_previews.py --only=sessions     # Print the analysed sessions for the current preview
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+import f1data
+
+# OpenF1 session_name -> SESSION_RESULTS key
+SESSION_KEYS = {
+    "Practice 1": "fp1",
+    "Practice 2": "fp2",
+    "Practice 3": "fp3",
+    "Sprint Qualifying": "sprint_qualifying",
+    "Sprint Shootout": "sprint_qualifying",
+    "Sprint": "sprint",
+    "Qualifying": "qualifying",
+}
+COMPOUNDS = ["SOFT", "MEDIUM", "HARD", "INTERMEDIATE", "WET"]
+LONG_RUN_LAPS = 5  # Clean laps on one set of tyres for a stint to count as a long run
+LONG_RUN_CUTOFF = 1.08  # Laps slower than this multiple of the driver's best lap are not push laps
+FINISHED_GRACE = 30 * 60  # Seconds after a session ends before its timing data is cached for good
+TOP_DRIVERS = 10  # Drivers listed in sector and long-run summaries
+
+
+def format_lap(seconds):
+    minutes, rest = divmod(float(seconds), 60)
+    return f"{int(minutes)}:{rest:06.3f}"
+
+
+def build_lap_arrays(laps, stints, driver_numbers):
+    """(drivers x laps) arrays of lap and sector times, stint, compound and tyre age
+
+    Pit in- and out-laps are NaN in the lap and sector times, so every
+    statistic below only sees flying laps.
+    """
+    index = {number: i for i, number in enumerate(driver_numbers)}
+    n_laps = max((lap.get('lap_number') or 0 for lap in laps), default=0)
+    shape = (len(driver_numbers), n_laps + 1)  # Column 0 unused so columns are lap numbers
+    times = np.full((4,) + shape, np.nan, dtype=np.float64)  # lap, sector 1, 2, 3
+    pit_out = np.zeros(shape, dtype=bool)
+    stint = np.full(shape, -1, dtype=np.int32)
+    compound = np.full(shape, -1, dtype=np.int32)
+    tyre_age = np.zeros(shape, dtype=np.float64)
+
+    for lap in laps:
+        i = index.get(lap.get('driver_number'))
+        n = lap.get('lap_number')
+        if i is None or not n:
+            continue
+        for k, field in enumerate(('lap_duration', 'duration_sector_1', 'duration_sector_2', 'duration_sector_3')):
+            if lap.get(field) is not None:
+                times[k, i, n] = lap[field]
+        pit_out[i, n] = bool(lap.get('is_pit_out_lap'))
+
+    for entry in stints:
+        i = index.get(entry.get('driver_number'))
+        start, end = entry.get('lap_start'), entry.get('lap_end')
+        if i is None or not start or not end:
+            continue
+        end = min(end, n_laps)
+        stint[i, start:end + 1] = entry.get('stint_number') or 0
+        if entry.get('compound') in COMPOUNDS:
+            compound[i, start:end + 1] = COMPOUNDS.index(entry['compound'])
+        tyre_age[i, start:end + 1] = (entry.get('tyre_age_at_start') or 0) + np.arange(end - start + 1)
+
+    # An in-lap is the lap before an out-lap
+    in_lap = np.zeros(shape, dtype=bool)
+    in_lap[:, :-1] = pit_out[:, 1:]
+    times[:, pit_out | in_lap] = np.nan
+
+    return {"times": times, "stint": stint, "compound": compound, "tyreAge": tyre_age}
+
+
+def best_laps(times):
+    """Best lap per driver, best sectors and ideal lap (NaN where a driver set no flying lap)"""
+    with np.errstate(invalid='ignore'):
+        present = ~np.isnan(times).all(axis=2)
+        best = np.where(present, np.nanmin(np.where(np.isnan(times), np.inf, times), axis=2), np.nan)
+    return best[0], best[1:], best[1:].sum(axis=0)
+
+
+def long_runs(arrays, best_lap):
+    """Average pace, degradation slope and lap count per (driver, compound) over long runs"""
+    lap_time = arrays["times"][0]
+    stint, compound, age = arrays["stint"], arrays["compound"], arrays["tyreAge"]
+    n_drivers, n_cols = lap_time.shape
+    n_compounds = len(COMPOUNDS)
+
+    with np.errstate(invalid='ignore'):
+        clean = ~np.isnan(lap_time) & (lap_time <= best_lap[:, None] * LONG_RUN_CUTOFF) & (compound >= 0)
+
+    # Count clean laps per (driver, stint) and keep stints long enough to be race simulations
+    max_stint = max(int(stint.max()) + 1, 1)
+    stint_key = np.arange(n_drivers)[:, None] * max_stint + np.maximum(stint, 0)
+    stint_laps = np.bincount(stint_key[clean], minlength=n_drivers * max_stint)
+    on_run = clean & (stint_laps[stint_key] >= LONG_RUN_LAPS)
+
+    # Least-squares slope of lap time against tyre age, per (driver, compound)
+    key = (np.arange(n_drivers)[:, None] * n_compounds + np.maximum(compound, 0))[on_run]
+    x, y = age[on_run], lap_time[on_run]
+    size = n_drivers * n_compounds
+    n = np.bincount(key, minlength=size)
+    sx, sy = np.bincount(key, x, size), np.bincount(key, y, size)
+    sxx, sxy = np.bincount(key, x * x, size), np.bincount(key, x * y, size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sy / n
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+
+    shape = (n_drivers, n_compounds)
+    return mean.reshape(shape), np.nan_to_num(slope, posinf=0.0, neginf=0.0).reshape(shape), n.reshape(shape)
+
+
+def analyse(laps, stints, drivers, results=None):
+    """Classification, sector and long-run analysis of one session"""
+    started = time.perf_counter()
+    names = {d['driver_number']: d.get('last_name') or d.get('broadcast_name') or str(d['driver_number'])
+             for d in drivers}
+    driver_numbers = sorted({lap['driver_number'] for lap in laps if lap.get('driver_number') is not None})
+
+    arrays = build_lap_arrays(laps, stints, driver_numbers)
+    best_lap, best_sectors, ideal = best_laps(arrays["times"])
+    pace, degradation, run_laps = long_runs(arrays, best_lap)
+    fastest = np.nanmin(best_lap) if np.isfinite(best_lap).any() else np.nan
+    sector_best = np.nanmin(np.where(np.isnan(best_sectors), np.inf, best_sectors), axis=1)
+
+    # Official classification where OpenF1 has it, else best-lap order
+    by_number = {number: i for i, number in enumerate(driver_numbers)}
+    classified = [r['driver_number'] for r in sorted(results or [], key=lambda r: r.get('position') or 99)
+                  if r.get('position') and r['driver_number'] in by_number]
+    if not classified:
+        order = np.argsort(np.where(np.isnan(best_lap), np.inf, best_lap), kind='stable')
+        classified = [driver_numbers[i] for i in order if not np.isnan(best_lap[i])]
+
+    rows = []
+    for number in classified:
+        i = by_number[number]
+        runs = [
+            {
+                "compound": COMPOUNDS[c],
+                "avgLap": round(float(pace[i, c]), 3),
+                "degradation": round(float(degradation[i, c]), 3),
+                "laps": int(run_laps[i, c]),
+            }
+            for c in np.flatnonzero(run_laps[i] >= LONG_RUN_LAPS)
+        ]
+        rows.append({
+            "driver": names.get(number, f"#{number}"),
+            "bestLap": None if np.isnan(best_lap[i]) else round(float(best_lap[i]), 3),
+            "gap": None if np.isnan(best_lap[i]) else round(float(best_lap[i] - fastest), 3),
+            "sectorDeltas": [None if np.isnan(s) else round(float(s - b), 3)
+                             for s, b in zip(best_sectors[:, i], sector_best)],
+            "idealLap": None if np.isnan(ideal[i]) else round(float(ideal[i]), 3),
+            "longRuns": runs,
+        })
+
+    return {
+        "drivers": rows,
+        "laps": len(laps),
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def format_session(analysis):
+    """Session summary text in the SESSION_RESULTS shape ("P1: Name (time), P2: Name (+gap)")"""
+    rows = analysis["drivers"]
+    if not rows:
+        return None
+
+    classification = []
+    for position, row in enumerate(rows, start=1):
+        if row["bestLap"] is None:
+            classification.append(f"P{position}: {row['driver']}")
+        elif position == 1:
+            classification.append(f"P{position}: {row['driver']} ({format_lap(row['bestLap'])})")
+        else:
+            classification.append(f"P{position}: {row['driver']} (+{row['gap']:.3f})")
+    lines = [", ".join(classification) + "."]
+
+    timed = [r for r in rows if r["idealLap"] is not None][:TOP_DRIVERS]
+    if timed:
+        lines.append("Sector deltas to the session's best sectors: " + "; ".join(
+            f"{r['driver']} " + " ".join(
+                f"S{k + 1} +{d:.3f}" for k, d in enumerate(r['sectorDeltas']) if d is not None
+            ) + f" (ideal {format_lap(r['idealLap'])})"
+            for r in timed
+        ) + ".")
+
+    runs = sorted(
+        [(run["avgLap"], row["driver"], run) for row in rows for run in row["longRuns"]],
+        key=lambda item: item[0]
+    )[:TOP_DRIVERS]
+    if runs:
+        lines.append("Long runs (average lap, degradation per lap of tyre age, laps): " + "; ".join(
+            f"{driver} {run['compound'].lower()} {format_lap(run['avgLap'])} "
+            f"({run['degradation']:+.3f}s/lap, {run['laps']} laps)"
+            for _, driver, run in runs
+        ) + ".")
+
+    return "\n".join(lines)
+
+
+def session_finished(info):
+    """True once a session's timing data is final and safe to cache"""
+    end = info.get('date_end')
+    if not end:
+        return False
+    ended = datetime.fromisoformat(end.replace('Z', '+00:00'))
+    return datetime.now(timezone.utc) > ended + timedelta(seconds=FINISHED_GRACE)
+
+
+async def fetch_session_data(session, info):
+    """laps, stints, drivers and session_result for one OpenF1 session"""
+    cacheable = bool if session_finished(info) else (lambda data: False)
+    key = info['session_key']
+    laps, stints, drivers, results = await asyncio.gather(*[
+        f1data.fetch_openf1(session, endpoint, cacheable=cacheable, session_key=key)
+        for endpoint in ("laps", "stints", "drivers", "session_result")
+    ])
+    return {"laps": laps, "stints": stints, "drivers": drivers, "session_result": results}
+
+
+def load_dump(path):
+    """Session data from a local JSON dump with "laps", "stints", "drivers" and optional "session_result" lists"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {key: data.get(key) or [] for key in ("laps", "stints", "drivers", "session_result")}
+
+
+async def find_weekend_sessions(session, race_date):
+    """OpenF1 practice, sprint and qualifying sessions of the weekend ending on race_date"""
+    day = date.fromisoformat(race_date)
+    window = {(day - timedelta(days=offset)).isoformat() for offset in range(4)}
+    sessions = await f1data.fetch_openf1(session, "sessions", max_age=f1data.CALENDAR_MAX_AGE, year=day.year)
+    return [s for s in sessions if s.get('date_start', '')[:10] in window and s.get('session_name') in SESSION_KEYS]
+
+
+async def analyse_weekend(session, race_date, dumps_dir=None):
+    """Session text per SESSION_RESULTS key for every session with timing data
+
+    With dumps_dir, <dumps_dir>/<key>.json files (e.g. fp2.json) are analysed
+    instead of fetching from OpenF1.
+    """
+    if dumps_dir:
+        sources = {
+            key: load_dump(os.path.join(dumps_dir, f"{key}.json"))
+            for key in dict.fromkeys(SESSION_KEYS.values())
+            if os.path.exists(os.path.join(dumps_dir, f"{key}.json"))
+        }
+    else:
+        weekend = await find_weekend_sessions(session, race_date)
+        fetched = await asyncio.gather(*[fetch_session_data(session, info) for info in weekend])
+        sources = {SESSION_KEYS[info['session_name']]: data for info, data in zip(weekend, fetched)}
+
+    texts = {}
+    for key, data in sources.items():
+        if not data["laps"]:
+            continue
+        analysis = analyse(data["laps"], data["stints"], data["drivers"], data["session_result"])
+        text = format_session(analysis)
+        if text:
+            texts[key] = text
+            print(f"   ✓ {key}: {analysis['laps']} laps analysed in {analysis['elapsedMs']}ms")
+    return texts
@@ -0,0 +1,204 @@
+"""
+Per-stage output budgets and reasoning effort, calibrated from recorded usage
+
+Every OpenAI call is logged with its stage (detect_gp, race_context,
+driver_preview, top5, underdogs, prediction, ...) and token usage. Once a
+stage has enough completed calls for the current model, its max_output_tokens
+becomes the p99 of observed output tokens plus headroom, instead of the flat
+global ceiling. Oversized budgets let the model reason for longer, so tighter
+budgets cut latency on the small stages.
+
+Usage:
+  python generate_previews.py --only=budgets     # Show calibrated budgets per stage
+"""
+
+import json
+import math
+import os
+import time
+
+USAGE_LOG = os.path.join(".usage", "calls.jsonl")
+CALIBRATION_PERCENTILE = 0.99
+CALIBRATION_HEADROOM = 1.3
+CALIBRATION_MIN_SAMPLES = 20
+CALIBRATION_WINDOW = 500  # Most recent calls per stage/model considered
+MIN_OUTPUT_TOKENS = 2000
+LATENCY_PERCENTILE = 0.9  # Latency estimates used by the deadline scheduler
+ESTIMATE_MIN_SAMPLES = 5  # Calls needed before latency and usage estimates are used
+
+# Reasoning effort per stage. A "max_output_tokens" entry here overrides calibration.
+STAGE_SETTINGS = {
+    "detect_gp": {"reasoning_effort": "low"},
+    "race_context": {"reasoning_effort": "medium"},
+    "driver_preview": {"reasoning_effort": "medium"},
+    "top5": {"reasoning_effort": "medium"},
+    "underdogs": {"reasoning_effort": "medium"},
+    "prediction": {"reasoning_effort": "medium"},
+    "repair": {"reasoning_effort": "low"},
+    "race_context_update": {"reasoning_effort": "low"},
+    "driver_update": {"reasoning_effort": "low"},
+    "translate": {"reasoning_effort": "minimal"},
+    "translate_batch": {"reasoning_effort": "minimal"},
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageBudgets:
+    """Loads the usage log once and hands out per-stage request settings"""
+
+    def __init__(self, log_path=USAGE_LOG, ceiling=30000):
+        self.log_path = log_path
+        self.ceiling = ceiling
+        self.samples = None
+        self.latencies = None
+        self.input_overheads = None
+        self.searches = None
+
+    def load(self):
+        """Read completed calls from the usage log, grouped by (stage, model)"""
+        self.samples = {}
+        self.latencies = {}
+        self.input_overheads = {}
+        self.searches = {}
+        if not os.path.exists(self.log_path):
+            return self.samples
+
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("status") != "completed" or not entry.get("output_tokens"):
+                    continue
+                key = (entry.get("stage"), entry.get("model"))
+                self.samples.setdefault(key, []).append(entry["output_tokens"])
+                if entry.get("latencySeconds"):
+                    self.latencies.setdefault(key, []).append(entry["latencySeconds"])
+                if entry.get("prompt_tokens") is not None and entry.get("input_tokens") is not None:
+                    self.input_overheads.setdefault(key, []).append(entry["input_tokens"] - entry["prompt_tokens"])
+                if entry.get("web_searches") is not None:
+                    self.searches.setdefault(key, []).append(entry["web_searches"])
+
+        for key, values in self.samples.items():
+            self.samples[key] = values[-CALIBRATION_WINDOW:]
+        for history in (self.latencies, self.input_overheads, self.searches):
+            for key, values in history.items():
+                history[key] = values[-CALIBRATION_WINDOW:]
+        return self.samples
+
+    def calibrated_budget(self, stage, model):
+        """p99 output tokens plus headroom, or None if there aren't enough samples yet"""
+        if self.samples is None:
+            self.load()
+
+        values = self.samples.get((stage, model), [])
+        if len(values) < CALIBRATION_MIN_SAMPLES:
+            return None
+
+        budget = int(percentile(values, CALIBRATION_PERCENTILE) * CALIBRATION_HEADROOM)
+        return max(MIN_OUTPUT_TOKENS, min(self.ceiling, budget))
+
+    def latency_estimate(self, stage, model):
+        """p90 latency in seconds of recent calls (including this run's), or None without enough samples"""
+        if self.latencies is None:
+            self.load()
+
+        values = self.latencies.get((stage, model), [])
+        if len(values) < ESTIMATE_MIN_SAMPLES:
+            return None
+        return percentile(values[-CALIBRATION_WINDOW:], LATENCY_PERCENTILE)
+
+    def typical(self, history, stage, model):
+        """Median of a recorded per-call quantity, or None without enough samples"""
+        if self.samples is None:
+            self.load()
+
+        values = getattr(self, history).get((stage, model), [])
+        if len(values) < ESTIMATE_MIN_SAMPLES:
+            return None
+        return percentile(values[-CALIBRATION_WINDOW:], 0.5)
+
+    def settings(self, stage, model):
+        """max_output_tokens and reasoning_effort to use for a stage's next call"""
+        configured = STAGE_SETTINGS.get(stage, {})
+        budget = configured.get("max_output_tokens") or self.calibrated_budget(stage, model) or self.ceiling
+        return {
+            "max_output_tokens": budget,
+            "reasoning_effort": configured.get("reasoning_effort"),
+        }
+
+    def record(self, stage, model, response, max_output_tokens, latency, prompt_tokens=None, web_searches=None):
+        """Append one call's usage to the log for future calibration
+
+        prompt_tokens (the pre-call estimate) and web_searches let the run
+        budget learn how much web search adds to a stage's input.
+        """
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "output_tokens_details", None)
+        entry = {
+            "ts": time.time(),
+            "stage": stage,
+            "model": model,
+            "status": getattr(response, "status", None) or "completed",
+            "max_output_tokens": max_output_tokens,
+            "input_tokens": getattr(usage, "input_tokens", None),
+            "output_tokens": getattr(usage, "output_tokens", None),
+            "reasoning_tokens": getattr(details, "reasoning_tokens", None),
+            "prompt_tokens": prompt_tokens,
+            "web_searches": web_searches,
+            "latencySeconds": round(latency, 3),
+        }
+
+        # Truncated calls are "incomplete", so like load() this only learns from complete outputs
+        if self.latencies is not None and entry["status"] == "completed":
+            if entry["output_tokens"]:
+                self.samples.setdefault((stage, model), []).append(entry["output_tokens"])
+            self.latencies.setdefault((stage, model), []).append(entry["latencySeconds"])
+            if prompt_tokens is not None and entry["input_tokens"] is not None:
+                self.input_overheads.setdefault((stage, model), []).append(entry["input_tokens"] - prompt_tokens)
+            if web_searches is not None:
+                self.searches.setdefault((stage, model), []).append(web_searches)
+
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def report(self, model_for_stage):
+        """Rows of (stage, model, samples, p50, p99, budget, effort); model_for_stage maps a stage to its model"""
+        if self.samples is None:
+            self.load()
+
+        stages = list(STAGE_SETTINGS) + sorted(
+            {stage for stage, _ in self.samples if stage not in STAGE_SETTINGS}
+        )
+        rows = []
+        for stage in stages:
+            model = model_for_stage(stage)
+            values = self.samples.get((stage, model), [])
+            settings = self.settings(stage, model)
+            rows.append((
+                stage,
+                model,
+                len(values),
+                percentile(values, 0.5) if values else None,
+                percentile(values, CALIBRATION_PERCENTILE) if values else None,
+                settings["max_output_tokens"],
+                settings["reasoning_effort"],
+            ))
+        return rows
+
+
+def is_truncated(response):
+    """True if the response stopped because it hit max_output_tokens"""
+    details = getattr(response, "incomplete_details", None)
+    return getattr(response, "status", None) == "incomplete" and getattr(details, "reason", None) == "max_output_tokens"